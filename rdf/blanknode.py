@@ -1,8 +1,20 @@
 class BlankNode:
-    __slots__ = 'node_id'
+    __slots__ = ('node_id', '_hash', '__weakref__')
 
     def __init__(self, node_id=None):
-        self.node_id = node_id
+        # Blank nodes are immutable, so the hash is computed once.
+        identity = node_id if node_id is not None else id(self)
+        object.__setattr__(self, 'node_id', node_id)
+        object.__setattr__(self, '_hash', hash(BlankNode) ^ hash(identity))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("BlankNode is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("BlankNode is immutable")
+
+    def __reduce__(self):
+        return (BlankNode, (self.node_id,))
 
     def __repr__(self):
         if self.node_id is not None:
@@ -17,8 +29,7 @@ class BlankNode:
                   self.node_id == other.node_id)))
 
     def __hash__(self):
-        identity = self.node_id if self.node_id is not None else id(self)
-        return hash(BlankNode) ^ hash(identity)
+        return self._hash
 
     def __lt__(self, other):
         if other is None:
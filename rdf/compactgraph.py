@@ -0,0 +1,516 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import MutableSet, Set
+from itertools import compress
+from operator import itemgetter, not_
+
+from rdf.blanknode import BlankNode
+from rdf.graph import Graph
+
+
+class TermDictionary:
+    """A two-way mapping of terms to consecutive integer IDs.
+
+    Each distinct term is stored once, no matter how many triples use it.
+
+    """
+    def __init__(self, terms=()):
+        self._ids = {}
+        self._terms = []
+        for term in terms:
+            self.encode(term)
+
+    def __len__(self):
+        return len(self._terms)
+
+    def __iter__(self):
+        return iter(self._terms)
+
+    def __contains__(self, term):
+        return term in self._ids
+
+    def __getitem__(self, term_id):
+        return self._terms[term_id]
+
+    def encode(self, term):
+        """Return the ID of term, assigning a new one if necessary."""
+        term_id = self._ids.get(term)
+        if term_id is None:
+            term_id = self._ids[term] = len(self._terms)
+            self._terms.append(term)
+        return term_id
+
+    def lookup(self, term):
+        """Return the ID of term, or None if it has not been assigned one."""
+        return self._ids.get(term)
+
+    def decode(self, term_id):
+        """Return the term with the given ID."""
+        return self._terms[term_id]
+
+
+class CompactGraph(MutableSet):
+    """A graph storing triples as columns of term IDs.
+
+    Terms are interned in a TermDictionary and each triple is stored as
+    three integers in array('q') columns, so a triple costs a few machine
+    words instead of a tuple of term objects. Triples are only decoded into
+    tuples of URI, Literal and BlankNode objects as they are read.
+
+    Membership is tested by binary search of the rows sorted by subject,
+    predicate and object, whose terms are kept in packed arrays alongside.
+    Rows added since they were sorted are pending, and are kept in a
+    dictionary until they number more than an eighth of the graph; they
+    are then merged into the sorted rows.
+
+    Set operations work on the decoded triples, and comparisons determine
+    isomorphism like Graph does. Two CompactGraphs are compared by their
+    term IDs unless both have blank nodes, when they are decoded.
+
+    """
+    # Bits per term ID in keys. The sorted keys hold a subject and a
+    # predicate ID each in a signed 64-bit integer, so IDs must be less
+    # than 1 << (KEY_BITS - 1); adding a triple with a larger ID raises
+    # ValueError rather than letting keys collide.
+    KEY_BITS = 32
+    # The least number of pending rows that are merged at once.
+    PENDING_SIZE = 1 << 10
+    # The most pending rows that a lookup scans instead of merging them.
+    SCAN_SIZE = 1 << 6
+
+    def __init__(self, triples=(), terms=None):
+        self.terms = TermDictionary() if terms is None else terms
+        self._subjects = array('q')
+        self._predicates = array('q')
+        self._objects = array('q')
+        self._removed = bytearray()
+        self._num_removed = 0
+        self._size = 0
+        self._pending = {}
+        # Rows sorted by the columns in each order. The (0, 1, 2) order is
+        # always kept, and holds every row that is not pending.
+        self._orders = {(0, 1, 2): array('q')}
+        # The subject and predicate keys and the objects of those rows.
+        self._sorted_keys = array('q')
+        self._sorted_objects = array('q')
+        self.update(triples)
+
+    @classmethod
+    def _from_iterable(cls, triples):
+        return cls(triples)
+
+    def __repr__(self):
+        if self:
+            return "CompactGraph({!r})".format(set(self))
+        else:
+            return "CompactGraph()"
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
+        decode = self.terms.decode
+        for subject, predicate, object_, removed in zip(self._subjects,
+                                                        self._predicates,
+                                                        self._objects,
+                                                        self._removed):
+            if not removed:
+                yield (decode(subject), decode(predicate), decode(object_))
+
+    def __contains__(self, triple):
+        ids = self._lookup_ids(triple)
+        return ids is not None and self._find_row(ids) is not None
+
+    def add(self, triple):
+        """Add a triple to the graph, encoding any new terms."""
+        subject, predicate, object_ = triple
+        ids = (self.terms.encode(subject), self.terms.encode(predicate),
+               self.terms.encode(object_))
+        self._check_ids(max(ids))
+        if self._find_row(ids) is None:
+            self._pending[self._key(ids)] = len(self._subjects)
+            self._subjects.append(ids[0])
+            self._predicates.append(ids[1])
+            self._objects.append(ids[2])
+            self._removed.append(0)
+            self._size += 1
+            if len(self._pending) > max(self.PENDING_SIZE, self._size >> 3):
+                self._merge()
+
+    def update(self, *iterables):
+        """Add the triples from all iterables to the graph."""
+        for triples in iterables:
+            for triple in triples:
+                self.add(triple)
+
+    def discard(self, triple):
+        """Remove a triple from the graph if it is present."""
+        ids = self._lookup_ids(triple)
+        row = None if ids is None else self._find_row(ids)
+        if row is not None:
+            self._pending.pop(self._key(ids), None)
+            # Rows are only marked as removed, so the sorted orders stay
+            # valid. The columns are compacted once most rows are removed.
+            self._removed[row] = 1
+            self._num_removed += 1
+            self._size -= 1
+            if self._num_removed > self._size:
+                self._compact()
+
+    def clear(self):
+        """Remove all triples from the graph. The term dictionary is kept."""
+        self._subjects = array('q')
+        self._predicates = array('q')
+        self._objects = array('q')
+        self._removed = bytearray()
+        self._num_removed = 0
+        self._size = 0
+        self._pending = {}
+        self._orders = {(0, 1, 2): array('q')}
+        self._sorted_keys = array('q')
+        self._sorted_objects = array('q')
+
+    def triples(self, subject=None, predicate=None, object_=None):
+        """Generate the triples matching the given terms.
+
+        None is a wildcard. The lookup is answered by binary search of the
+        rows sorted by the given terms, which is built on first use. Rows
+        pending since the graph was modified are scanned, or merged into
+        the sorted rows first if there are more than SCAN_SIZE.
+
+        """
+        terms = (subject, predicate, object_)
+        ids = []
+        for term in terms:
+            if term is None:
+                ids.append(None)
+            else:
+                term_id = self.terms.lookup(term)
+                if term_id is None:
+                    return
+                ids.append(term_id)
+        if None not in ids:
+            if self._find_row(ids) is not None:
+                yield tuple(terms)
+            return
+        elif ids == [None, None, None]:
+            yield from self
+            return
+        if len(self._pending) > self.SCAN_SIZE:
+            self._merge()
+        pending = list(self._pending.values())
+
+        # Pick the order whose leading columns are the given terms.
+        if ids[0] is not None and ids[2] is not None:
+            order = (2, 0, 1)
+        elif ids[0] is not None:
+            order = (0, 1, 2)
+        elif ids[1] is not None:
+            order = (1, 2, 0)
+        else:
+            order = (2, 0, 1)
+        prefix = tuple(ids[i] for i in order if ids[i] is not None)
+        columns = self._columns()
+        decode = self.terms.decode
+        for row in self._rows(order, prefix):
+            if not self._removed[row]:
+                yield (decode(columns[0][row]), decode(columns[1][row]),
+                       decode(columns[2][row]))
+        for row in pending:
+            if not self._removed[row] and \
+                    all(term_id is None or column[row] == term_id
+                        for column, term_id in zip(columns, ids)):
+                yield (decode(columns[0][row]), decode(columns[1][row]),
+                       decode(columns[2][row]))
+
+    def to_graph(self):
+        """Return the triples decoded into a Graph."""
+        return Graph(self)
+
+    def __eq__(self, other):
+        """x == y: Return True if x is isomorphic to y.
+
+        If y is a set or frozenset but not a Graph or CompactGraph, standard
+        set comparisons are performed instead - isomorphism is not determined.
+
+        """
+        if isinstance(other, CompactGraph):
+            result = len(self) == len(other) and self._subgraph_of(other)
+            if result is not None:
+                return result
+        other = _comparable(other)
+        if other is NotImplemented:
+            return other
+        return self.to_graph() == other
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    def __lt__(self, other):
+        if isinstance(other, CompactGraph):
+            result = len(self) < len(other) and self._subgraph_of(other)
+            if result is not None:
+                return result
+        other = _comparable(other)
+        if other is NotImplemented:
+            return other
+        return self.to_graph() < other
+
+    def __le__(self, other):
+        if isinstance(other, CompactGraph):
+            result = self._subgraph_of(other)
+            if result is not None:
+                return result
+        other = _comparable(other)
+        if other is NotImplemented:
+            return other
+        return self.to_graph() <= other
+
+    def __gt__(self, other):
+        if isinstance(other, CompactGraph):
+            result = len(self) > len(other) and other._subgraph_of(self)
+            if result is not None:
+                return result
+        other = _comparable(other)
+        if other is NotImplemented:
+            return other
+        return self.to_graph() > other
+
+    def __ge__(self, other):
+        if isinstance(other, CompactGraph):
+            result = other._subgraph_of(self)
+            if result is not None:
+                return result
+        other = _comparable(other)
+        if other is NotImplemented:
+            return other
+        return self.to_graph() >= other
+
+    __hash__ = None
+
+    def is_isomorphic(self, other, strategy=None):
+        """Return True if the graph is isomorphic to other."""
+        if isinstance(other, CompactGraph):
+            result = len(self) == len(other) and self._subgraph_of(other)
+            if result is not None:
+                return result
+        return self.to_graph().is_isomorphic(_comparable(other), strategy)
+
+    def is_ground(self):
+        """Return True if the graph contains no blank nodes."""
+        blank_node_ids = {term_id for term_id, term in enumerate(self.terms)
+                          if isinstance(term, BlankNode)}
+        if not blank_node_ids:
+            return True
+        kept = list(map(not_, self._removed))
+        return (blank_node_ids.isdisjoint(compress(self._subjects, kept)) and
+                blank_node_ids.isdisjoint(compress(self._objects, kept)))
+
+    def fingerprint(self):
+        """Return a hash of the graph independent of blank node IDs."""
+        return self.to_graph().fingerprint()
+
+    def canonicalize(self):
+        """Return an isomorphic graph with canonically labelled blank nodes."""
+        return CompactGraph(self.to_graph().canonicalize())
+
+    def nodes(self):
+        """Return a set of the subjects and objects of triples in the graph."""
+        return self.to_graph().nodes()
+
+    def names(self):
+        """
+        Return a set of the URIs and literals in the graph, including the
+        datatype URIs of typed literals.
+
+        """
+        return self.to_graph().names()
+
+    def vocabulary(self, include_datatypes=False):
+        """
+        Return a set of the URIs and literals in the graph, only including
+        the datatype URIs of typed literals if include_datatypes is True.
+
+        """
+        return self.to_graph().vocabulary(include_datatypes)
+
+    def _subgraph_of(self, other):
+        # Return whether this graph is isomorphic to a subgraph of other,
+        # another CompactGraph, by looking up its rows' term IDs in other.
+        # A ground graph can only be a subgraph of another by containing
+        # its triples; if this graph has blank nodes, None is returned
+        # unless other is ground, and the decoded graphs are compared.
+        if len(self) > len(other):
+            return False
+        elif not self.is_ground():
+            return False if other.is_ground() else None
+        if other.terms is self.terms:
+            translation = None
+        else:
+            lookup = other.terms.lookup
+            translation = [lookup(term) for term in self.terms]
+        rows = zip(self._subjects, self._predicates, self._objects)
+        for ids in compress(rows, map(not_, self._removed)):
+            if translation is not None:
+                ids = (translation[ids[0]], translation[ids[1]],
+                       translation[ids[2]])
+                if None in ids:
+                    return False
+            if other._find_row(ids) is None:
+                return False
+        return True
+
+    def _check_ids(self, term_id):
+        # Raise ValueError if term_id is too large to pack into keys.
+        if term_id >> (self.KEY_BITS - 1):
+            raise ValueError("Too many terms: {}".format(term_id + 1))
+
+    def _key(self, ids):
+        bits = self.KEY_BITS
+        return (ids[0] << bits | ids[1]) << bits | ids[2]
+
+    def _lookup_ids(self, triple):
+        try:
+            subject, predicate, object_ = triple
+        except (TypeError, ValueError):
+            return None
+        ids = (self.terms.lookup(subject), self.terms.lookup(predicate),
+               self.terms.lookup(object_))
+        if None in ids:
+            return None
+        return ids
+
+    def _find_row(self, ids):
+        # The row holding a triple, or None if the graph does not have it.
+        row = self._pending.get(self._key(ids))
+        if row is not None:
+            return row
+        keys, objects = self._sorted_keys, self._sorted_objects
+        rows = self._orders[(0, 1, 2)]
+        key = ids[0] << self.KEY_BITS | ids[1]
+        low = bisect_left(keys, key)
+        high = bisect_right(keys, key, low)
+        for i in range(bisect_left(objects, ids[2], low, high), high):
+            if objects[i] != ids[2]:
+                break
+            elif not self._removed[rows[i]]:
+                return rows[i]
+        return None
+
+    def _rows(self, order, prefix):
+        columns = [self._columns()[i] for i in order[:len(prefix)]]
+        rows = self._order(order)
+        low, high = 0, len(rows)
+        while low < high:
+            middle = (low + high) // 2
+            row = rows[middle]
+            if tuple(column[row] for column in columns) < prefix:
+                low = middle + 1
+            else:
+                high = middle
+        for i in range(low, len(rows)):
+            row = rows[i]
+            if tuple(column[row] for column in columns) != prefix:
+                break
+            yield row
+
+    def _columns(self):
+        return (self._subjects, self._predicates, self._objects)
+
+    def _order(self, order):
+        rows = self._orders.get(order)
+        if rows is None:
+            rows = self._orders[order] = self._sort(order,
+                                                    self._orders[(0, 1, 2)])
+        return rows
+
+    def _sort(self, order, rows):
+        # Sort rows by their columns in order, comparing tuples in C.
+        columns = self._columns()
+        keys = [map(columns[i].__getitem__, rows) for i in order]
+        return array('q', map(itemgetter(3), sorted(zip(*keys, rows))))
+
+    def _merge(self):
+        # Merge the pending rows into each sorted order. The orders are
+        # already sorted runs, which sorting finds and merges in one pass.
+        if self._pending:
+            pending = array('q', self._pending.values())
+            for order, rows in self._orders.items():
+                self._orders[order] = self._sort(order, rows + pending)
+            self._pending = {}
+            self._index()
+
+    def _index(self):
+        # Pack the terms of the rows in (0, 1, 2) order, so that a triple
+        # is found by bisecting arrays.
+        subjects, predicates, objects = self._columns()
+        rows = self._orders[(0, 1, 2)]
+        bits = self.KEY_BITS
+        self._sorted_keys = array('q', (subjects[row] << bits |
+                                        predicates[row] for row in rows))
+        self._sorted_objects = array('q', map(objects.__getitem__, rows))
+
+    def _extend(self, encoded):
+        # Add triples given as (terms, ids) pairs, where ids is a flat
+        # array of indexes into terms, as NTriplesReader's workers return
+        # them. The rows are appended in bulk and sorted in at once.
+        self._merge()
+        columns = self._columns()
+        start = len(self._subjects)
+        # Every range is translated before any is added, so a term ID too
+        # large for the keys leaves the graph as it was.
+        encoded = list(encoded)
+        translations = [array('q', map(self.terms.encode, terms))
+                        for terms, ids in encoded]
+        self._check_ids(max((max(translation) for translation in translations
+                             if translation), default=0))
+        for translation, (terms, ids) in zip(translations, encoded):
+            for offset, column in enumerate(columns):
+                column.extend(map(translation.__getitem__, ids[offset::3]))
+        end = len(self._subjects)
+        self._removed.extend(bytes(end - start))
+        rows = self._orders[(0, 1, 2)] + array('q', range(start, end))
+        self._orders = {(0, 1, 2): self._sort((0, 1, 2), rows)}
+        self._index()
+        # Rows of the same triple are adjacent, the oldest first. Later
+        # ones are marked as removed, so triples already in the graph or
+        # repeated in the input are only counted once.
+        removed = self._removed
+        last = None
+        for row, key, object_ in zip(self._orders[(0, 1, 2)],
+                                     self._sorted_keys, self._sorted_objects):
+            if removed[row]:
+                continue
+            elif (key, object_) == last:
+                removed[row] = 1
+                self._num_removed += 1
+            else:
+                last = (key, object_)
+                if row >= start:
+                    self._size += 1
+        if self._num_removed > self._size:
+            self._compact()
+
+    def _compact(self):
+        rows = [row for row in range(len(self._subjects))
+                if not self._removed[row]]
+        self._subjects = array('q', (self._subjects[row] for row in rows))
+        self._predicates = array('q', (self._predicates[row] for row in rows))
+        self._objects = array('q', (self._objects[row] for row in rows))
+        self._removed = bytearray(len(rows))
+        self._num_removed = 0
+        self._pending = {}
+        self._orders = {(0, 1, 2): self._sort((0, 1, 2), range(len(rows)))}
+        self._index()
+
+
+def _comparable(other):
+    if isinstance(other, CompactGraph):
+        return other.to_graph()
+    elif isinstance(other, (set, frozenset)):
+        return other
+    elif isinstance(other, Set):
+        return frozenset(other)
+    else:
+        return NotImplemented
@@ -1,6 +1,9 @@
+import hashlib
+import heapq
+import itertools
 import operator
 from collections import defaultdict
-from itertools import product
+from functools import lru_cache
 
 from rdf.blanknode import BlankNode
 from rdf.uri import URI
@@ -8,6 +11,21 @@ from rdf.literal import Literal, TypedLiteral
 
 
 class Graph(set):
+    ISOMORPHISM_STRATEGIES = ('canonical', 'bijection')
+    isomorphism_strategy = 'canonical'
+
+    def __init__(self, triples=()):
+        super().__init__(triples)
+        self._spo = {}
+        self._pos = {}
+        self._osp = {}
+        self._ground = set()
+        self._unground = set()
+        self._bnodes = {}
+        self._cache = {}
+        for triple in self:
+            self._index(triple)
+
     def __eq__(self, other):
         """x == y: Return True if x is isomorphic to y.
 
@@ -22,43 +40,7 @@ class Graph(set):
         elif not isinstance(other, Graph):
             return frozenset(self) == other
 
-        # Triples without blank nodes can be compared directly.
-        ground_triples = set(self._ground_triples())
-        other_ground_triples = set(other._ground_triples())
-        if ground_triples != other_ground_triples:
-            return False
-
-        bnode_triples = set(self._bnode_triples())
-        if not bnode_triples:
-            return True
-
-        other_bnode_triples = set(other._bnode_triples())
-        # Create mappings of blank nodes to their triples.
-        bnode_map = self._bnode_map(bnode_triples)
-        other_bnode_map = other._bnode_map(other_bnode_triples)
-        if len(bnode_map) != len(other_bnode_map):
-            return False
-
-        # Generate a signature for each blank node, consisting of the blank
-        # node's triples with blank nodes replaced with tuples.
-        signatures = self._bnode_signatures(bnode_map)
-        other_signatures = other._bnode_signatures(other_bnode_map)
-        # Generate a metasignature, consisting of a frequency map of blank
-        # node signatures.
-        metasignature = self._metasignature(signatures)
-        other_metasignature = other._metasignature(other_signatures)
-        if metasignature != other_metasignature:
-            return False
-
-        for bijection in self._bnode_bijections(signatures, other_signatures):
-            # If the bijection is valid, then each triple generated by
-            # applying the bijection will be in the other graph.
-            for triple in self._apply_bijection(bijection, bnode_triples):
-                if triple not in other_bnode_triples:
-                    break
-            else:
-                return True
-        return False
+        return self.is_isomorphic(other)
 
     def __ne__(self, other):
         """x != y: Return True if x is not isomorphic to y.
@@ -84,19 +66,14 @@ class Graph(set):
             return frozenset(self) < other
 
         # Triples without blank nodes can be compared directly.
-        ground_triples = set(self._ground_triples())
-        other_ground_triples = set(other._ground_triples())
-        if not ground_triples <= other_ground_triples:
+        if not self._ground <= other._ground:
             return False
-
-        bnode_triples = set(self._bnode_triples())
-        other_bnode_triples = set(other._bnode_triples())
-        if not bnode_triples:
+        elif not self._unground:
             return True
 
-        # Create mappings of blank nodes to their triples.
-        bnode_map = self._bnode_map(bnode_triples)
-        other_bnode_map = other._bnode_map(other_bnode_triples)
+        # Mappings of blank nodes to their triples are kept up to date.
+        bnode_map = self._bnodes
+        other_bnode_map = other._bnodes
         if len(bnode_map) > len(other_bnode_map):
             return False
 
@@ -104,15 +81,11 @@ class Graph(set):
         # node's triples with blank nodes replaced with tuples.
         signatures = self._bnode_signatures(bnode_map)
         other_signatures = other._bnode_signatures(other_bnode_map)
-        for bijection in self._bnode_bijections(signatures, other_signatures,
+        # Each generated bijection maps every triple into the other graph.
+        for bijection in self._bnode_bijections(
+            bnode_map, other, signatures, other_signatures,
             self._subgraph_bnode_comparator):
-            # If the bijection is valid, then each triple generated by
-            # applying the bijection will be in the other graph.
-            for triple in self._apply_bijection(bijection, bnode_triples):
-                if triple not in other_bnode_triples:
-                    break
-            else:
-                return True
+            return True
         return False
 
     def __gt__(self, other):
@@ -147,11 +120,281 @@ class Graph(set):
         """
         return self == other or self > other
 
+    def is_isomorphic(self, other, strategy=None):
+        """Return True if the graph is isomorphic to other.
+
+        With the 'canonical' strategy, the canonical labellings of both
+        graphs' blank nodes are compared. With the 'bijection' strategy, a
+        bijection between blank nodes with matching signatures is searched
+        for instead. The default is given by the isomorphism_strategy
+        attribute.
+
+        """
+        if strategy is None:
+            strategy = self.isomorphism_strategy
+        if strategy not in self.ISOMORPHISM_STRATEGIES:
+            raise ValueError("Unknown isomorphism strategy: "
+                             "{!r}".format(strategy))
+        elif len(self) != len(other):
+            return False
+        elif self.fingerprint() != other.fingerprint():
+            return False
+
+        # Triples without blank nodes can be compared directly.
+        if self._ground != other._ground:
+            return False
+        elif not self._unground:
+            return True
+        elif strategy == 'canonical':
+            return (self._canonical_bnode_triples() ==
+                    other._canonical_bnode_triples())
+        else:
+            return self._bijection_isomorphic(other)
+
+    def _bijection_isomorphic(self, other):
+        # Mappings of blank nodes to their triples are kept up to date.
+        bnode_map = self._bnodes
+        other_bnode_map = other._bnodes
+        if len(bnode_map) != len(other_bnode_map):
+            return False
+
+        # Generate a signature for each blank node, consisting of the blank
+        # node's triples with blank nodes replaced with tuples.
+        signatures = self._bnode_signatures(bnode_map)
+        other_signatures = other._bnode_signatures(other_bnode_map)
+        # Generate a metasignature, consisting of a frequency map of blank
+        # node signatures.
+        metasignature = self._metasignature(signatures)
+        other_metasignature = other._metasignature(other_signatures)
+        if metasignature != other_metasignature:
+            return False
+
+        # Each generated bijection maps every triple into the other graph,
+        # and both graphs have the same number of triples.
+        for bijection in self._bnode_bijections(bnode_map, other, signatures,
+                                                other_signatures):
+            return True
+        return False
+
+    def fingerprint(self):
+        """Return a hash of the graph that does not depend on blank node IDs.
+
+        Isomorphic graphs have equal fingerprints. The fingerprint combines
+        the ground triples with the frequencies of blank node signatures. It
+        is cached until the graph is modified.
+
+        """
+        fingerprint = self._cache.get('fingerprint')
+        if fingerprint is None:
+            signatures = self._bnode_signatures(self._bnodes)
+            signature_counts = _counts(frozenset(signature)
+                                       for signature in signatures.values())
+            fingerprint = self._cache['fingerprint'] = hash(
+                (frozenset(self._ground), frozenset(signature_counts)))
+        return fingerprint
+
+    def canonicalize(self):
+        """Return an isomorphic graph with canonically labelled blank nodes.
+
+        Isomorphic graphs have identical canonical forms.
+
+        """
+        graph = Graph(self._ground)
+        graph.update(self._canonical_bnode_triples())
+        return graph
+
+    def __ior__(self, other):
+        if not isinstance(other, (set, frozenset)):
+            return NotImplemented
+        self.update(other)
+        return self
+
+    def __iand__(self, other):
+        if not isinstance(other, (set, frozenset)):
+            return NotImplemented
+        self.intersection_update(other)
+        return self
+
+    def __isub__(self, other):
+        if not isinstance(other, (set, frozenset)):
+            return NotImplemented
+        self.difference_update(other)
+        return self
+
+    def __ixor__(self, other):
+        if not isinstance(other, (set, frozenset)):
+            return NotImplemented
+        self.symmetric_difference_update(other)
+        return self
+
+    def add(self, triple):
+        """Add a triple to the graph and its indexes."""
+        if triple not in self:
+            self._index(triple)
+            super().add(triple)
+
+    def update(self, *iterables):
+        """Add the triples from all iterables to the graph."""
+        for triples in iterables:
+            for triple in triples:
+                self.add(triple)
+
+    def discard(self, triple):
+        """Remove a triple from the graph if it is present."""
+        if triple in self:
+            super().discard(triple)
+            self._unindex(triple)
+
+    def remove(self, triple):
+        """Remove a triple from the graph; raise KeyError if not present."""
+        if triple not in self:
+            raise KeyError(triple)
+        self.discard(triple)
+
+    def pop(self):
+        """Remove and return an arbitrary triple from the graph."""
+        triple = super().pop()
+        self._unindex(triple)
+        return triple
+
+    def clear(self):
+        """Remove all triples from the graph."""
+        super().clear()
+        self._spo.clear()
+        self._pos.clear()
+        self._osp.clear()
+        self._ground.clear()
+        self._unground.clear()
+        self._bnodes.clear()
+        self._cache.clear()
+
+    def intersection_update(self, *others):
+        """Remove the triples not found in all others."""
+        others = [other if isinstance(other, (set, frozenset)) else set(other)
+                  for other in others]
+        for triple in [triple for triple in self
+                       if not all(triple in other for other in others)]:
+            self.discard(triple)
+
+    def difference_update(self, *others):
+        """Remove the triples found in any of the others."""
+        for triples in others:
+            for triple in list(triples):
+                self.discard(triple)
+
+    def symmetric_difference_update(self, other):
+        """Keep the triples found in either the graph or other, not both."""
+        if not isinstance(other, (set, frozenset)):
+            other = set(other)
+        for triple in list(other):
+            if triple in self:
+                self.discard(triple)
+            else:
+                self.add(triple)
+
+    def copy(self):
+        """Return a shallow copy of the graph."""
+        return Graph(self)
+
+    __copy__ = copy
+
+    def __reduce__(self):
+        # Rebuild the indexes rather than share or pickle them.
+        return (Graph, (list(self),))
+
+    def triples(self, subject=None, predicate=None, object_=None):
+        """Generate the triples matching the given terms.
+
+        None is a wildcard. The lookup is answered from the subject,
+        predicate or object index that is keyed by the given terms.
+
+        """
+        if subject is not None:
+            if predicate is not None:
+                if object_ is not None:
+                    triple = (subject, predicate, object_)
+                    if triple in self:
+                        yield triple
+                else:
+                    for object_ in self._spo.get(subject, {}).get(predicate,
+                                                                  ()):
+                        yield (subject, predicate, object_)
+            elif object_ is not None:
+                for predicate in self._osp.get(object_, {}).get(subject, ()):
+                    yield (subject, predicate, object_)
+            else:
+                for predicate, objects in self._spo.get(subject, {}).items():
+                    for object_ in objects:
+                        yield (subject, predicate, object_)
+        elif predicate is not None:
+            if object_ is not None:
+                for subject in self._pos.get(predicate, {}).get(object_, ()):
+                    yield (subject, predicate, object_)
+            else:
+                for object_, subjects in self._pos.get(predicate, {}).items():
+                    for subject in subjects:
+                        yield (subject, predicate, object_)
+        elif object_ is not None:
+            for subject, predicates in self._osp.get(object_, {}).items():
+                for predicate in predicates:
+                    yield (subject, predicate, object_)
+        else:
+            for triple in self:
+                yield triple
+
+    def subjects(self, predicate=None, object_=None):
+        """Return a set of the subjects of triples matching the terms."""
+        if predicate is None and object_ is None:
+            return set(self._spo)
+        return {triple[0] for triple in self.triples(None, predicate, object_)}
+
+    def predicates(self, subject=None, object_=None):
+        """Return a set of the predicates of triples matching the terms."""
+        if subject is None and object_ is None:
+            return set(self._pos)
+        return {triple[1] for triple in self.triples(subject, None, object_)}
+
+    def objects(self, subject=None, predicate=None):
+        """Return a set of the objects of triples matching the terms."""
+        if subject is None and predicate is None:
+            return set(self._osp)
+        return {triple[2] for triple in self.triples(subject, predicate, None)}
+
+    def _index(self, triple):
+        subject, predicate, object_ = triple
+        _index(self._spo, subject, predicate, object_)
+        _index(self._pos, predicate, object_, subject)
+        _index(self._osp, object_, subject, predicate)
+        if (isinstance(subject, BlankNode) or
+            isinstance(object_, BlankNode)):
+            self._unground.add(triple)
+            for term in triple:
+                if isinstance(term, BlankNode):
+                    self._bnodes.setdefault(term, set()).add(triple)
+        else:
+            self._ground.add(triple)
+        self._cache.clear()
+
+    def _unindex(self, triple):
+        subject, predicate, object_ = triple
+        _unindex(self._spo, subject, predicate, object_)
+        _unindex(self._pos, predicate, object_, subject)
+        _unindex(self._osp, object_, subject, predicate)
+        if triple in self._unground:
+            self._unground.discard(triple)
+            for term in set(triple):
+                if isinstance(term, BlankNode):
+                    triples = self._bnodes[term]
+                    triples.discard(triple)
+                    if not triples:
+                        del self._bnodes[term]
+        else:
+            self._ground.discard(triple)
+        self._cache.clear()
+
     def is_ground(self):
         """Return True if the graph contains no blank nodes, False otherwise."""
-        for triple in self._bnode_triples():
-            return False
-        return True
+        return not self._unground
     
     def nodes(self):
         """Return a set of the subjects and objects of triples in the graph."""
@@ -199,24 +442,10 @@ class Graph(set):
                 yield triple[2].datatype
 
     def _bnode_triples(self):
-        for triple in self:
-            if (isinstance(triple[0], BlankNode) or
-                isinstance(triple[2], BlankNode)):
-                yield triple
+        return iter(self._unground)
 
     def _ground_triples(self):
-        for triple in self:
-            if (not isinstance(triple[0], BlankNode) and
-                not isinstance(triple[2], BlankNode)):
-                yield triple
-
-    def _bnode_map(self, triples):
-        bnode_map = defaultdict(set)
-        for triple in triples:
-            for term in triple:
-                if isinstance(term, BlankNode):
-                    bnode_map[term].add(triple)
-        return bnode_map
+        return iter(self._ground)
 
     def _bnode_signatures(self, bnode_map):
         placeholders = {}
@@ -249,16 +478,13 @@ class Graph(set):
         return metasignature
 
     def _subgraph_bnode_comparator(self, a_signature, b_signature):
-        if len(a_signature) <= len(b_signature):
-            for a_triple in a_signature:
-                for b_triple in b_signature:
-                    if self._subgraph_triple_comparator(a_triple, b_triple):
-                        break
-                else:
-                    return False
-            return True
-        else:
-            return False
+        for a_triple in a_signature:
+            for b_triple in b_signature:
+                if self._subgraph_triple_comparator(a_triple, b_triple):
+                    break
+            else:
+                return False
+        return True
             
     def _subgraph_triple_comparator(self, a_triple, b_triple):
         for a_term, b_term in zip(a_triple, b_triple):
@@ -270,26 +496,284 @@ class Graph(set):
                 return False
         return True
 
-    def _bnode_bijections(self, a_signatures, b_signatures,
-                          comparator=operator.eq):
-        candidates = defaultdict(set)
-        for a_bnode, a_signature in a_signatures.items():
-            for b_bnode, b_signature in b_signatures.items():
-                if comparator(a_signature, b_signature):
-                    candidates[a_bnode].add(b_bnode)
-
-        if candidates:
-            product_args = [[(a_bnode, b_bnode) for b_bnode in b_bnodes]
-                            for a_bnode, b_bnodes in candidates.items()]
-            for pairs in product(*product_args):
-                bijection = {}
-                for a_bnode, b_bnode in pairs:
-                    if a_bnode not in bijection:
-                        bijection[a_bnode] = b_bnode
-                    else:
+    def _bnode_bijections(self, bnode_map, other, signatures,
+                          other_signatures, comparator=operator.eq):
+        domains = self._bnode_candidates(signatures, other_signatures,
+                                         comparator)
+        if domains is None:
+            return
+
+        # Assign one blank node at a time, always picking the one with the
+        # fewest remaining candidates. Each assignment checks the triples
+        # that become fully mapped and narrows the candidates of blank nodes
+        # sharing a triple with it. The trail records narrowed candidates so
+        # they can be restored when backtracking.
+        bijection = {}
+        used = set()
+        trail = []
+        queue = [(len(candidates), i, bnode)
+                 for i, (bnode, candidates) in enumerate(domains.items())]
+        heapq.heapify(queue)
+        counter = itertools.count(len(queue))
+
+        def select():
+            while queue:
+                size, i, bnode = heapq.heappop(queue)
+                if bnode not in bijection and size == len(domains[bnode]):
+                    return bnode
+
+        def push(bnode):
+            heapq.heappush(queue, (len(domains[bnode]), next(counter), bnode))
+
+        def undo(mark):
+            while len(trail) > mark:
+                bnode, candidates = trail.pop()
+                domains[bnode] = candidates
+                push(bnode)
+
+        def assign(bnode, other_bnode):
+            bijection[bnode] = other_bnode
+            used.add(other_bnode)
+            for subject, predicate, object_ in bnode_map[bnode]:
+                if subject in domains and subject not in bijection:
+                    unassigned = subject
+                    images = other.subjects(predicate, bijection.get(object_,
+                                                                     object_))
+                elif object_ in domains and object_ not in bijection:
+                    unassigned = object_
+                    images = other.objects(bijection.get(subject, subject),
+                                           predicate)
+                elif (bijection.get(subject, subject), predicate,
+                      bijection.get(object_, object_)) in other:
+                    continue
+                else:
+                    return False
+                candidates = domains[unassigned] & images
+                if not candidates:
+                    return False
+                elif len(candidates) < len(domains[unassigned]):
+                    trail.append((unassigned, domains[unassigned]))
+                    domains[unassigned] = candidates
+                    push(unassigned)
+            return True
+
+        bnode = select()
+        frames = [(bnode, iter(list(domains[bnode])), len(trail))]
+        while frames:
+            bnode, candidates, mark = frames[-1]
+            if bnode in bijection:
+                used.discard(bijection.pop(bnode))
+                undo(mark)
+            for other_bnode in candidates:
+                if other_bnode not in used:
+                    if assign(bnode, other_bnode):
                         break
+                    used.discard(bijection.pop(bnode))
+                    undo(mark)
+            else:
+                frames.pop()
+                push(bnode)
+                continue
+            next_bnode = select()
+            if next_bnode is None:
+                yield dict(bijection)
+            else:
+                frames.append((next_bnode, iter(list(domains[next_bnode])),
+                               len(trail)))
+
+    def _bnode_candidates(self, signatures, other_signatures, comparator):
+        # Blank nodes often share signatures, so compare each distinct pair
+        # of signatures only once.
+        groups = _group_signatures(signatures)
+        other_groups = _group_signatures(other_signatures)
+        candidates = {}
+        for signature, bnodes in groups.items():
+            if comparator is operator.eq:
+                other_bnodes = other_groups.get(signature)
+            else:
+                other_bnodes = set()
+                for other_signature, other_group in other_groups.items():
+                    if comparator(signature, other_signature):
+                        other_bnodes |= other_group
+            if not other_bnodes:
+                return None
+            for bnode in bnodes:
+                candidates[bnode] = other_bnodes
+        return candidates
+
+    def _canonical_bnode_triples(self):
+        canonical = self._cache.get('canonical')
+        if canonical is None:
+            canonical = self._cache['canonical'] = frozenset(
+                self._canonical_labelled_triples())
+        return canonical
+
+    def _canonical_labelled_triples(self):
+        edges = self._bnode_edges(self._bnodes)
+        # Blank nodes that don't share triples are labelled separately, with
+        # identical components told apart by the order they are found in.
+        occurrences = defaultdict(int)
+        for component in _bnode_components(edges):
+            triples = set()
+            for bnode in component:
+                triples.update(self._bnodes[bnode])
+            # Start with every blank node in the same colour class, then
+            # refine the classes by the colours of each blank node's
+            # neighbourhood.
+            colours = self._refine_colours(dict.fromkeys(component, 0), edges)
+            leaves = {}
+            self._canonical_search(colours, edges, triples, (), [], leaves)
+            form, labels, path, ordered = leaves['best']
+            key = (_digest(ordered), occurrences[form])
+            occurrences[form] += 1
+            bijection = {bnode: BlankNode(_canonical_label(_digest(
+                             (key, label.node_id))))
+                         for bnode, label in labels.items()}
+            for triple in self._apply_bijection(bijection, triples):
+                yield triple
+
+    def _bnode_edges(self, bnode_map):
+        # Ground terms are replaced by their digests, which are compared in
+        # the same way in every process.
+        edges = {}
+        for bnode, triples in bnode_map.items():
+            bnode_edges = edges[bnode] = []
+            for subject, predicate, object_ in triples:
+                predicate = _term_digest(predicate)
+                if subject == bnode and object_ == bnode:
+                    bnode_edges.append(('loop', predicate, 0))
+                elif subject == bnode:
+                    bnode_edges.append(('out', predicate,
+                                        _edge_term(object_)))
                 else:
-                    yield bijection
+                    bnode_edges.append(('in', predicate, _edge_term(subject)))
+        return edges
+
+    def _refine_colours(self, colours, edges, changed=None):
+        colours = dict(colours)
+        members = defaultdict(set)
+        for bnode, colour in colours.items():
+            members[colour].add(bnode)
+        if changed is None:
+            dirty = set(colours)
+        else:
+            dirty = _bnode_neighbours(changed, edges)
+        rounds = itertools.count()
+        while dirty:
+            round_ = next(rounds)
+            # Split each colour class by the neighbourhoods of its blank nodes
+            # that have a neighbour whose colour changed in the last round.
+            classes = defaultdict(lambda: defaultdict(set))
+            # The parts are keyed by the neighbourhoods themselves, which
+            # compare the same way in every process.
+            for bnode in dirty:
+                key = tuple(sorted(
+                    (direction, predicate, 1, colours[term])
+                    if isinstance(term, BlankNode)
+                    else (direction, predicate, 0, term)
+                    for direction, predicate, term in edges[bnode]))
+                classes[colours[bnode]][key].add(bnode)
+            changed = []
+            for colour, parts in classes.items():
+                unchanged = members[colour].difference(*parts.values())
+                if unchanged:
+                    parts[None] = unchanged
+                if len(parts) == 1:
+                    continue
+                # The largest part keeps its colour, so only the others need
+                # their neighbours to be refined again.
+                largest = max(parts, key=lambda key: (len(parts[key]),
+                                                      key is None, key or ()))
+                for key, bnodes in parts.items():
+                    if key != largest:
+                        new_colour = _digest((colour, key, round_))
+                        members[colour] -= bnodes
+                        members[new_colour] |= bnodes
+                        for bnode in bnodes:
+                            colours[bnode] = new_colour
+                        changed.extend(bnodes)
+            dirty = _bnode_neighbours(changed, edges)
+        return colours
+
+    def _canonical_search(self, colours, edges, triples, path, automorphisms,
+                          leaves):
+        cells = defaultdict(list)
+        for bnode, colour in colours.items():
+            cells[colour].append(bnode)
+        ties = [(len(bnodes), colour) for colour, bnodes in cells.items()
+                if len(bnodes) > 1]
+        if not ties:
+            return self._canonical_leaf(colours, triples, path, automorphisms,
+                                        leaves)
+
+        cell = cells[min(ties)[1]]
+        # Blank nodes with identical neighbourhoods can be swapped without
+        # changing the graph, so any order of them is as good as another.
+        neighbourhoods = {frozenset(_counts(edges[bnode])) for bnode in cell}
+        if len(neighbourhoods) == 1:
+            individualized = dict(colours)
+            for i, bnode in enumerate(cell):
+                individualized[bnode] = _digest((colours[bnode], len(path),
+                                                 i))
+            individualized = self._refine_colours(individualized, edges, cell)
+            return self._canonical_search(individualized, edges, triples,
+                                          path + tuple(cell), automorphisms,
+                                          leaves)
+
+        # Branch on each blank node in the smallest tied colour class,
+        # skipping those in the orbit of an already explored blank node under
+        # the automorphisms found so far that fix the current path.
+        explored = set()
+        num_automorphisms = None
+        for bnode in cell:
+            if num_automorphisms != len(automorphisms):
+                num_automorphisms = len(automorphisms)
+                orbits = _orbits(automorphisms, path)
+                explored_orbits = {orbits.find(other) for other in explored}
+            if orbits.find(bnode) in explored_orbits:
+                continue
+            individualized = dict(colours)
+            individualized[bnode] = _digest((colours[bnode], len(path)))
+            individualized = self._refine_colours(individualized, edges,
+                                                  [bnode])
+            depth = self._canonical_search(individualized, edges, triples,
+                                           path + (bnode,), automorphisms,
+                                           leaves)
+            if depth is not None and depth < len(path):
+                return depth
+            explored.add(bnode)
+            explored_orbits.add(orbits.find(bnode))
+
+    def _canonical_leaf(self, colours, triples, path, automorphisms, leaves):
+        labels = {bnode: BlankNode(_canonical_label(colour))
+                  for bnode, colour in colours.items()}
+        form = frozenset(self._apply_bijection(labels, triples))
+        for key in ('first', 'best'):
+            leaf = leaves.get(key)
+            if leaf is not None and leaf[0] == form:
+                # The same form from two labellings is an automorphism, which
+                # maps the rest of the subtree where the two paths diverge
+                # onto the already explored one.
+                inverse = {label: bnode for bnode, label in leaf[1].items()}
+                automorphisms.append({bnode: inverse[label]
+                                      for bnode, label in labels.items()})
+                depth = 0
+                for bnode, other in zip(path, leaf[2]):
+                    if bnode != other:
+                        break
+                    depth += 1
+                return depth
+        leaves.setdefault('first', (form, labels, path))
+        best = leaves.get('best')
+        # Forms are ordered by their triples, with blank nodes given by the
+        # colours their labels are made from and ground terms by digests.
+        term_key = lambda term: (colours[term] if isinstance(term, BlankNode)
+                                 else _term_digest(term))
+        ordered = sorted((term_key(subject), _term_digest(predicate),
+                          term_key(object_))
+                         for subject, predicate, object_ in triples)
+        if best is None or ordered < best[3]:
+            leaves['best'] = (form, labels, path, ordered)
 
     def _apply_bijection(self, bijection, triples):
         for subject, predicate, object_ in triples:
@@ -299,3 +783,81 @@ class Graph(set):
                 object_ = bijection[object_]
             yield (subject, predicate, object_)
 
+def _index(index, first, second, third):
+    index.setdefault(first, {}).setdefault(second, set()).add(third)
+
+def _unindex(index, first, second, third):
+    seconds = index[first]
+    thirds = seconds[second]
+    thirds.discard(third)
+    if not thirds:
+        del seconds[second]
+        if not seconds:
+            del index[first]
+
+def _group_signatures(signatures):
+    groups = defaultdict(set)
+    for bnode, signature in signatures.items():
+        groups[frozenset(signature)].add(bnode)
+    return groups
+
+def _bnode_components(edges):
+    unvisited = set(edges)
+    while unvisited:
+        component = {unvisited.pop()}
+        frontier = component
+        while frontier:
+            frontier = _bnode_neighbours(frontier, edges) - component
+            component |= frontier
+        unvisited -= component
+        yield component
+
+def _bnode_neighbours(bnodes, edges):
+    return {term for bnode in bnodes for direction, predicate, term
+            in edges[bnode] if isinstance(term, BlankNode)}
+
+def _counts(items):
+    counts = defaultdict(int)
+    for item in items:
+        counts[item] += 1
+    return counts.items()
+
+def _canonical_label(colour):
+    return 'c{:016x}'.format(colour & 0xffffffffffffffff)
+
+def _digest(value):
+    # A 64-bit hash of the repr of value that, unlike hash(), is the same
+    # in every process, so canonical labels can be compared across runs.
+    # value is made of terms, strings, numbers, tuples and lists, whose
+    # reprs do not depend on the hash seed; sets must be sorted first.
+    data = repr(value).encode('utf-8')
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(),
+                          'big')
+
+@lru_cache(maxsize=1 << 16)
+def _term_digest(term):
+    return _digest(term)
+
+def _edge_term(term):
+    return term if isinstance(term, BlankNode) else _term_digest(term)
+
+class _UnionFind(dict):
+    def find(self, item):
+        parent = self.get(item, item)
+        if parent == item:
+            return item
+        root = self[item] = self.find(parent)
+        return root
+
+    def union(self, a, b):
+        a, b = self.find(a), self.find(b)
+        if a != b:
+            self[a] = b
+
+def _orbits(automorphisms, path):
+    orbits = _UnionFind()
+    for automorphism in automorphisms:
+        if all(automorphism[bnode] == bnode for bnode in path):
+            for bnode, image in automorphism.items():
+                orbits.union(bnode, image)
+    return orbits
@@ -0,0 +1,77 @@
+import weakref
+
+from rdf.blanknode import BlankNode
+from rdf.uri import URI
+from rdf.literal import PlainLiteral, TypedLiteral
+
+
+class TermTable:
+    """An interning table of URIs, literals and labelled blank nodes.
+
+    Equal terms requested from the same table are the same object, so
+    repeated terms share memory and compare equal by identity. Terms are
+    held weakly and are dropped from the table once nothing else uses
+    them. Blank nodes without a node ID are only equal to themselves, so
+    they are never interned.
+
+    """
+    def __init__(self):
+        self._terms = weakref.WeakValueDictionary()
+
+    def __len__(self):
+        return len(self._terms)
+
+    def uri(self, uri):
+        """Return the shared URI equal to uri."""
+        key = str(uri)
+        term = self._terms.get(key)
+        if term is None:
+            term = self._terms[key] = uri if type(uri) is URI else URI(uri)
+        return term
+
+    def plain_literal(self, lexical_form, language=None):
+        """Return the shared PlainLiteral with the given form and language."""
+        key = ('P', lexical_form, language and language.lower())
+        term = self._terms.get(key)
+        if term is None:
+            term = self._terms[key] = PlainLiteral(lexical_form, language)
+        return term
+
+    def typed_literal(self, lexical_form, datatype):
+        """Return the shared TypedLiteral with the given form and datatype."""
+        key = ('T', lexical_form, str(datatype))
+        term = self._terms.get(key)
+        if term is None:
+            term = TypedLiteral(lexical_form, self.uri(datatype))
+            self._terms[key] = term
+        return term
+
+    def blank_node(self, node_id):
+        """Return the shared BlankNode with the given node ID."""
+        key = ('B', node_id)
+        term = self._terms.get(key)
+        if term is None:
+            term = self._terms[key] = BlankNode(node_id)
+        return term
+
+    def intern(self, term):
+        """Return the shared term equal to term.
+
+        Values that are not interned, such as blank nodes without a node
+        ID, are returned unchanged.
+
+        """
+        if isinstance(term, URI):
+            key = str(term)
+        elif isinstance(term, PlainLiteral):
+            key = ('P', term.lexical_form, term.language)
+        elif isinstance(term, TypedLiteral):
+            key = ('T', term.lexical_form, str(term.datatype))
+        elif isinstance(term, BlankNode) and term.node_id is not None:
+            key = ('B', term.node_id)
+        else:
+            return term
+        shared = self._terms.get(key)
+        if shared is None:
+            shared = self._terms[key] = term
+        return shared
@@ -10,7 +10,7 @@ from rdf.exceptions import UnsupportedDatatype, IllTypedLiteral
 
 
 class Literal:
-    __slots__ = 'lexical_form'
+    __slots__ = ('lexical_form', '_hash', '__weakref__')
 
     def __new__(cls, lexical_form, language_or_datatype=None):
         if cls is Literal:
@@ -21,7 +21,14 @@ class Literal:
         return super().__new__(cls)
 
     def __init__(self, lexical_form):
-        self.lexical_form = lexical_form
+        object.__setattr__(self, 'lexical_form', lexical_form)
+
+    # Literals are immutable, so subclasses compute their hash once.
+    def __setattr__(self, name, value):
+        raise AttributeError("{} is immutable".format(type(self).__name__))
+
+    def __delattr__(self, name):
+        raise AttributeError("{} is immutable".format(type(self).__name__))
 
     def __lt__(self, other):
         if other is None or isinstance(other, (BlankNode, URI)):
@@ -40,7 +47,14 @@ class PlainLiteral(Literal):
 
     def __init__(self, lexical_form, language=None):
         super().__init__(lexical_form)
-        self.language = language and language.lower()
+        language = language and language.lower()
+        object.__setattr__(self, 'language', language)
+        object.__setattr__(self, '_hash', (hash(PlainLiteral) ^
+                                           hash(lexical_form) ^
+                                           hash(language)))
+
+    def __reduce__(self):
+        return (PlainLiteral, (self.lexical_form, self.language))
 
     def __repr__(self):
         if self.language is None:
@@ -50,14 +64,13 @@ class PlainLiteral(Literal):
                                                      self.language)
 
     def __eq__(self, other):
-        return (isinstance(other, PlainLiteral) and
-                other.lexical_form == self.lexical_form and
-                other.language == self.language)
+        return (self is other or
+                (isinstance(other, PlainLiteral) and
+                 other.lexical_form == self.lexical_form and
+                 other.language == self.language))
 
     def __hash__(self):
-        return (hash(PlainLiteral) ^
-                hash(self.lexical_form) ^
-                hash(self.language))
+        return self._hash
     
     def __lt__(self, other):
         if (isinstance(other, PlainLiteral) and
@@ -93,23 +106,28 @@ class TypedLiteral(Literal):
         if isinstance(datatype, str):
             if not isinstance(datatype, URI):
                 datatype = URI(datatype)
-            self.datatype = datatype
+            object.__setattr__(self, 'datatype', datatype)
+            object.__setattr__(self, '_hash', (hash(TypedLiteral) ^
+                                               hash(lexical_form) ^
+                                               hash(datatype)))
         else:
             raise TypeError("datatype must be a string")
 
+    def __reduce__(self):
+        return (TypedLiteral, (self.lexical_form, self.datatype))
+
     def __repr__(self):
         return "TypedLiteral({!r}, {!r})".format(self.lexical_form,
                                                  self.datatype)
 
     def __eq__(self, other):
-        return (isinstance(other, TypedLiteral) and
-                other.lexical_form == self.lexical_form and
-                other.datatype == self.datatype)
+        return (self is other or
+                (isinstance(other, TypedLiteral) and
+                 other.lexical_form == self.lexical_form and
+                 other.datatype == self.datatype))
 
     def __hash__(self):
-        return (hash(TypedLiteral) ^
-                hash(self.lexical_form) ^
-                hash(self.datatype))
+        return self._hash
 
     def __lt__(self, other):
         if (isinstance(other, TypedLiteral) and
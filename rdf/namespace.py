@@ -2,18 +2,47 @@ from rdf.uri import URI
 
 
 class Namespace(URI):
+    """A URI prefix whose items and attributes are URIs in the namespace.
+
+    Each URI is created once and shared by later lookups. If a TermTable
+    is given, the URIs are interned in it, so they are also shared with
+    the terms of parsers using the same table.
+
+    """
+    def __new__(cls, uri='', terms=None):
+        return super().__new__(cls, uri)
+
+    def __init__(self, uri='', terms=None):
+        self.__terms = terms
+        self.__uris = {}
+
     def __getitem__(self, local_name):
         if isinstance(local_name, str):
-            return URI(self + local_name)
+            return self.__uri(local_name)
         else:
             return super().__getitem__(local_name)
 
     def __getattr__(self, local_name):
-        return URI(self + local_name)
+        if local_name.startswith('_Namespace__'):
+            raise AttributeError(local_name)
+        return self.__uri(local_name)
 
     def __repr__(self):
         return "Namespace({!r})".format(str(self))
 
+    def __reduce__(self):
+        return (self.__class__, (str(self),))
+
+    def __uri(self, local_name):
+        uri = self.__uris.get(local_name)
+        if uri is None:
+            if self.__terms is None:
+                uri = URI(self + local_name)
+            else:
+                uri = self.__terms.uri(self + local_name)
+            self.__uris[local_name] = uri
+        return uri
+
 
 RDF = Namespace('http://www.w3.org/1999/02/22-rdf-syntax-ns#')
 RDFS = Namespace('http://www.w3.org/2000/01/rdf-schema#')
@@ -22,4 +51,3 @@ XML = Namespace('http://www.w3.org/XML/1998/namespace')
 XSD = Namespace('http://www.w3.org/2001/XMLSchema#')
 OWL = Namespace('http://www.w3.org/2002/07/owl#')
 FN = Namespace('http://www.w3.org/2005/xpath-functions#')
-
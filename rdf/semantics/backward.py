@@ -0,0 +1,207 @@
+import itertools
+from collections import defaultdict
+
+from rdf.blanknode import BlankNode
+from rdf.literal import TypedLiteral
+from rdf.graph import Graph
+from rdf.semantics.rule import Context, _same_token
+from rdf.semantics.type import Type, TypeDescriptor
+
+
+class Prover:
+    """Answer goals against the closure of a graph by backward chaining.
+
+    A goal is a triple in which None stands for any term. It is answered
+    from the graph and from the consequents of rules that can give it,
+    whose antecedents become subgoals in turn. The answers to each goal are
+    tabled, and a goal is expanded again only when a subgoal it used has
+    new answers, so only the part of the closure that could answer the
+    goals is ever computed. A subgoal whose unbound terms are not used
+    again only needs one answer, and is not expanded once it has one.
+
+    Rules that generalize blank nodes to new blank nodes without end, such
+    as se1, give goals with unbound positions endless answers.
+
+    """
+    def __init__(self, entailment, graph, context=None):
+        self.rules = [rule for rule in entailment.rules if rule.antecedent]
+        self.graph = graph if hasattr(graph, 'triples') else Graph(graph)
+        # Axioms and the consequents of rules without antecedents.
+        self.given = Graph(entailment.axioms)
+        for rule in entailment.rules:
+            if not rule.antecedent:
+                self.given.update(rule.consequent)
+        self.context = Context() if context is None else context
+        self.context.types.update(term for triple in self.given
+                                  for term in triple if isinstance(term, Type))
+        # Answers by (goal, exists); exists is True if one answer will do.
+        self._table = {}
+        self._dependents = defaultdict(set)
+        self._pending = set()
+        self._expanding = None
+
+    def solve(self, goal, exists=False):
+        """Return the set of entailed triples that match goal.
+
+        Triples with Type terms, such as axioms about cmp, match the goals
+        whose terms they contain. If exists is True, the set may stop at
+        the first answer found.
+
+        """
+        key = (tuple(goal), exists)
+        if self._expanding is not None:
+            self._dependents[key].add(self._expanding)
+        answers = self._table.get(key)
+        if answers is None:
+            answers = self._lookup(key[0])
+            if exists:
+                answers = itertools.islice(answers, 1)
+            answers = self._table[key] = set(answers)
+            self._pending.add(key)
+            if self._expanding is None:
+                try:
+                    while self._pending:
+                        self._expanding = self._pending.pop()
+                        self._expand(self._expanding)
+                finally:
+                    self._expanding = None
+        return answers
+
+    def fragment(self, e):
+        """Return the entailed triples that match some triple of e.
+
+        The blank nodes of e match any term, so e is entailed if it holds
+        in the fragment.
+
+        """
+        fragment = Graph()
+        for triple in e:
+            goal = tuple(None if isinstance(term, BlankNode) else term
+                         for term in triple)
+            fragment.update(self.solve(goal, None not in goal))
+        return fragment
+
+    def _lookup(self, goal):
+        # Look the goal up by its terms, and by the Types containing them.
+        keys = []
+        for term in goal:
+            if term is None or isinstance(term, (Type, TypedLiteral)):
+                keys.append((None,))
+            else:
+                keys.append((term,) + tuple(type_ for type_ in
+                                            self.context.types
+                                            if term in type_))
+        for key in itertools.product(*keys):
+            for graph in (self.graph, self.given):
+                for triple in graph.triples(*key):
+                    if _fits(goal, triple):
+                        yield triple
+
+    def _expand(self, key):
+        goal, exists = key
+        answers = self._table[key]
+        for rule in self.rules:
+            for pattern in rule.consequent:
+                if exists and answers:
+                    return
+                binding = self._unify(pattern, goal)
+                if binding is None:
+                    continue
+                # Any answer to an existential goal will do, so the terms
+                # it leaves unbound are not needed.
+                needed = frozenset() if exists else frozenset(_needed(pattern))
+                plan = _plan(rule.antecedent, binding)
+                for joined in self._join(plan, binding, needed):
+                    triple = pattern.tokenize(joined, self.context)
+                    if triple not in answers and _fits(goal, triple):
+                        answers.add(triple)
+                        self._pending.update(self._dependents[key])
+
+    def _unify(self, pattern, goal):
+        # A Type in the goal, such as cmp, is bound as the value of the
+        # variable in its place, which the antecedents then narrow down.
+        binding = pattern.unify(tuple(None if isinstance(term, Type) else term
+                                      for term in goal), self.context)
+        if binding is None:
+            return None
+        for type_or_token, term in zip(pattern, goal):
+            if not isinstance(term, Type) or \
+                    isinstance(type_or_token, TypeDescriptor):
+                continue
+            elif isinstance(type_or_token, Type):
+                binding.setdefault(type_or_token, term)
+            elif not _fits((term,), (type_or_token,)):
+                return None
+        return binding
+
+    def _join(self, plan, binding, needed):
+        if not plan:
+            yield binding
+            return
+        pattern, rest = plan[0], plan[1:]
+        # If the terms this pattern would bind are not used by the rest of
+        # the plan or the consequent, any one match will do.
+        used = needed.union(*(other.variables for other in rest))
+        exists = not any(variable in used and
+                         _is_free(binding.get(variable))
+                         for variable in pattern.variables)
+        for triple in list(self.solve(_goal(pattern, binding), exists)):
+            extended = pattern.extend(binding, triple)
+            if extended is not None:
+                yield from self._join(rest, extended, needed)
+                if exists:
+                    return
+
+def _plan(patterns, bound):
+    # As Rule._plan, but ties go to the pattern with its object fixed, then
+    # its subject: asking for the instances of a class stays within the
+    # class, while asking for all the classes of a resource reaches
+    # rdfs:Resource and from there the whole closure.
+    patterns = set(patterns)
+    bound = set(bound)
+    plan = []
+    def key(pattern):
+        return (pattern.selectivity(bound), _is_fixed(pattern[2], bound),
+                _is_fixed(pattern[0], bound))
+    while patterns:
+        pattern = max(patterns, key=key)
+        patterns.remove(pattern)
+        bound |= pattern.variables
+        plan.append(pattern)
+    return plan
+
+def _is_fixed(type_or_token, bound):
+    return type_or_token in bound or not isinstance(type_or_token, Type)
+
+def _goal(pattern, binding):
+    goal = []
+    for type_or_token in pattern:
+        if isinstance(type_or_token, Type):
+            goal.append(binding.get(type_or_token))
+        else:
+            goal.append(type_or_token)
+    return tuple(goal)
+
+def _is_free(value):
+    return value is None or isinstance(value, Type)
+
+def _needed(pattern):
+    for type_or_token in pattern:
+        if isinstance(type_or_token, TypeDescriptor):
+            yield type_or_token.type
+        elif isinstance(type_or_token, Type):
+            yield type_or_token
+
+def _fits(goal, triple):
+    for term, token in zip(goal, triple):
+        if term is None:
+            continue
+        elif isinstance(term, Type):
+            if token is not term and token not in term:
+                return False
+        elif isinstance(token, Type):
+            if term not in token:
+                return False
+        elif not _same_token(term, token):
+            return False
+    return True
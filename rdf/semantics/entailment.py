@@ -1,8 +1,13 @@
+from rdf.blanknode import BlankNode
+from rdf.literal import TypedLiteral
 from rdf.namespace import RDF, RDFS, XSD
-from rdf.graph import Graph
-from rdf.semantics.rule import Rule, Pattern, Context
-from rdf.semantics.type import aaa, bbb, ddd, eee, uuu, vvv, www, zzz, xxx, \
-                               yyy, lll, llp, llt, lls, llx, cmp
+from rdf.semantics.rule import Rule, Pattern, Context, _same_token, _value, \
+                               _NO_VALUE
+from rdf.semantics.rete import Network
+from rdf.semantics.backward import Prover
+from rdf.semantics.parallel import ParallelSession
+from rdf.semantics.type import Type, aaa, bbb, ddd, eee, uuu, vvv, www, zzz, \
+                               xxx, yyy, lll, llp, llt, lls, llx, cmp
 
 
 class Entailment:
@@ -10,29 +15,164 @@ class Entailment:
         self.rules = list(rules)
         self.axioms = {Pattern(axiom) for axiom in axioms}
         self.conditions = list(conditions)
+        self._network = None
 
-    def entails(self, s, e):
+    def compile(self):
+        """Return the rules compiled into a Network.
+
+        The network is kept and reused until the rules are changed.
+
+        """
+        if self._network is None or self._network.rules != self.rules:
+            self._network = Network(self.rules)
+        return self._network
+
+    def entails(self, s, e, backward=False, processes=None, stats=None):
+        """Return True if the graph s entails the graph e.
+
+        By default the closure of s is computed forwards until it contains
+        e. If backward is True, only the triples that could match e are
+        derived, working backwards from e; this is much cheaper when e is
+        small and s is large. If processes is given, each round of the
+        forward closure is evaluated by that many worker processes. If a
+        Stats is given, what each rule does in the forward closure is
+        recorded in it.
+
+        """
         if s >= e:
             return True
-        entailed = Graph(s | self.axioms)
-        context = Context()
-        num_triples = -1
-        while len(entailed) != num_triples:
-            num_triples = len(entailed)
-            for rule in self.rules:
-                entailed.update(rule.apply(entailed, context))
-                if len(entailed) != num_triples:
-                    if e <= entailed:
-                        return True
+        elif backward:
+            fragment = Prover(self, s).fragment(e)
+            conclusion = _Conclusion(e)
+            conclusion.update(fragment)
+            return conclusion.holds(fragment, final=True)
+        elif processes is not None:
+            with ParallelSession(self.rules, Context(), processes,
+                                 stats) as session:
+                return self._forward(session, s, e)
+        return self._forward(self.compile().session(Context(), stats), s, e)
+
+    def _forward(self, session, s, e):
+        # Each round adds the triples derived in the round before, which
+        # are only joined with the matches they take part in. The
+        # conclusion is checked against the triples each round adds.
+        conclusion = _Conclusion(e)
+        added = s | self.axioms
+        derived = session.add(added)
+        while True:
+            conclusion.update(added)
+            if conclusion.holds(session.graph):
+                return True
+            elif not derived:
+                return conclusion.holds(session.graph, final=True)
+            added = derived
+            derived = session.add(derived)
+
+class _Conclusion:
+    # The triples of a conclusion graph that are still to be entailed.
+    # Ground triples are crossed off as they are derived; the triples with
+    # blank nodes are embedded in the entailed graph by index lookups once
+    # the ground triples hold. Entailed triples with Type terms, such as
+    # axioms about cmp, stand for all the triples they match.
+    def __init__(self, e):
+        # Ground triples by _canonical, as typed literals with equal values
+        # give each other.
+        self.missing = {}
+        self.open = []
         for triple in e:
-            if triple not in entailed:
-                for entailed_triple in entailed:
-                    pattern = Pattern(entailed_triple)
-                    if pattern.matches(triple):
+            if any(isinstance(term, BlankNode) for term in triple):
+                self.open.append(triple)
+            else:
+                self.missing.setdefault(_canonical(triple), []).append(triple)
+        self.predicates = {triple[1] for triple in self.open}
+        self.patterns = []
+        self._changed = True
+
+    def update(self, triples):
+        """Cross off the conclusion triples that triples give."""
+        for triple in triples:
+            if self.missing:
+                self.missing.pop(_canonical(triple), None)
+            if any(isinstance(term, Type) for term in triple):
+                pattern = Pattern(triple)
+                self.patterns.append(pattern)
+                self.missing = {key: missing
+                                for key, missing in self.missing.items()
+                                if not all(pattern.matches(triple)
+                                           for triple in missing)}
+                self._changed = True
+            elif triple[1] in self.predicates:
+                self._changed = True
+
+    def lookup(self, entailed):
+        """Cross off the ground triples that are in the graph entailed.
+
+        Unlike update, which is given every entailed triple, each missing
+        triple is looked up in the indexes of entailed.
+
+        """
+        for key, missing in list(self.missing.items()):
+            # Typed literals are compared by value, so they are not looked up.
+            terms = tuple(None if isinstance(term, TypedLiteral) else term
+                          for term in missing[0])
+            if any(_canonical(match) == key
+                   for match in entailed.triples(*terms)):
+                del self.missing[key]
+
+    def holds(self, entailed, final=False):
+        """Return True if the whole conclusion holds in entailed.
+
+        The blank node triples are only searched for again if triples
+        that could match them have been added, unless final is True.
+
+        """
+        if self.missing:
+            return False
+        elif not self.open:
+            return True
+        elif not (self._changed or final):
+            return False
+        self._changed = False
+        return self._embed(self.open, entailed, {})
+
+    def _embed(self, triples, entailed, binding):
+        if not triples:
+            return True
+        triple, rest = triples[0], triples[1:]
+        # Typed literals are compared by value, so they are not looked up.
+        key = tuple(binding.get(term) if isinstance(term, BlankNode) else
+                    None if isinstance(term, TypedLiteral) else term
+                    for term in triple)
+        for match in entailed.triples(*key):
+            extended = dict(binding)
+            for term, token in zip(triple, match):
+                if isinstance(term, BlankNode):
+                    if extended.setdefault(term, token) != token:
                         break
-                else:
-                    return False
-        return True
+                elif isinstance(term, TypedLiteral) and \
+                        not _same_token(term, token):
+                    break
+            else:
+                if self._embed(rest, entailed, extended):
+                    return True
+        # Unbound blank nodes can also be matched by a pattern as they are.
+        triple = tuple(binding.get(term, term) for term in triple)
+        for pattern in self.patterns:
+            if pattern.matches(triple) and \
+                    self._embed(rest, entailed, binding):
+                return True
+        return False
+
+def _canonical(triple):
+    # The triple with each typed literal that has a value replaced by it.
+    canonical = []
+    for term in triple:
+        if isinstance(term, TypedLiteral):
+            value = _value(term)
+            if value is not _NO_VALUE:
+                term = (TypedLiteral, value)
+        canonical.append(term)
+    return tuple(canonical)
 
 # Simple entailment rules
 # http://www.w3.org/TR/rdf-mt/#simpleRules
@@ -0,0 +1,221 @@
+import multiprocessing
+import os
+import time
+from array import array
+
+from rdf.graph import Graph
+from rdf.semantics.rule import Context
+from rdf.semantics.type import Type
+
+
+class ParallelSession:
+    """Apply rules one round at a time in worker processes.
+
+    Like a Rete Session, adding triples returns the triples they derive,
+    without adding them. Each round is evaluated semi-naively: every
+    antecedent pattern of every rule is matched against the triples added
+    in the round, and joined with the rest of the graph, as a separate
+    task. The tasks are shared out among workers that are forked on the
+    first round and kept until the session is closed.
+
+    Terms are numbered in a dictionary kept by the session. Each worker
+    holds its own image of the graph, which it inherits when it is forked;
+    after that, each round only sends the workers the terms that are new
+    to the dictionary and the round's triples as an array of term IDs.
+    Workers return the matches as tuples of term IDs, so blank nodes keep
+    their identity. The consequents are made and merged in this process,
+    which keeps the allocations of the context.
+
+    If processes cannot be forked, the tasks are evaluated in turn. If a
+    Stats is given, the session records what each rule does in it. The
+    session is a context manager, which closes it on exit.
+
+    """
+    def __init__(self, rules, context=None, processes=None, stats=None):
+        self.rules = [rule for rule in rules if rule.antecedent]
+        self.facts = {pattern for rule in rules if not rule.antecedent
+                      for pattern in rule.consequent}
+        self.context = Context() if context is None else context
+        self.processes = processes
+        self.stats = stats
+        self.graph = Graph()
+        self._terms = []
+        self._ids = {}
+        self._seen = set()
+        self._started = False
+        # The variables of each rule, in the order their values are sent.
+        self._variables = [sorted(set().union(*(pattern.variables for pattern
+                                                in rule.antecedent)),
+                                  key=id)
+                           for rule in self.rules]
+        self._tasks = [(i, pattern) for i, rule in enumerate(self.rules)
+                       for pattern in rule.antecedent]
+        # (process, connection) of each worker, once they are forked, and
+        # the number of terms the workers have been sent.
+        self._workers = None
+        self._sent = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def add(self, triples):
+        """Add triples to the graph and return those they derive."""
+        start = time.perf_counter()
+        size = len(self.graph)
+        self._seen = set()
+        delta = Graph(triple for triple in triples
+                      if triple not in self.graph)
+        self.graph.update(delta)
+        for triple in delta:
+            for term in triple:
+                if term not in self._ids:
+                    self._ids[term] = len(self._terms)
+                    self._terms.append(term)
+                    if isinstance(term, Type):
+                        self.context.types.add(term)
+        derived = []
+        if not self._started:
+            derived.extend(self.facts)
+            self._started = True
+        if delta:
+            for i, matches, elapsed in self._evaluate(delta):
+                if self.stats is not None:
+                    stats = self.stats.rule(self.rules[i])
+                    stats.firings += len(matches)
+                    stats.join_time += elapsed
+                derived.extend(self._consequents(i, matches))
+        derived = Graph(triple for triple in derived
+                        if triple not in self.graph)
+        if self.stats is not None:
+            self.stats.end_round(len(self.graph) - size, len(derived),
+                                 time.perf_counter() - start)
+        return derived
+
+    def close(self):
+        """Stop the worker processes, if any were started."""
+        workers, self._workers = self._workers, None
+        for process, connection in workers or ():
+            try:
+                connection.send(None)
+            except OSError:
+                pass
+            connection.close()
+        for process, connection in workers or ():
+            process.join()
+
+    def _evaluate(self, delta):
+        # Return (rule index, matches, time) for every task of the round.
+        if self._workers is None:
+            self._workers = self._fork()
+        if not self._workers:
+            return [_evaluate(self, delta, task)
+                    for task in range(len(self._tasks))]
+        ids = self._ids
+        encoded = array('q', [ids[term] for triple in delta
+                              for term in triple])
+        message = (self._terms[self._sent:], encoded)
+        self._sent = len(self._terms)
+        for process, connection in self._workers:
+            connection.send(message)
+        results = []
+        for process, connection in self._workers:
+            result = connection.recv()
+            if isinstance(result, BaseException):
+                self.close()
+                raise result
+            results.extend(result)
+        return results
+
+    def _fork(self):
+        # Start the workers, each with every processes-th task, or return
+        # no workers if processes cannot be forked.
+        if 'fork' not in multiprocessing.get_all_start_methods():
+            return []
+        count = self.processes or os.cpu_count() or 1
+        count = min(count, len(self._tasks))
+        context = multiprocessing.get_context('fork')
+        # The workers inherit the terms and graph as they are now.
+        self._sent = len(self._terms)
+        workers = []
+        for k in range(count):
+            connection, child = context.Pipe()
+            process = context.Process(target=_work,
+                                      args=(self, child, range(k, len(
+                                          self._tasks), count)),
+                                      daemon=True)
+            process.start()
+            child.close()
+            workers.append((process, connection))
+        return workers
+
+    def _consequents(self, i, matches):
+        rule = self.rules[i]
+        variables = self._variables[i]
+        terms = self._terms
+        stats = None if self.stats is None else self.stats.rule(rule)
+        start = time.perf_counter()
+        triples = []
+        for ids in matches:
+            binding = {variable: terms[term_id]
+                       for variable, term_id in zip(variables, ids)}
+            for pattern in rule.consequent:
+                triples.append(pattern.tokenize(binding, self.context))
+        if stats is not None:
+            stats.tokenize_time += time.perf_counter() - start
+            for triple in triples:
+                if triple in self.graph or triple in self._seen:
+                    stats.duplicates += 1
+                else:
+                    self._seen.add(triple)
+                    stats.triples += 1
+        return triples
+
+def _work(session, connection, tasks):
+    # The loop of a worker process. Each message gives the new terms and
+    # the round's triples, which are added to the worker's image of the
+    # graph before its tasks are evaluated; None ends the loop.
+    terms, ids, types = session._terms, session._ids, session.context.types
+    while True:
+        try:
+            message = connection.recv()
+        except EOFError:
+            break
+        if message is None:
+            break
+        try:
+            new_terms, encoded = message
+            for term in new_terms:
+                ids[term] = len(terms)
+                terms.append(term)
+                if isinstance(term, Type):
+                    types.add(term)
+            delta = Graph(zip(map(terms.__getitem__, encoded[0::3]),
+                              map(terms.__getitem__, encoded[1::3]),
+                              map(terms.__getitem__, encoded[2::3])))
+            session.graph.update(delta)
+            result = [_evaluate(session, delta, task) for task in tasks]
+        except Exception as error:
+            result = error
+        connection.send(result)
+    connection.close()
+
+def _evaluate(session, delta, task):
+    # Match one antecedent pattern of a rule in the round's delta, and
+    # join the rule's other patterns in the graph.
+    start = time.perf_counter()
+    i, pattern = session._tasks[task]
+    rule = session.rules[i]
+    variables = session._variables[i]
+    ids = session._ids
+    context = Context()
+    context.types = session.context.types
+    plan = rule._plan(rule.antecedent - {pattern}, pattern.variables)
+    matches = set()
+    for binding in pattern.search(delta, {}, context.types):
+        for joined in rule._join(plan, binding, session.graph, context):
+            matches.add(tuple(ids[joined[variable]]
+                              for variable in variables))
+    return i, matches, time.perf_counter() - start
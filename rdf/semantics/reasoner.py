@@ -0,0 +1,116 @@
+from rdf.graph import Graph
+from rdf.semantics.rule import Context
+from rdf.semantics.entailment import _Conclusion
+from rdf.semantics.type import Type
+
+
+class Reasoner:
+    """The closure of a graph under an Entailment, kept up to date.
+
+    The closure is materialized once, and entailment checks and pattern
+    queries are answered from it. Premise triples can be added and removed
+    afterwards: additions are propagated semi-naively from the new
+    triples, and removals use delete and rederive (DRed), so neither
+    recomputes the closure. The entailment's rules must have a finite
+    closure, which rules that generalize blank nodes, such as se1, do not.
+
+    """
+    def __init__(self, entailment, triples=()):
+        self.entailment = entailment
+        self.premises = Graph(triples)
+        self.closure = Graph()
+        self.context = Context()
+        # The entailed triples with Type terms, which stand for all the
+        # triples they match.
+        self._patterns = set()
+        self._add(self.premises | entailment.axioms, initial=True)
+
+    def __repr__(self):
+        return "<Reasoner of {} premises, {} entailed triples>".format(
+            len(self.premises), len(self.closure))
+
+    def __len__(self):
+        return len(self.closure)
+
+    def __iter__(self):
+        return iter(self.closure)
+
+    def __contains__(self, triple):
+        return triple in self.closure
+
+    def triples(self, subject=None, predicate=None, object_=None):
+        """Generate the entailed triples matching the given terms."""
+        return self.closure.triples(subject, predicate, object_)
+
+    def entails(self, e):
+        """Return True if the premises entail the graph e.
+
+        The triples of e are looked up in the closure's indexes, so the
+        cost depends on e rather than on the size of the closure.
+
+        """
+        conclusion = _Conclusion(e)
+        conclusion.update(self._patterns)
+        conclusion.lookup(self.closure)
+        return conclusion.holds(self.closure, final=True)
+
+    def add(self, triples):
+        """Add premise triples and the triples they entail."""
+        triples = Graph(triple for triple in triples
+                        if triple not in self.premises)
+        self.premises.update(triples)
+        self._add(triples)
+
+    def remove(self, triples):
+        """Remove premise triples and the triples only they entail."""
+        removed = Graph(triple for triple in triples
+                        if triple in self.premises)
+        self.premises -= removed
+        rules = self.entailment.rules
+        # Delete everything derived from the removed triples...
+        deleted = Graph(triple for triple in removed
+                        if not self._is_given(triple))
+        delta = deleted
+        while delta:
+            derived = Graph()
+            for rule in rules:
+                for triple in rule.apply(self.closure, self.context, delta):
+                    if (triple in self.closure and triple not in deleted and
+                        not self._is_given(triple)):
+                        derived.add(triple)
+            deleted.update(derived)
+            delta = derived
+        self.closure -= deleted
+        self._patterns -= deleted
+        # ...then put back what the remaining triples still derive.
+        rederived = Graph(triple for triple in deleted
+                          if any(rule.derives(triple, self.closure,
+                                              self.context)
+                                 for rule in rules))
+        self._add(rederived)
+
+    def _is_given(self, triple):
+        return triple in self.premises or triple in self.entailment.axioms
+
+    def _add(self, triples, initial=False):
+        triples = Graph(triple for triple in triples
+                        if triple not in self.closure)
+        self._update(triples)
+        self.context.types.update(term for triple in triples
+                                  for term in triple
+                                  if isinstance(term, Type))
+        delta = None if initial else triples
+        while delta is None or delta:
+            derived = Graph()
+            for rule in self.entailment.rules:
+                for triple in rule.apply(self.closure, self.context, delta):
+                    if triple not in self.closure:
+                        derived.add(triple)
+            self._update(derived)
+            delta = derived
+
+    def _update(self, triples):
+        self.closure.update(triples)
+        self._patterns.update(triple for triple in triples
+                              if any(isinstance(term, Type)
+                                     for term in triple))
@@ -0,0 +1,396 @@
+import itertools
+import time
+from collections import defaultdict
+
+from rdf.literal import TypedLiteral
+from rdf.graph import Graph
+from rdf.semantics.rule import Context
+from rdf.semantics.transitive import TransitiveClosure, transitive_predicate
+from rdf.semantics.type import Type
+
+
+class Network:
+    """A Rete network compiled from a list of rules.
+
+    Each distinct antecedent pattern becomes one alpha node, shared by all
+    the rules that use it, so a triple is matched against it once. The
+    patterns of a rule are joined by a chain of join nodes in the order
+    that Rule plans them. Transitive rules, such as rdfs11, are not joined
+    but kept as a TransitiveClosure, which extends the closure of the
+    relation as it grows. The network itself holds no triples; a Session
+    holds the memories of one run.
+
+    """
+    def __init__(self, rules):
+        self.rules = list(rules)
+        # Consequents of rules without antecedents.
+        self.facts = set()
+        self._alphas = {}
+        self._by_predicate = defaultdict(list)
+        self._any_predicate = []
+        self.closures = {}
+        for rule in self.rules:
+            predicate = transitive_predicate(rule)
+            if predicate is not None:
+                self.closures.setdefault(predicate, []).append(
+                    TransitiveClosure(rule))
+            elif rule.antecedent:
+                self._compile(rule)
+            else:
+                self.facts.update(rule.consequent)
+
+    def __repr__(self):
+        return "<Network of {} rules, {} alpha nodes>".format(
+            len(self.rules), len(self._alphas))
+
+    def session(self, context=None, stats=None):
+        """Return a new Session with empty memories.
+
+        If a Stats is given, the session records in it what each rule
+        does; otherwise nothing is recorded, at no cost.
+
+        """
+        if stats is not None:
+            return _ProfiledSession(self, context, stats)
+        return Session(self, context)
+
+    def alpha_nodes(self, triple):
+        """Return the alpha nodes that triple might match."""
+        nodes = self._by_predicate.get(triple[1])
+        if nodes is None:
+            return self._any_predicate
+        return nodes + self._any_predicate
+
+    def _compile(self, rule):
+        plan = rule._plan(rule.antecedent)
+        production = _Production(rule)
+        joins = []
+        bound = set(plan[0].variables)
+        for pattern in plan[1:]:
+            variables = tuple(variable for variable in pattern
+                              if variable in bound and
+                              isinstance(variable, Type))
+            joins.append(_JoinNode(pattern, tuple(_unique(variables))))
+            bound |= pattern.variables
+        for join, successor in zip(joins, joins[1:] + [production]):
+            join.successor = successor
+            join.rule = rule
+        positions = _positions(plan[0])
+        if joins:
+            joins[0].left_positions = positions
+            self._alpha(plan[0]).successors.append((joins[0], True, positions))
+            for join in joins:
+                self._alpha(join.pattern).successors.append(
+                    (join, False, join.positions))
+        else:
+            self._alpha(plan[0]).successors.append(
+                (production, None, positions))
+
+    def _alpha(self, pattern):
+        # Patterns whose positions match the same terms share a node.
+        key = tuple(_position_key(pattern, i) for i in range(3))
+        node = self._alphas.get(key)
+        if node is None:
+            node = self._alphas[key] = _AlphaNode(pattern)
+            predicate = pattern[1]
+            if isinstance(predicate, (Type, TypedLiteral)):
+                self._any_predicate.append(node)
+            else:
+                self._by_predicate[predicate].append(node)
+        return node
+
+class Session:
+    """The working memory of a Network.
+
+    Triples added to the session are matched by the alpha nodes and
+    propagated through the join memories, so each addition only does the
+    work of the matches it takes part in.
+
+    """
+    def __init__(self, network, context=None):
+        self.network = network
+        self.context = Context() if context is None else context
+        self.graph = Graph()
+        self._left = defaultdict(_Memory)
+        self._right = defaultdict(_Memory)
+        self._derived = None
+        self._started = False
+        # The IncrementalClosure of each TransitiveClosure.
+        self._closures = {}
+
+    def add(self, triples):
+        """Add triples to the memory and return those they derive.
+
+        The derived triples that are not already in memory are returned as
+        a Graph, and are not added. Adding them in turn continues the
+        closure one round at a time.
+
+        """
+        derived = self._derived = []
+        if not self._started:
+            derived.extend(self.network.facts)
+            self._started = True
+        closures = self.network.closures
+        grown = defaultdict(list)
+        for triple in triples:
+            if triple not in self.graph:
+                self.graph.add(triple)
+                if triple[1] in closures:
+                    grown[triple[1]].append(triple)
+                self._match(triple)
+        self._derived = None
+        for predicate, edges in grown.items():
+            for closure in closures[predicate]:
+                derived.extend(self._close(closure, edges))
+        return Graph(triple for triple in derived if triple not in self.graph)
+
+    def _match(self, triple):
+        for node in self.network.alpha_nodes(triple):
+            if node.matches(triple):
+                self._activate(node, triple)
+
+    def _close(self, closure, edges):
+        incremental = self._closures.get(closure)
+        if incremental is None:
+            incremental = self._closures[closure] = closure.incremental()
+        return incremental.add(edges)
+
+    def _activate(self, node, triple):
+        for successor, left, positions in node.successors:
+            if left is None:
+                self._fire(successor, _bind(positions, triple))
+            elif left:
+                self._left_activate(successor, triple)
+            else:
+                self._right_activate(successor, triple)
+
+    def _left_activate(self, join, item):
+        binding = join.left_binding(item)
+        key = tuple(binding[variable] for variable in join.variables)
+        equal, typed = self._right[join].candidates(key)
+        positions = join.positions
+        for triple in equal:
+            merged = dict(binding)
+            merged.update(_bind(positions, triple))
+            self._propagate(join.successor, merged)
+        for triple in typed:
+            merged = _merge(binding, _bind(positions, triple))
+            if merged is not None:
+                self._propagate(join.successor, merged)
+        self._left[join].add(key, item)
+
+    def _right_activate(self, join, triple):
+        binding = _bind(join.positions, triple)
+        key = tuple(binding[variable] for variable in join.variables)
+        equal, typed = self._left[join].candidates(key)
+        for item in equal:
+            merged = join.left_binding(item)
+            merged.update(binding)
+            self._propagate(join.successor, merged)
+        for item in typed:
+            merged = _merge(join.left_binding(item), binding)
+            if merged is not None:
+                self._propagate(join.successor, merged)
+        self._right[join].add(key, triple)
+
+    def _propagate(self, successor, binding):
+        if isinstance(successor, _Production):
+            self._fire(successor, binding)
+        else:
+            self._left_activate(successor, binding)
+
+    def _fire(self, production, binding):
+        for pattern in production.rule.consequent:
+            self._derived.append(pattern.tokenize(binding, self.context))
+
+class _ProfiledSession(Session):
+    # A Session that records the work of each rule in a Stats. Time spent
+    # in a step excludes the steps it calls, which are timed themselves.
+    def __init__(self, network, context, stats):
+        super().__init__(network, context)
+        self.stats = stats
+        self._children = []
+        self._seen = set()
+
+    def add(self, triples):
+        start = time.perf_counter()
+        size = len(self.graph)
+        # Triples derived by the triples added with them are duplicates,
+        # whichever order they are added in.
+        triples = list(triples)
+        self._seen = set(triples)
+        derived = super().add(triples)
+        self.stats.end_round(len(self.graph) - size, len(derived),
+                             time.perf_counter() - start)
+        return derived
+
+    def _timed(self, stats, attribute, function, *args):
+        self._children.append(0.0)
+        start = time.perf_counter()
+        try:
+            return function(*args)
+        finally:
+            elapsed = time.perf_counter() - start
+            exclusive = elapsed - self._children.pop()
+            setattr(stats, attribute, getattr(stats, attribute) + exclusive)
+            if self._children:
+                self._children[-1] += elapsed
+
+    def _match(self, triple):
+        for node in self.network.alpha_nodes(triple):
+            self._children.append(0.0)
+            start = time.perf_counter()
+            if node.matches(triple):
+                self._activate(node, triple)
+            elapsed = time.perf_counter() - start
+            exclusive = elapsed - self._children.pop()
+            for successor, left, positions in node.successors:
+                self.stats.rule(successor.rule).match_time += exclusive
+
+    def _left_activate(self, join, item):
+        self._timed(self.stats.rule(join.rule), 'join_time',
+                    super()._left_activate, join, item)
+
+    def _right_activate(self, join, triple):
+        self._timed(self.stats.rule(join.rule), 'join_time',
+                    super()._right_activate, join, triple)
+
+    def _propagate(self, successor, binding):
+        self.stats.rule(successor.rule).bindings += 1
+        super()._propagate(successor, binding)
+
+    def _fire(self, production, binding):
+        stats = self.stats.rule(production.rule)
+        stats.firings += 1
+        start = time.perf_counter()
+        for pattern in production.rule.consequent:
+            triple = pattern.tokenize(binding, self.context)
+            self._derived.append(triple)
+            self._count(stats, triple)
+        elapsed = time.perf_counter() - start
+        stats.tokenize_time += elapsed
+        if self._children:
+            self._children[-1] += elapsed
+
+    def _close(self, closure, edges):
+        stats = self.stats.rule(closure.rule)
+        stats.firings += 1
+        triples = self._timed(stats, 'join_time', super()._close, closure,
+                              edges)
+        for triple in triples:
+            self._count(stats, triple)
+        return triples
+
+    def _count(self, stats, triple):
+        if triple in self.graph or triple in self._seen:
+            stats.duplicates += 1
+        else:
+            self._seen.add(triple)
+            stats.triples += 1
+
+class _AlphaNode:
+    def __init__(self, pattern):
+        self.pattern = pattern
+        # Positions holding the same variable, whose terms must be equal.
+        self.repeated = [(i, j) for i in range(3) for j in range(i + 1, 3)
+                         if isinstance(pattern[i], Type) and
+                         pattern[i] is pattern[j]]
+        # (successor, left, positions): left is True for the left input of
+        # a join, False for its right input, and None for a production.
+        self.successors = []
+
+    def matches(self, triple):
+        if not self.pattern.matches(triple):
+            return False
+        for i, j in self.repeated:
+            if triple[i] != triple[j]:
+                return False
+        return True
+
+class _JoinNode:
+    def __init__(self, pattern, variables):
+        self.pattern = pattern
+        self.positions = _positions(pattern)
+        self.variables = variables
+        # The positions of the variables in the triples on the left input,
+        # if it is an alpha node; otherwise the left input gives bindings.
+        self.left_positions = None
+        self.successor = None
+        self.rule = None
+
+    def left_binding(self, item):
+        if self.left_positions is None:
+            return dict(item)
+        return _bind(self.left_positions, item)
+
+class _Production:
+    def __init__(self, rule):
+        self.rule = rule
+
+class _Memory:
+    # Items indexed by the values of the join variables. Items whose key
+    # holds a Type, such as cmp, can match other values, so they are kept
+    # apart and tried against every key.
+    def __init__(self):
+        self.index = defaultdict(list)
+        self.typed = []
+
+    def add(self, key, item):
+        if _is_typed(key):
+            self.typed.append(item)
+        else:
+            self.index[key].append(item)
+
+    def candidates(self, key):
+        """Return the items with an equal key, and the items to check."""
+        if _is_typed(key):
+            return (), itertools.chain(itertools.chain.from_iterable(
+                self.index.values()), self.typed)
+        return self.index.get(key, ()), self.typed
+
+def _position_key(pattern, i):
+    term = pattern[i]
+    if type(term) is Type:
+        variable = ('T', frozenset(term.class_set))
+    elif isinstance(term, Type):
+        variable = ('I', term)
+    else:
+        return ('C', term)
+    # Which earlier position, if any, has the same variable.
+    same = next((j for j in range(i) if pattern[j] is term), None)
+    return variable + (same,)
+
+def _unique(items):
+    seen = set()
+    for item in items:
+        if item not in seen:
+            seen.add(item)
+            yield item
+
+def _is_typed(key):
+    for value in key:
+        if isinstance(value, Type):
+            return True
+    return False
+
+def _positions(pattern):
+    return tuple((type_or_token, i) for i, type_or_token in enumerate(pattern)
+                 if isinstance(type_or_token, Type))
+
+def _bind(positions, triple):
+    return {variable: triple[i] for variable, i in positions}
+
+def _merge(binding, other):
+    # Values of a shared variable agree if they are equal, or if one is a
+    # Type containing the other; the more specific value is kept.
+    merged = dict(binding)
+    for variable, value in other.items():
+        bound = merged.get(variable)
+        if bound is None:
+            merged[variable] = value
+        elif bound != value:
+            if isinstance(bound, Type) and value in bound:
+                merged[variable] = value
+            elif not (isinstance(value, Type) and bound in value):
+                return None
+    return merged
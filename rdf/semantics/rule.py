@@ -1,21 +1,33 @@
-from collections import defaultdict
+from functools import lru_cache
 from itertools import product
 
 from rdf.blanknode import BlankNode
 from rdf.literal import TypedLiteral
 from rdf.exceptions import UnsupportedDatatype, IllTypedLiteral
-from rdf.semantics.type import Type, TypeDescriptor, TypedLiteralType, cmp
+from rdf.semantics.type import Type, TypeDescriptor, BlankNodeDescriptor, \
+                               TypedLiteralType, cmp
 from rdf.namespace import RDFS
+from rdf.graph import Graph
 
 
 class Context:
     def __init__(self):
         self.blank_node_allocations = {}
+        self.blank_node_origins = {}
+        # Types used as terms in the graph, such as cmp, which a bound
+        # value can match as well as itself.
+        self.types = set()
 
     def allocate(self, node, blank_node=None):
         if blank_node is None:
             blank_node = BlankNode()
-        return self.blank_node_allocations.setdefault(node, blank_node)
+        blank_node = self.blank_node_allocations.setdefault(node, blank_node)
+        self.blank_node_origins[blank_node] = node
+        return blank_node
+
+    def origin(self, blank_node):
+        """Return the node blank_node was allocated for, or None."""
+        return self.blank_node_origins.get(blank_node)
 
 class Rule:
     def __init__(self, antecedent, consequent, name=None):
@@ -23,58 +35,231 @@ class Rule:
         self.consequent = set(Pattern(pattern) for pattern in consequent)
         self.name = name
 
-    def apply(self, graph, context):
-        if self.antecedent:
-            bindings = defaultdict(list)
-            for pattern in self.antecedent:
-                for triple in graph:
-                    if pattern.matches(triple):
-                        binding = {}
-                        for type_or_token, token in zip(pattern, triple):
-                            if isinstance(type_or_token, Type):
-                                binding[type_or_token] = token
-                        bindings[pattern].append(binding)
-                if pattern not in bindings:
-                    break
-            if len(bindings) == len(self.antecedent):
-                for candidate in product(*bindings.values()):
-                    merged_binding = {}
-                    for binding in candidate:
-                        for type_, token in binding.items():
-                            merged_token = merged_binding.get(type_)
-                            if merged_token is not None:
-                                if isinstance(token, Type):
-                                    if merged_token not in token:
-                                        break
-                                elif merged_token != token:
-                                    break
-                        else:
-                            merged_binding.update(binding)
-                            continue
-                        break
-                    else:
-                        for pattern in self.consequent:
-                            yield pattern.tokenize(merged_binding, context)
+    def apply(self, graph, context, delta=None):
+        """Generate the consequents of the antecedent's matches in graph.
+
+        If delta is given, only matches in which some antecedent pattern
+        matches a triple in delta are used. Passing the triples added to
+        graph since the rule was last applied gives semi-naive evaluation:
+        matches that were already used are not tried again.
+
+        The patterns are joined in order of selectivity, looking up the
+        matches of each pattern in the graph's indexes by its constants and
+        the values bound by the patterns before it.
+
+        """
+        if not self.antecedent:
+            if delta is None:
+                for triple in self.consequent:
+                    yield triple
+            return
+        if not hasattr(graph, 'triples'):
+            graph = Graph(graph)
+        if delta is None:
+            bindings = self._join(self._plan(self.antecedent), {}, graph,
+                                  context)
         else:
-            for triple in self.consequent:
-                yield triple
+            if not hasattr(delta, 'triples'):
+                delta = Graph(delta)
+            bindings = self._delta_join(graph, context, delta)
+        # Finish matching before yielding, so that callers can add the
+        # consequents to graph as they are generated.
+        for binding in list(bindings):
+            for pattern in self.consequent:
+                yield pattern.tokenize(binding, context)
+
+    def derives(self, triple, graph, context):
+        """Return True if one application of the rule to graph gives triple.
+
+        Only the matches of the antecedent that agree with triple are
+        looked up, so this is much cheaper than applying the rule.
+
+        """
+        if not self.antecedent:
+            return triple in self.consequent
+        if not hasattr(graph, 'triples'):
+            graph = Graph(graph)
+        for pattern in self.consequent:
+            binding = pattern.unify(triple, context)
+            if binding is None:
+                continue
+            plan = self._plan(self.antecedent, binding)
+            for joined in self._join(plan, binding, graph, context):
+                if pattern.tokenize(joined, context) == triple:
+                    return True
+        return False
+
+    def _delta_join(self, graph, context, delta):
+        # Take each pattern's matches from delta in turn, and join the
+        # other patterns' matches in the whole graph to them.
+        for pattern in self.antecedent:
+            plan = self._plan(self.antecedent - {pattern}, pattern.variables)
+            for binding in pattern.search(delta, {}, context.types):
+                for joined in self._join(plan, binding, graph, context):
+                    yield joined
+
+    def _plan(self, patterns, bound=frozenset()):
+        # Order the patterns so that each has as many positions as possible
+        # fixed by constants or variables bound before it. Ties go to the
+        # pattern sharing the most variables with the others.
+        patterns = set(patterns)
+        bound = set(bound)
+        plan = []
+        def key(pattern):
+            shared = sum(1 for other in patterns if other is not pattern
+                         for variable in pattern.variables
+                         if variable in other.variables)
+            return (pattern.selectivity(bound), shared)
+        while patterns:
+            pattern = max(patterns, key=key)
+            patterns.remove(pattern)
+            bound |= pattern.variables
+            plan.append(pattern)
+        return plan
+
+    def _join(self, plan, binding, graph, context):
+        if not plan:
+            yield binding
+            return
+        pattern, rest = plan[0], plan[1:]
+        for extended in pattern.search(graph, binding, context.types):
+            for joined in self._join(rest, extended, graph, context):
+                yield joined
 
 class Pattern(tuple):
+    @property
+    def variables(self):
+        """The set of Types in the pattern."""
+        return frozenset(type_or_token for type_or_token in self
+                         if isinstance(type_or_token, Type))
+
     def matches(self, triple):
+        try:
+            constants, classes, literals, types = self._matcher
+        except AttributeError:
+            constants, classes, literals, types = self._matcher = \
+                self._compile()
+        for i, token in constants:
+            if triple[i] != token:
+                return False
+        for i, type_ in classes:
+            token = triple[i]
+            if not isinstance(token, type_.classes) and \
+                    not (isinstance(token, Type) and token in type_):
+                return False
+        for i, literal, value in literals:
+            token = triple[i]
+            if token != literal and (value is _NO_VALUE or
+                                     not isinstance(token, TypedLiteral) or
+                                     _value(token) != value):
+                return False
+        for i, type_ in types:
+            if triple[i] not in type_:
+                return False
+        return True
+
+    def _compile(self):
+        # Split the positions by how they are tested, cheapest first:
+        # constants by equality, plain Types by their classes, typed
+        # literals by their value, worked out once, and the other Types,
+        # such as cmp, by their own tests.
+        constants, classes, literals, types = [], [], [], []
+        for i, type_or_token in enumerate(self):
+            if type(type_or_token) is Type:
+                classes.append((i, type_or_token))
+            elif isinstance(type_or_token, Type):
+                types.append((i, type_or_token))
+            elif isinstance(type_or_token, TypedLiteral):
+                literals.append((i, type_or_token, _value(type_or_token)))
+            else:
+                constants.append((i, type_or_token))
+        return tuple(constants), tuple(classes), tuple(literals), tuple(types)
+
+    def selectivity(self, bound=frozenset()):
+        """Return the number of positions that are constants or in bound."""
+        return sum(1 for type_or_token in self
+                   if type_or_token in bound or
+                   not isinstance(type_or_token, (Type, TypedLiteral)))
+
+    def search(self, graph, binding, types=()):
+        """Generate binding extended with each match of the pattern in graph.
+
+        Constants and the values of variables in binding are used as index
+        keys. A bound value also matches the types that contain it, and a
+        Type bound to a variable matches the values in it.
+
+        """
+        keys = []
+        for type_or_token in self:
+            if isinstance(type_or_token, Type):
+                value = binding.get(type_or_token)
+                if value is None or isinstance(value, Type):
+                    keys.append((None,))
+                else:
+                    keys.append((value,) + tuple(type_ for type_ in types
+                                                 if value in type_))
+            elif isinstance(type_or_token, TypedLiteral):
+                # Typed literals also match literals with equal values.
+                keys.append((None,))
+            else:
+                keys.append((type_or_token,))
+        for key in product(*keys):
+            for triple in graph.triples(*key):
+                extended = self.extend(binding, triple)
+                if extended is not None:
+                    yield extended
+
+    def extend(self, binding, triple):
+        """Return binding extended with the match of triple, or None."""
+        extended = dict(binding)
         for type_or_token, token in zip(self, triple):
             if isinstance(type_or_token, Type):
                 if token not in type_or_token:
-                    return False
-            elif type_or_token != token:
-                if (isinstance(type_or_token, TypedLiteral) and
-                    isinstance(token, TypedLiteral)):
-                    try:
-                        if type_or_token.value() == token.value():
-                            continue
-                    except (UnsupportedDatatype, IllTypedLiteral):
-                        pass
-                return False
-        return True
+                    return None
+                value = extended.get(type_or_token)
+                if value is None:
+                    extended[type_or_token] = token
+                elif value != token:
+                    if isinstance(value, Type) and token in value:
+                        extended[type_or_token] = token
+                    elif not (isinstance(token, Type) and value in token):
+                        return None
+            elif not _same_token(type_or_token, token):
+                return None
+        return extended
+
+    def unify(self, triple, context=None):
+        """Return a binding under which tokenize could give triple, or None.
+
+        None in triple matches anything. Variables given by descriptors
+        are only bound where they can be worked out, as for blank nodes
+        allocated in context, so the binding must still be checked by
+        tokenizing it.
+
+        """
+        binding = {}
+        for type_or_token, token in zip(self, triple):
+            if token is None:
+                continue
+            elif isinstance(type_or_token, BlankNodeDescriptor):
+                if context is None:
+                    continue
+                type_or_token, token = type_or_token.type, context.origin(token)
+                if token is None:
+                    return None
+            elif isinstance(type_or_token, TypeDescriptor):
+                continue
+            elif not isinstance(type_or_token, Type):
+                if _same_token(type_or_token, token):
+                    continue
+                return None
+            if token not in type_or_token:
+                return None
+            value = binding.get(type_or_token)
+            if value is not None and value != token:
+                return None
+            binding[type_or_token] = token
+        return binding
 
     def tokenize(self, binding, context):
         tokens = []
@@ -89,3 +274,20 @@ class Pattern(tuple):
             tokens.append(token)
         return tuple(tokens)
 
+def _same_token(token, other):
+    if token == other:
+        return True
+    elif isinstance(token, TypedLiteral) and isinstance(other, TypedLiteral):
+        value = _value(token)
+        return value is not _NO_VALUE and value == _value(other)
+    return False
+
+_NO_VALUE = object()
+
+@lru_cache(maxsize=4096)
+def _value(literal):
+    # The value of a typed literal, or _NO_VALUE if it has none.
+    try:
+        return literal.value()
+    except (UnsupportedDatatype, IllTypedLiteral):
+        return _NO_VALUE
@@ -0,0 +1,90 @@
+class Stats:
+    """Counts and times gathered while computing a closure.
+
+    Pass a Stats to Entailment.entails or Network.session to fill it in.
+    rules maps each Rule to its RuleStats, and rounds holds a Round for
+    each round of the closure. If callback is given, it is called with the
+    Stats after each round.
+
+    """
+    def __init__(self, callback=None):
+        self.callback = callback
+        self.rules = {}
+        self.rounds = []
+
+    def __repr__(self):
+        return "<Stats of {} rules over {} rounds>".format(
+            len(self.rules), len(self.rounds))
+
+    def rule(self, rule):
+        """Return the RuleStats of rule, adding it if it is new."""
+        stats = self.rules.get(rule)
+        if stats is None:
+            stats = self.rules[rule] = RuleStats(rule)
+        return stats
+
+    def end_round(self, added, derived, time):
+        """Record a round, and call the callback."""
+        self.rounds.append(Round(len(self.rounds) + 1, added, derived, time))
+        if self.callback is not None:
+            self.callback(self)
+
+    def report(self):
+        """Return a table of the rules, slowest first, and the rounds."""
+        lines = ["{:<12} {:>9} {:>9} {:>9} {:>9} {:>8} {:>8} {:>8}".format(
+            'rule', 'firings', 'bindings', 'triples', 'dupes',
+            'match', 'join', 'tokenize')]
+        for stats in sorted(self.rules.values(), key=lambda stats: -stats.time):
+            lines.append(
+                "{:<12} {:>9} {:>9} {:>9} {:>9} {:>8.3f} {:>8.3f} {:>8.3f}"
+                .format(str(stats.rule.name), stats.firings, stats.bindings,
+                        stats.triples, stats.duplicates, stats.match_time,
+                        stats.join_time, stats.tokenize_time))
+        for round_ in self.rounds:
+            lines.append("round {}: {} triples added, {} derived, "
+                         "{:.3f}s".format(round_.number, round_.added,
+                                          round_.derived, round_.time))
+        return '\n'.join(lines)
+
+class RuleStats:
+    """Counts and times for one rule.
+
+    firings is the number of complete matches of the antecedent, bindings
+    the number of partial matches passed between its joins, triples the
+    number of new consequents, and duplicates the number of consequents
+    that were already entailed. Times are in seconds, and exclude the time
+    spent in the rules that a rule's consequents go on to match. The time
+    matching a pattern that several rules share is counted for each rule.
+
+    """
+    def __init__(self, rule):
+        self.rule = rule
+        self.firings = 0
+        self.bindings = 0
+        self.triples = 0
+        self.duplicates = 0
+        self.match_time = 0.0
+        self.join_time = 0.0
+        self.tokenize_time = 0.0
+
+    def __repr__(self):
+        return ("<RuleStats of {!r}: {} firings, {} triples, "
+                "{:.3f}s>".format(self.rule.name, self.firings,
+                                  self.triples, self.time))
+
+    @property
+    def time(self):
+        """The total time spent on the rule."""
+        return self.match_time + self.join_time + self.tokenize_time
+
+class Round:
+    """The triples added to the graph in a round, and those they derived."""
+    def __init__(self, number, added, derived, time):
+        self.number = number
+        self.added = added
+        self.derived = derived
+        self.time = time
+
+    def __repr__(self):
+        return "<Round {}: {} added, {} derived>".format(
+            self.number, self.added, self.derived)
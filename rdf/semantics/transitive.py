@@ -0,0 +1,184 @@
+from collections import defaultdict
+
+from rdf.semantics.rule import Pattern
+from rdf.semantics.type import Type
+
+
+class TransitiveClosure:
+    """The closure of a transitive rule, such as rdfs5 or rdfs11.
+
+    Instead of extending the relation one hop per application, as joining
+    the rule's antecedents does, the closure is kept up to date as edges
+    are added to the relation, by an IncrementalClosure made for each
+    session.
+
+    """
+    def __init__(self, rule):
+        self.rule = rule
+        self.predicate = transitive_predicate(rule)
+        if self.predicate is None:
+            raise ValueError("Rule is not transitive: {!r}".format(rule.name))
+        consequent, = rule.consequent
+        self.subject, _, self.object = consequent
+        first, = (pattern for pattern in rule.antecedent
+                  if pattern[0] is self.subject)
+        self.middle = first[2]
+
+    def __repr__(self):
+        return "<TransitiveClosure of {!r}>".format(self.rule.name)
+
+    def incremental(self):
+        """Return an IncrementalClosure of an empty relation."""
+        return IncrementalClosure(self)
+
+    def derive(self, graph):
+        """Generate the triples of the closure that are not in graph."""
+        closure = self.incremental()
+        for triple in closure.add(graph.triples(None, self.predicate, None)):
+            if triple not in graph:
+                yield triple
+
+class IncrementalClosure:
+    """The closure of a growing relation.
+
+    Nodes are numbered as they are seen, and the nodes reachable from each
+    node are kept as a bitset, along with the inverse bitsets of the nodes
+    each node is reached from. An added edge extends the reach of its
+    source and of the nodes that reach it, and only the pairs new to the
+    closure are returned, so the cost of each edge is that of the pairs it
+    adds.
+
+    A node in the middle of a path continues with its own successors and
+    with those of the Type terms that match it, such as the properties in
+    cmp, as the generic join does.
+
+    """
+    def __init__(self, closure):
+        self.closure = closure
+        self.nodes = []
+        self.index = {}
+        self.successors = defaultdict(set)
+        # Type terms with successors, which the nodes they match share.
+        self.types = []
+        # Bitsets by node number: the nodes reachable through the middle,
+        # the nodes that reach each node, the direct predecessors of each
+        # node, and the closure of each subject.
+        self.reach = []
+        self.sources = []
+        self.predecessors = []
+        self.closed = []
+
+    def add(self, triples):
+        """Add triples of the relation and return the new closure triples.
+
+        Triples of other predicates are ignored. Closure triples that are
+        added back are edges like any other, and derive nothing new.
+
+        """
+        closure = self.closure
+        predicate = closure.predicate
+        grown = {}
+        edges = []
+        for subject, triple_predicate, object_ in triples:
+            if triple_predicate != predicate or \
+                    object_ in self.successors.get(subject, ()):
+                continue
+            s, o = self._number(subject, grown), self._number(object_, grown)
+            self.successors[subject].add(object_)
+            self.predecessors[o] |= 1 << s
+            # Edges of the relation are not derived.
+            self.closed[s] |= 1 << o
+            edges.append((s, o))
+            if subject in closure.middle:
+                self._connect(s, o, grown)
+            if isinstance(subject, Type):
+                if subject not in self.types:
+                    self.types.append(subject)
+                for i, node in enumerate(self.nodes):
+                    if _matches(node, subject) and node in closure.middle:
+                        self._connect(i, o, grown)
+        # Each subject's closure gains its new successors and what they
+        # reach, and whatever the nodes it already had now reach.
+        reach, closed = self.reach, self.closed
+        gained = {}
+        for s, o in edges:
+            gained[s] = gained.get(s, 0) | 1 << o | reach[o]
+        for x, added in grown.items():
+            for s in _ones(self.predecessors[x]):
+                gained[s] = gained.get(s, 0) | added
+        triples = []
+        for s, bits in gained.items():
+            new = bits & ~closed[s]
+            if not new:
+                continue
+            closed[s] |= new
+            subject = self.nodes[s]
+            if subject not in closure.subject:
+                continue
+            for o in _ones(new):
+                object_ = self.nodes[o]
+                if object_ in closure.object:
+                    triples.append((subject, predicate, object_))
+        return triples
+
+    def _number(self, node, grown):
+        i = self.index.get(node)
+        if i is not None:
+            return i
+        i = self.index[node] = len(self.nodes)
+        self.nodes.append(node)
+        self.reach.append(0)
+        self.sources.append(0)
+        self.predecessors.append(0)
+        self.closed.append(0)
+        # A new node continues with the successors of the types that
+        # match it.
+        if node in self.closure.middle:
+            for type_ in self.types:
+                if _matches(node, type_):
+                    for object_ in self.successors[type_]:
+                        self._connect(i, self._number(object_, grown), grown)
+        return i
+
+    def _connect(self, a, b, grown):
+        # Add an edge through the middle from node a to node b, extending
+        # the reach of a and of the nodes that reach a.
+        reach, sources = self.reach, self.sources
+        if reach[a] >> b & 1:
+            return
+        targets = 1 << b | reach[b]
+        for x in _ones(sources[a] | 1 << a):
+            added = targets & ~reach[x]
+            if added:
+                reach[x] |= added
+                for y in _ones(added):
+                    sources[y] |= 1 << x
+                grown[x] = grown.get(x, 0) | added
+
+def transitive_predicate(rule):
+    """Return P if rule is {(u, P, v), (v, P, x)} => {(u, P, x)}, or None."""
+    if len(rule.antecedent) != 2 or len(rule.consequent) != 1:
+        return None
+    (subject, predicate, object_), = rule.consequent
+    if isinstance(predicate, Type) or \
+            not all(isinstance(term, Type) for term in (subject, object_)):
+        return None
+    for first in rule.antecedent:
+        middle = first[2]
+        second = Pattern((middle, predicate, object_))
+        if first == Pattern((subject, predicate, middle)) and \
+                isinstance(middle, Type) and \
+                middle not in (subject, object_) and \
+                rule.antecedent == {first, second}:
+            return predicate
+    return None
+
+def _matches(node, type_):
+    return type_ is not node and (node in type_ or
+                                  isinstance(node, Type) and type_ in node)
+
+def _ones(bits):
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
@@ -18,6 +18,8 @@ class Type:
         if isinstance(class_set, type):
             class_set = (class_set,)
         self.class_set = set(class_set)
+        # For isinstance, which would otherwise need a tuple on each test.
+        self.classes = tuple(self.class_set)
         self.blank_node = self.nnn = BlankNodeDescriptor(self)
 
     def __repr__(self):
@@ -25,7 +27,7 @@ class Type:
 
     def __contains__(self, obj):
         if not isinstance(obj, Type):
-            return isinstance(obj, tuple(self.class_set))
+            return isinstance(obj, self.classes)
         else:
             return obj.class_set <= self.class_set
 
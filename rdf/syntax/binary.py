@@ -0,0 +1,309 @@
+import itertools
+import mmap
+import os
+import struct
+from array import array
+from collections.abc import Set
+
+from rdf.blanknode import BlankNode
+from rdf.uri import URI
+from rdf.literal import PlainLiteral, TypedLiteral
+from rdf.graph import Graph
+from rdf.syntax.exceptions import ParseError
+
+
+# Header: magic, version, byte order mark, term count, triple count.
+# Integers are written in the byte order of the writing machine; the byte
+# order mark lets readers refuse files they would misread.
+MAGIC = b'RDFG'
+VERSION = 1
+_BYTE_ORDER_MARK = 0x0102
+_HEADER = struct.Struct('=4sHHQQ')
+
+# Permutations of (subject, predicate, object) stored in the file.
+_ORDERS = ((0, 1, 2), (1, 2, 0), (2, 0, 1))
+_MAX_TERMS = 1 << 32
+
+
+class BinaryWriter:
+    """Write triples in a binary format that MappedGraph can open.
+
+    The file holds a dictionary of the encoded terms, sorted so that a
+    term's ID is its rank, and the triples as rows of term IDs sorted in
+    subject-predicate-object, predicate-object-subject and
+    object-subject-predicate order.
+
+    """
+    def write(self, triples, file):
+        """Write triples to a binary file object."""
+        triples = list(triples)
+        terms = {}
+        unlabelled = []
+        for triple in triples:
+            for term in triple:
+                if term not in terms:
+                    if isinstance(term, BlankNode) and term.node_id is None:
+                        unlabelled.append(term)
+                        terms[term] = None
+                        continue
+                    encoded = _encode_term(term)
+                    if encoded is None:
+                        raise TypeError("Cannot serialize term: "
+                                        "{!r}".format(term))
+                    terms[term] = encoded
+        # Blank nodes without IDs are given ones that are not in use.
+        used = set(terms.values())
+        labels = (_encode_term(BlankNode('b{}'.format(i)))
+                  for i in itertools.count())
+        for bnode in unlabelled:
+            terms[bnode] = next(label for label in labels
+                                if label not in used)
+        encoded_terms = sorted(set(terms.values()))
+        if len(encoded_terms) >= _MAX_TERMS:
+            raise ValueError("Too many terms: {}".format(len(encoded_terms)))
+        ids = {encoded: term_id
+               for term_id, encoded in enumerate(encoded_terms)}
+        rows = {tuple(ids[terms[term]] for term in triple)
+                for triple in triples}
+
+        file.write(_HEADER.pack(MAGIC, VERSION, _BYTE_ORDER_MARK,
+                                len(encoded_terms), len(rows)))
+        offsets = array('Q', [0])
+        for encoded in encoded_terms:
+            offsets.append(offsets[-1] + len(encoded))
+        file.write(offsets.tobytes())
+        for encoded in encoded_terms:
+            file.write(encoded)
+        file.write(_padding(offsets[-1]))
+        for order in _ORDERS:
+            columns = array('I')
+            for row in sorted(tuple(row[i] for i in order) for row in rows):
+                columns.extend(row)
+            file.write(columns.tobytes())
+
+    def dump(self, triples, path):
+        """Write triples to the file at path."""
+        with open(path, 'wb') as file:
+            self.write(triples, file)
+
+
+class MappedGraph(Set):
+    """A read-only graph backed by a memory-mapped binary graph file.
+
+    Opening a file only reads its header. Terms are decoded as triples are
+    read, and containment tests and pattern lookups binary search the
+    mapped rows, so only the pages they touch are read from disk.
+
+    """
+    def __init__(self, file):
+        if isinstance(file, str):
+            with open(file, 'rb') as f:
+                self._mmap = _map(f.fileno())
+        else:
+            self._mmap = _map(file.fileno())
+        magic, version, byte_order_mark, self._num_terms, self._num_triples \
+            = _HEADER.unpack_from(self._mmap)
+        if magic != MAGIC or version != VERSION:
+            self._mmap.close()
+            raise ParseError("Not a binary graph file")
+        elif byte_order_mark != _BYTE_ORDER_MARK:
+            self._mmap.close()
+            raise ParseError("Binary graph file has the wrong byte order")
+
+        view = memoryview(self._mmap)
+        start = _HEADER.size
+        end = start + 8 * (self._num_terms + 1)
+        self._offsets = view[start:end].cast('Q')
+        self._data = end
+        start = end + self._offsets[-1] + len(_padding(self._offsets[-1]))
+        self._rows = {}
+        for order in _ORDERS:
+            end = start + 12 * self._num_triples
+            self._rows[order] = view[start:end].cast('I')
+            start = end
+        view.release()
+
+    def __repr__(self):
+        return "<MappedGraph of {} triples>".format(len(self))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Unmap the file. The graph cannot be used afterwards."""
+        self._offsets.release()
+        for rows in self._rows.values():
+            rows.release()
+        self._mmap.close()
+
+    def __len__(self):
+        return self._num_triples
+
+    def __iter__(self):
+        return self.triples()
+
+    def __contains__(self, triple):
+        try:
+            subject, predicate, object_ = triple
+        except (TypeError, ValueError):
+            return False
+        if None in (subject, predicate, object_):
+            return False
+        for match in self.triples(subject, predicate, object_):
+            return True
+        return False
+
+    def triples(self, subject=None, predicate=None, object_=None):
+        """Generate the triples matching the given terms.
+
+        None is a wildcard. The lookup is answered by binary search of the
+        rows sorted by the given terms.
+
+        """
+        ids = []
+        for term in (subject, predicate, object_):
+            if term is None:
+                ids.append(None)
+            else:
+                term_id = self.lookup(term)
+                if term_id is None:
+                    return
+                ids.append(term_id)
+
+        # Pick the order whose leading columns are the given terms.
+        if ids[0] is not None and ids[2] is not None and ids[1] is None:
+            order = (2, 0, 1)
+        elif ids[0] is not None or ids == [None, None, None]:
+            order = (0, 1, 2)
+        elif ids[1] is not None:
+            order = (1, 2, 0)
+        else:
+            order = (2, 0, 1)
+        prefix = tuple(ids[i] for i in order if ids[i] is not None)
+        rows = self._rows[order]
+        size = len(prefix)
+        low, high = 0, self._num_triples
+        while low < high:
+            middle = (low + high) // 2
+            if tuple(rows[3 * middle:3 * middle + size]) < prefix:
+                low = middle + 1
+            else:
+                high = middle
+        position = order.index
+        decode = self.decode
+        for row in range(low, self._num_triples):
+            values = tuple(rows[3 * row:3 * row + 3])
+            if values[:size] != prefix:
+                break
+            yield (decode(values[position(0)]), decode(values[position(1)]),
+                   decode(values[position(2)]))
+
+    def lookup(self, term):
+        """Return the ID of term, or None if the graph does not use it."""
+        encoded = _encode_term(term)
+        if encoded is None:
+            return None
+        low, high = 0, self._num_terms
+        while low < high:
+            middle = (low + high) // 2
+            if self._encoded(middle) < encoded:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self._num_terms and self._encoded(low) == encoded:
+            return low
+        return None
+
+    def decode(self, term_id):
+        """Return the term with the given ID."""
+        return _decode_term(self._encoded(term_id))
+
+    def to_graph(self):
+        """Return the triples decoded into a Graph."""
+        return Graph(self)
+
+    def __eq__(self, other):
+        """x == y: Return True if x is isomorphic to y."""
+        if not isinstance(other, Set):
+            return NotImplemented
+        return self.to_graph() == other
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    def __lt__(self, other):
+        if not isinstance(other, Set):
+            return NotImplemented
+        return self.to_graph() < other
+
+    def __le__(self, other):
+        if not isinstance(other, Set):
+            return NotImplemented
+        return self.to_graph() <= other
+
+    def __gt__(self, other):
+        if not isinstance(other, Set):
+            return NotImplemented
+        return self.to_graph() > other
+
+    def __ge__(self, other):
+        if not isinstance(other, Set):
+            return NotImplemented
+        return self.to_graph() >= other
+
+    __hash__ = None
+
+    def _encoded(self, term_id):
+        start = self._data + self._offsets[term_id]
+        end = self._data + self._offsets[term_id + 1]
+        return self._mmap[start:end]
+
+def _map(fileno):
+    # Files too short for a header are refused before mapping them, as an
+    # empty file cannot be mapped at all.
+    if os.fstat(fileno).st_size < _HEADER.size:
+        raise ParseError("Not a binary graph file")
+    return mmap.mmap(fileno, 0, access=mmap.ACCESS_READ)
+
+def _padding(size):
+    return bytes(-size % 8)
+
+def _encode_term(term):
+    if isinstance(term, URI):
+        return b'U' + term.encode('utf-8')
+    elif isinstance(term, BlankNode):
+        if term.node_id is None:
+            return None
+        return b'B' + term.node_id.encode('utf-8')
+    elif isinstance(term, PlainLiteral):
+        lexical_form = term.lexical_form.encode('utf-8')
+        if term.language is None:
+            return b'P' + lexical_form
+        return (b'L' + struct.pack('=I', len(lexical_form)) + lexical_form +
+                term.language.encode('utf-8'))
+    elif isinstance(term, TypedLiteral):
+        lexical_form = term.lexical_form.encode('utf-8')
+        return (b'T' + struct.pack('=I', len(lexical_form)) + lexical_form +
+                term.datatype.encode('utf-8'))
+    return None
+
+def _decode_term(encoded):
+    kind, body = encoded[:1], encoded[1:]
+    if kind == b'U':
+        return URI(body.decode('utf-8'))
+    elif kind == b'B':
+        return BlankNode(body.decode('utf-8'))
+    elif kind == b'P':
+        return PlainLiteral(body.decode('utf-8'))
+    size, = struct.unpack_from('=I', body)
+    lexical_form = body[4:4 + size].decode('utf-8')
+    rest = body[4 + size:].decode('utf-8')
+    if kind == b'L':
+        return PlainLiteral(lexical_form, rest)
+    elif kind == b'T':
+        return TypedLiteral(lexical_form, URI(rest))
+    raise ParseError("Invalid term in binary graph file: {!r}".format(encoded))
@@ -1,33 +1,40 @@
+import io
+import itertools
+import os
 import re
-from io import StringIO
+from array import array
+from concurrent.futures import ProcessPoolExecutor
 from urllib.parse import urljoin
 
 from rdf.blanknode import BlankNode
 from rdf.uri import URI
 from rdf.literal import PlainLiteral, TypedLiteral
+from rdf.graph import Graph
+from rdf.compactgraph import CompactGraph, TermDictionary
 from rdf.syntax.exceptions import ParseError, InvalidEscapeSequence
 
 
 class NTriplesReader:
     # Grammar adapted from: http://www.w3.org/TR/rdf-testcases/#ntrip_grammar
+    # Groups capture the contents of each token: the subject URI or node
+    # ID, the predicate URI, the object URI or node ID, and the literal
+    # lexical form with an optional datatype URI or language.
     _CHARACTER = r'[ -~]'
     _NAME = r'(?:[A-Za-z][A-Za-z0-9]*)'
-    _NODE_ID = r'(?:_:{0})'.format(_NAME)
-    _ABSOLUTE_URI = r'(?:{0}+)'.format(_CHARACTER)
-    _URIREF = r'(?:<{0}>)'.format(_ABSOLUTE_URI)
+    # A '>' in a URI must be escaped.
+    _ABSOLUTE_URI = r'(?:[ -=?-~]+)'
     _LANGUAGE = r'(?:[a-z]+(?:-[a-z0-9]+)*)'
-    _STRING = r'(?:(?:\\"|[ !#-~])*)'
-    _LANG_STRING = r'(?:"{0}"(?:@{1})?)'.format(_STRING, _LANGUAGE)
-    _DATATYPE_STRING = r'(?:"{0}"\^\^{1})'.format(_STRING, _URIREF)
-    _LITERAL = r'(?:{0}|{1})'.format(_DATATYPE_STRING, _LANG_STRING)
-    _SUBJECT = r'(?:{0}|{1})'.format(_URIREF, _NODE_ID)
-    _PREDICATE = _URIREF
-    _OBJECT = r'(?:{0}|{1}|{2})'.format(_URIREF, _NODE_ID, _LITERAL)
+    # Characters other than '"', and '"' only when escaped by a backslash.
+    _STRING = r'(?:[ !#-~]*(?:(?<=\\)"[ !#-~]*)*)'
+    _SUBJECT = r'(?:<({0})>|_:({1}))'.format(_ABSOLUTE_URI, _NAME)
+    _PREDICATE = r'<({0})>'.format(_ABSOLUTE_URI)
+    _OBJECT = r'(?:<({0})>|_:({1})|"({2})"(?:\^\^<({0})>|@({3}))?)'.format(
+        _ABSOLUTE_URI, _NAME, _STRING, _LANGUAGE)
     _WS = r'[ \t]'
-    _TRIPLE = r'(?:({0}){ws}+({1}){ws}+({2}){ws}*\.{ws}*)'.format(_SUBJECT,
-                                                                  _PREDICATE,
-                                                                  _OBJECT,
-                                                                  ws=_WS)
+    _TRIPLE = r'(?:{0}{ws}+{1}{ws}+{2}{ws}*\.{ws}*)'.format(_SUBJECT,
+                                                             _PREDICATE,
+                                                             _OBJECT,
+                                                             ws=_WS)
     _EOLN = r'(?:\r\n|\r|\n|\Z)'
     _COMMENT = r'(?:#{0}*)'.format(_CHARACTER)
     _LINE = r'(?:{0}*(?:{1}|{2})?{3})'.format(_WS, _COMMENT, _TRIPLE, _EOLN)
@@ -35,64 +42,231 @@ class NTriplesReader:
     LINE = re.compile(_LINE)
     ESCAPE = re.compile(r'\\(u[0-9A-F]{4}|U[0-9A-F]{8}|.)')
     ESCAPE_MAP = {'t': '\t', 'n': '\n', 'r': '\r', '"': '"', '\\': '\\'}
+    SCHEME = re.compile(r'[A-Za-z][A-Za-z0-9+.-]*:')
+
+    # Bytes or characters read at a time from files.
+    CHUNK_SIZE = 1 << 20
+    # Distinct URIs, and distinct node IDs, remembered while reading, so
+    # that repeated tokens are only converted into terms once.
+    CACHE_SIZE = 1 << 16
+
+    def __init__(self, terms=None):
+        # An optional TermTable in which to intern the terms read.
+        self.terms = terms
 
     def read(self, lines, uri=None):
+        """Generate the triples in an N-Triples document.
+
+        lines may be a string, bytes, an iterable of lines, or a binary or
+        text file object, which is read in chunks of CHUNK_SIZE bytes or
+        characters.
+
+        """
+        cache = ({}, {})
         if isinstance(lines, str):
-            lines = StringIO(lines)
-
-        for line_num, line in enumerate(lines):
-            while line:
-                match = self.LINE.match(line)
-                if match:
-                    triple = match.groups()
-                    if None not in triple:
-                        yield self._triple(triple, uri)
-                    line = line[match.end():]
-                else:
-                    raise ParseError("Error parsing line {}".format(line_num))
-
-    def _triple(self, tokens, uri):
-        subject, predicate, object_ = tokens
-        return (self._subject(subject, uri),
-                self._predicate(predicate, uri),
-                self._object(object_, uri))
-
-    def _subject(self, token, uri):
-        if token.startswith('<'):
-            return self._uriref(token, uri)
-        else:
-            return self._node_id(token)
-    
-    def _predicate(self, token, uri):
-        return self._uriref(token, uri)
-
-    def _object(self, token, uri):
-        if token.startswith('<'):
-            return self._uriref(token, uri)
-        elif token.startswith('_:'):
-            return self._node_id(token)
+            yield from self._read_text(lines, uri, 0, cache)
+        elif isinstance(lines, (bytes, bytearray)):
+            yield from self._read_text(self._decode(lines, 0), uri, 0, cache)
+        elif isinstance(lines, (io.RawIOBase, io.BufferedIOBase,
+                                io.TextIOBase)):
+            yield from self._read_chunks(lines, uri, cache)
         else:
-            return self._literal(token, uri)
+            for line_num, line in enumerate(lines):
+                if not isinstance(line, str):
+                    line = self._decode(line, line_num)
+                yield from self._read_text(line, uri, line_num, cache)
 
-    def _uriref(self, token, uri):
-        return URI(urljoin(uri or '', self._string(token[1:-1])))
+    def load_parallel(self, path, uri=None, max_workers=None, compact=False):
+        """Return a Graph of the triples in the N-Triples file at path.
 
-    def _literal(self, token, uri):
-        if token.endswith('>'):
-            tokens = token.rsplit('^^', 1)
-            lexical_form = self._string(tokens[0][1:-1])
-            datatype = self._uriref(tokens[1], uri)
-            return TypedLiteral(lexical_form, datatype)
-        else:
-            tokens = token.rsplit('@', 1)
-            lexical_form = self._string(tokens[0][1:-1])
-            if len(tokens) == 1:
-                language = None
+        The file is split at line endings into byte ranges, which are
+        parsed in a pool of max_workers processes, by default one for each
+        CPU this process may run on. Node IDs are global to the file, so
+        blank nodes with the same label in different ranges are equal, and
+        parse errors report line numbers in the whole file.
+
+        Each worker returns the terms of its range and its triples as an
+        array of term IDs. If compact is True, these are merged in bulk into
+        a CompactGraph, and the ranges are parsed in this process if there
+        are not several workers. Otherwise the triples are added to a Graph
+        one at a time, which costs more than parsing them, so the file is
+        read sequentially unless there are several workers.
+
+        """
+        if max_workers is None:
+            max_workers = _available_cpus()
+        ranges = self._split(path, max_workers * 4)
+        if len(ranges) < 2 or max_workers < 2:
+            if compact:
+                graph = CompactGraph()
+                graph._extend(_read_range(type(self), path, start, end, uri)
+                              for start, end in ranges)
+                return graph
+            with open(path, 'rb') as file:
+                return Graph(self.read(file, uri))
+
+        with ProcessPoolExecutor(max_workers) as executor:
+            futures = [executor.submit(_read_range, type(self), path,
+                                       start, end, uri)
+                       for start, end in ranges]
+            results = (future.result() for future in futures)
+            if self.terms is not None:
+                # Terms are interned, so each is shared with other graphs.
+                results = (([self.terms.intern(term) for term in terms], ids)
+                           for terms, ids in results)
+            if compact:
+                graph = CompactGraph()
+                graph._extend(results)
+                return graph
+            shared = {}
+            def decode(terms, ids):
+                # Terms are merged, so each is shared by all ranges.
+                terms = [shared.setdefault(term, term) for term in terms]
+                return zip(map(terms.__getitem__, ids[0::3]),
+                           map(terms.__getitem__, ids[1::3]),
+                           map(terms.__getitem__, ids[2::3]))
+            return Graph(itertools.chain.from_iterable(
+                decode(terms, ids) for terms, ids in results))
+
+    def _split(self, path, count):
+        # Split the file into about count ranges of at least CHUNK_SIZE
+        # bytes, each ending after a newline or at the end of the file.
+        size = os.path.getsize(path)
+        step = max(self.CHUNK_SIZE, -(-size // count))
+        ranges = []
+        start = 0
+        with open(path, 'rb') as file:
+            while start < size:
+                end = start + step
+                if end < size:
+                    file.seek(end)
+                    while True:
+                        block = file.read(1 << 16)
+                        newline = block.find(b'\n')
+                        if newline >= 0:
+                            end += newline + 1
+                            break
+                        elif not block:
+                            break
+                        end += len(block)
+                end = min(end, size)
+                ranges.append((start, end))
+                start = end
+        return ranges
+
+    def _read_chunks(self, file, uri, cache):
+        binary = not isinstance(file, io.TextIOBase)
+        newline, return_ = (b'\n', b'\r') if binary else ('\n', '\r')
+        line_num = 0
+        rest = None
+        while True:
+            chunk = file.read(self.CHUNK_SIZE)
+            buffer = rest + chunk if rest else chunk
+            if chunk:
+                # Only parse up to the last line ending; the rest is parsed
+                # with the next chunk.
+                end = max(buffer.rfind(newline), buffer.rfind(return_)) + 1
+            else:
+                end = len(buffer)
+            if end:
+                text = buffer[:end]
+                if binary:
+                    text = self._decode(text, line_num)
+                yield from self._read_text(text, uri, line_num, cache)
+                line_num += text.count('\n')
+            rest = buffer[end:]
+            if not chunk:
+                break
+
+    def _read_text(self, text, uri, line_num, cache):
+        # Lines are matched in place, so the text is never sliced. Each
+        # match must start where the last one ended.
+        uris, node_ids = cache
+        position = 0
+        for match in self.LINE.finditer(text):
+            if match.start() != position:
+                break
+            position = match.end()
+            (subject_uri, subject_node_id, predicate, object_uri,
+             object_node_id, lexical_form, datatype, language) = match.groups()
+            if predicate is None:
+                continue
+
+            if len(uris) > self.CACHE_SIZE:
+                uris.clear()
+            if len(node_ids) > self.CACHE_SIZE:
+                node_ids.clear()
+
+            if subject_uri is not None:
+                subject = uris.get(subject_uri)
+                if subject is None:
+                    subject = uris[subject_uri] = self._uri(subject_uri, uri)
             else:
-                language = tokens[1]
-            return PlainLiteral(lexical_form, language)
+                subject = node_ids.get(subject_node_id)
+                if subject is None:
+                    subject = self._node_id(subject_node_id)
+                    node_ids[subject_node_id] = subject
+
+            predicate_uri = predicate
+            predicate = uris.get(predicate_uri)
+            if predicate is None:
+                predicate = uris[predicate_uri] = self._uri(predicate_uri, uri)
+
+            if object_uri is not None:
+                object_ = uris.get(object_uri)
+                if object_ is None:
+                    object_ = uris[object_uri] = self._uri(object_uri, uri)
+            elif object_node_id is not None:
+                object_ = node_ids.get(object_node_id)
+                if object_ is None:
+                    object_ = self._node_id(object_node_id)
+                    node_ids[object_node_id] = object_
+            elif datatype is not None:
+                datatype_uri = datatype
+                datatype = uris.get(datatype_uri)
+                if datatype is None:
+                    datatype = uris[datatype_uri] = self._uri(datatype_uri,
+                                                              uri)
+                object_ = self._typed_literal(self._string(lexical_form),
+                                              datatype)
+            else:
+                object_ = self._plain_literal(self._string(lexical_form),
+                                              language)
+            yield (subject, predicate, object_)
+        if position != len(text):
+            line_num += text.count('\n', 0, position)
+            raise ParseError("Error parsing line {}".format(line_num))
+
+    def _decode(self, data, line_num):
+        # N-Triples documents are US-ASCII.
+        try:
+            return data.decode('ascii')
+        except UnicodeDecodeError as e:
+            line_num += data.count(b'\n', 0, e.start)
+            raise ParseError("Error parsing line {}".format(line_num)) from e
+
+    def _uri(self, token, uri):
+        token = self._string(token)
+        # Absolute URIs, as N-Triples requires, are not resolved.
+        if uri and not self.SCHEME.match(token):
+            token = urljoin(uri, token)
+        if self.terms is not None:
+            return self.terms.uri(token)
+        return URI(token)
+
+    def _plain_literal(self, lexical_form, language):
+        if self.terms is not None:
+            return self.terms.plain_literal(lexical_form, language)
+        return PlainLiteral(lexical_form, language)
+
+    def _typed_literal(self, lexical_form, datatype):
+        if self.terms is not None:
+            return self.terms.typed_literal(lexical_form, datatype)
+        return TypedLiteral(lexical_form, datatype)
 
     def _string(self, token):
+        if '\\' not in token:
+            return token
         return self.ESCAPE.sub(self._unescape, token)
 
     def _unescape(self, match):
@@ -105,6 +279,148 @@ class NTriplesReader:
         raise InvalidEscapeSequence("Invalid escape sequence: "
                                     "{!r}".format(seq))
 
-    def _node_id(self, token):
-        return BlankNode(token[2:])
+    def _node_id(self, node_id):
+        if self.terms is not None:
+            return self.terms.blank_node(node_id)
+        return BlankNode(node_id)
+
+
+class NTriplesWriter:
+    """Write triples as N-Triples that NTriplesReader can read.
+
+    Triples may come from any iterable, such as a Graph or a reader. Lines
+    are written to the sink in blocks of BUFFER_SIZE lines. Binary sinks
+    are written US-ASCII bytes, and text sinks strings.
+
+    """
+    # Characters written as themselves in strings and URIs. Everything else,
+    # including all non-ASCII characters, is escaped.
+    STRING_ESCAPE = re.compile(r'[^ !#-\[\]-~]')
+    URI_ESCAPE = re.compile(r'[^ -=?-\[\]-~]')
+    ESCAPE_MAP = {'\t': r'\t', '\n': r'\n', '\r': r'\r', '"': r'\"',
+                  '\\': r'\\'}
+    NAME = re.compile(r'[A-Za-z][A-Za-z0-9]*\Z')
+
+    BUFFER_SIZE = 1 << 12
+    # Distinct terms remembered while writing, so that repeated terms are
+    # only serialized once.
+    CACHE_SIZE = 1 << 16
+
+    def write(self, triples, file, sort=False):
+        """Write triples to a text or binary file object.
+
+        If sort is True, lines are written in sorted order, so equal graphs
+        with the same blank node IDs give identical output. Graphs with
+        unlabelled blank nodes can be canonicalized first.
+
+        """
+        binary = isinstance(file, (io.RawIOBase, io.BufferedIOBase))
+        lines = self._lines(triples)
+        if sort:
+            lines = iter(sorted(lines))
+        while True:
+            block = ''.join(itertools.islice(lines, self.BUFFER_SIZE))
+            if not block:
+                break
+            file.write(block.encode('ascii') if binary else block)
+
+    def dump(self, triples, path, sort=False):
+        """Write triples to the file at path."""
+        with open(path, 'wb') as file:
+            self.write(triples, file, sort)
+
+    def _lines(self, triples):
+        cache = {}
+        node_ids = ({}, set())
+        term = self._term
+        for subject, predicate, object_ in triples:
+            if len(cache) > self.CACHE_SIZE:
+                cache.clear()
+            line = []
+            for node in (subject, predicate, object_):
+                string = cache.get(node)
+                if string is None:
+                    string = cache[node] = term(node, node_ids)
+                line.append(string)
+            yield '{} {} {} .\n'.format(*line)
+
+    def _term(self, term, node_ids):
+        if isinstance(term, URI):
+            return '<' + self._escape(term, self.URI_ESCAPE) + '>'
+        elif isinstance(term, BlankNode):
+            return '_:' + self._node_id(term, node_ids)
+        elif isinstance(term, PlainLiteral):
+            string = '"' + self._escape(term.lexical_form,
+                                        self.STRING_ESCAPE) + '"'
+            if term.language is not None:
+                string += '@' + term.language
+            return string
+        elif isinstance(term, TypedLiteral):
+            return ('"' + self._escape(term.lexical_form, self.STRING_ESCAPE) +
+                    '"^^' + self._term(term.datatype, node_ids))
+        raise TypeError("Cannot serialize term: {!r}".format(term))
+
+    def _node_id(self, bnode, node_ids):
+        # Node IDs that are not N-Triples names, and blank nodes without
+        # one, are given generated names for the rest of the document. The
+        # names skip the labels already written, and a node ID that was
+        # already generated for another node is replaced in turn.
+        labels, used = node_ids
+        node_id = labels.get(bnode)
+        if node_id is None:
+            node_id = bnode.node_id
+            if node_id is None or not self.NAME.match(node_id) or \
+                    node_id in used:
+                number = len(used) + 1
+                while 'genid{}'.format(number) in used:
+                    number += 1
+                node_id = 'genid{}'.format(number)
+            labels[bnode] = node_id
+            used.add(node_id)
+        return node_id
+
+    def _escape(self, string, escape):
+        if escape.search(string) is None:
+            return string
+        return escape.sub(self._escape_char, string)
+
+    def _escape_char(self, match):
+        char = match.group()
+        try:
+            return self.ESCAPE_MAP[char]
+        except KeyError:
+            if ord(char) > 0xFFFF:
+                return '\\U{:08X}'.format(ord(char))
+            return '\\u{:04X}'.format(ord(char))
+
+def _available_cpus():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
 
+def _read_range(cls, path, start, end, uri):
+    # Parse a byte range of a file in a worker process, returning the
+    # distinct terms and the triples as a flat array of term indexes, which
+    # are much cheaper to send back than the triples themselves.
+    reader = cls()
+    with open(path, 'rb') as file:
+        file.seek(start)
+        data = file.read(end - start)
+    terms = TermDictionary()
+    ids = array('q')
+    try:
+        for triple in reader.read(data, uri):
+            ids.extend(map(terms.encode, triple))
+    except ParseError:
+        # Parse again, counting lines from the start of the file.
+        with open(path, 'rb') as file:
+            line_num = 0
+            while file.tell() < start:
+                block = file.read(min(reader.CHUNK_SIZE, start - file.tell()))
+                line_num += block.count(b'\n')
+        text = reader._decode(data, line_num)
+        for triple in reader._read_text(text, uri, line_num, ({}, {})):
+            pass
+        raise
+    return list(terms), ids
@@ -1,7 +1,10 @@
+import io
+import itertools
 import re
 import sys
 import urllib.parse
 from io import BytesIO, StringIO
+from xml.sax.saxutils import escape
 
 from lxml import etree
 from lxml.etree import QName
@@ -9,7 +12,8 @@ from lxml.etree import QName
 from rdf.uri import URI
 from rdf.blanknode import BlankNode
 from rdf.literal import PlainLiteral, TypedLiteral
-from rdf.namespace import Namespace, RDF, XML
+from rdf.namespace import Namespace, RDF, RDFS, TEST, XML, XSD, OWL, FN
+from rdf.graph import Graph
 from rdf.syntax.exceptions import ParseError
 
 
@@ -17,14 +21,15 @@ _XML_ATTRS = {QName(XML, 'base'), QName(XML, 'lang')}
 _OLD_ATTRS = {QName(RDF, 'aboutEach'), QName(RDF, 'aboutEachPrefix'),
               QName(RDF, 'bagID')}
 _SMP_NAME = "\U00010000-\U000EFFFF" if sys.maxunicode > 65535 else "" 
-_NAME = re.compile("^(?:[:A-Z_a-z\xC0-\xD6\xD8-\xF6\u00F8-\u02FF\u0370-"
-    "\u037D\u037F-\u1FFF\u200C-\u200D\u2070-\u218F\u2C00-\u2FEF\u3001-"
-    "\uD7FF\uF900-\uFDCF\uFDF0-\uFFFD][-.0-9\xB7"
-    "\u0300-\u036F\u203F-\u2040{0}]*)+$".format(_SMP_NAME))
-_NCNAME = re.compile("^(?:[A-Z_a-z\xC0-\xD6\xD8-\xF6\u00F8-\u02FF\u0370-"
-    "\u037D\u037F-\u1FFF\u200C-\u200D\u2070-\u218F\u2C00-\u2FEF\u3001-"
-    "\uD7FF\uF900-\uFDCF\uFDF0-\uFFFD][-.0-9\xB7"
-    "\u0300-\u036F\u203F-\u2040{0}]*)+$".format(_SMP_NAME))
+_NAME_START_CHAR = ("A-Z_a-z\xC0-\xD6\xD8-\xF6\u00F8-\u02FF\u0370-\u037D"
+    "\u037F-\u1FFF\u200C-\u200D\u2070-\u218F\u2C00-\u2FEF\u3001-\uD7FF"
+    "\uF900-\uFDCF\uFDF0-\uFFFD")
+_NAME_CHAR = "-.0-9\xB7\u0300-\u036F\u203F-\u2040" + _SMP_NAME
+_NAME = re.compile("^(?:[:{0}][{1}]*)+$".format(_NAME_START_CHAR, _NAME_CHAR))
+_NCNAME = re.compile("^(?:[{0}][{1}]*)+$".format(_NAME_START_CHAR, _NAME_CHAR))
+# The longest NCName at the end of a URI, used to split it into a QName.
+_LOCAL_NAME = re.compile(r"(?:[{0}][{1}]*)+\Z".format(_NAME_START_CHAR,
+                                                    _NAME_CHAR))
 
 class Element(etree.ElementBase):
     def _init(self):
@@ -50,12 +55,16 @@ class RDFXMLReader:
     ILLEGAL_PROPERTY_ATTRS = SYNTAX_TERMS | OLD_TERMS
 
     _PARSER_LOOKUP = etree.ElementDefaultClassLookup(element=Element)
+    # Bytes read at a time by iterread.
+    CHUNK_SIZE = 1 << 16
     
-    def __init__(self, parser=None):
+    def __init__(self, parser=None, terms=None):
         if parser is None:
             parser = etree.XMLParser(remove_comments=True, remove_pis=True)
             parser.set_element_class_lookup(self._PARSER_LOOKUP)
         self.parser = parser
+        # An optional TermTable in which to intern the terms read.
+        self.terms = terms
     
     def read(self, lines, base_uri=None):
         root = etree.parse(lines, self.parser, base_url=base_uri).getroot()
@@ -66,6 +75,59 @@ class RDFXMLReader:
             for triple in self._node_element(element, ids):
                 yield triple
 
+    def iterread(self, lines, base_uri=None):
+        """Generate the triples in an RDF/XML document as it is parsed.
+
+        The document is read from a file object or file name in chunks of
+        CHUNK_SIZE. Triples are yielded as each node element in rdf:RDF
+        closes, and the parsed elements are then freed, so memory use is
+        bounded by the largest node element rather than the whole document.
+        The document is parsed with an lxml.etree.XMLPullParser rather than
+        the reader's parser.
+
+        """
+        parser = etree.XMLPullParser(events=('start', 'end'),
+                                     base_url=base_uri,
+                                     remove_comments=True, remove_pis=True)
+        parser.set_element_class_lookup(self._PARSER_LOOKUP)
+        ids = set()
+        root = None
+        depth = 0
+        for event, element in self._events(lines, parser):
+            if event == 'start':
+                if root is None:
+                    root = element
+                depth += 1
+                continue
+            depth -= 1
+            # rdf:RDF is not necessarily the root element.
+            if depth == 1 and root.uri == RDF.RDF:
+                self._validate(element)
+                for triple in self._node_element(element, ids):
+                    yield triple
+                element.clear()
+                while element.getprevious() is not None:
+                    del root[0]
+            elif depth == 0 and root.uri != RDF.RDF:
+                self._validate(element)
+                for triple in self._node_element(element, ids):
+                    yield triple
+
+    def _events(self, lines, parser):
+        if isinstance(lines, str):
+            with open(lines, 'rb') as file:
+                yield from self._events(file, parser)
+            return
+        while True:
+            data = lines.read(self.CHUNK_SIZE)
+            if data:
+                parser.feed(data)
+            else:
+                parser.close()
+            yield from parser.read_events()
+            if not data:
+                break
+
     def _validate(self, element):
         for attr, value in element.items():
             attr = QName(attr)
@@ -87,6 +149,7 @@ class RDFXMLReader:
         if element.uri in self.ILLEGAL_NODE_TAGS:
             raise ParseError("Illegal node element: {!s}".format(element.tag))
 
+        element.uri = self._intern(element.uri)
         element.subject = self._subject(element, ids)
 
         # 2.13 Typed Node Elements
@@ -112,7 +175,7 @@ class RDFXMLReader:
         elif node_id is not None:
             if about is None:
                 if _NCNAME.match(node_id):
-                    return BlankNode(node_id)
+                    return self._intern(BlankNode(node_id))
                 raise ParseError
             raise ParseError
         elif about is not None:
@@ -122,7 +185,15 @@ class RDFXMLReader:
     def _uri(self, uri, base_uri=None):
         if base_uri and not uri:
             base_uri = base_uri.rsplit('#', 1)[0]
-        return URI(urllib.parse.urljoin(base_uri or '', uri))
+        uri = urllib.parse.urljoin(base_uri or '', uri)
+        if self.terms is not None:
+            return self.terms.uri(uri)
+        return URI(uri)
+
+    def _intern(self, term):
+        if self.terms is not None:
+            return self.terms.intern(term)
+        return term
 
     def _id(self, element, ids):
         name = element.get(QName(RDF, 'ID'))
@@ -141,12 +212,13 @@ class RDFXMLReader:
         # 2.5 Property Attributes
         for attr, value in element.items():
             if attr not in _XML_ATTRS:
-                predicate = URI(QName(attr))
+                predicate = self._intern(URI(QName(attr)))
                 if predicate not in self.ILLEGAL_PROPERTY_ATTRS:
                     if predicate != RDF.type:
-                        object_ = PlainLiteral(value, element.language)
+                        object_ = self._intern(PlainLiteral(value,
+                                                            element.language))
                     else:
-                        object_ = URI(value)
+                        object_ = self._intern(URI(value))
                     yield (element.subject, predicate, object_)
                 elif predicate == RDF.li:
                     raise ParseError("rdf:li is not allowed as attribute")
@@ -163,6 +235,7 @@ class RDFXMLReader:
                 # Container Membership Property Elements: rdf:li and rdf:_n
                 element.uri = RDF['_' + str(li_counter)]
                 li_counter += 1
+            element.uri = self._intern(element.uri)
 
             parse_type = element.attrib.get(QName(RDF, 'parseType'))
             legal_attrs = _XML_ATTRS | {QName(RDF, 'ID')}
@@ -182,7 +255,8 @@ class RDFXMLReader:
                 else:
                     raise ParseError
             elif len(element) == 0:
-                if element.text:
+                # An empty element with rdf:datatype is an empty literal.
+                if element.text or QName(RDF, 'datatype') in element.attrib:
                     legal_attrs.add(QName(RDF, 'datatype'))
                     if all(attr in legal_attrs for attr in element.keys()):
                         triples = self._literal_property(element, parent, ids)
@@ -216,9 +290,10 @@ class RDFXMLReader:
         # 7.2.16 Production literalPropertyElt
         datatype = element.get(QName(RDF, 'datatype'))
         if datatype is not None:
-            object_ = TypedLiteral(element.text, URI(datatype))
+            object_ = TypedLiteral(element.text or "", self._uri(datatype))
         else:
             object_ = PlainLiteral(element.text, element.language)
+        object_ = self._intern(object_)
         triple = (parent.subject, element.uri, object_)
         yield triple
         id_ = self._id(element, ids)
@@ -291,7 +366,7 @@ class RDFXMLReader:
         id_ = self._id(element, ids)
         literal_attrs = _XML_ATTRS | {QName(RDF, 'ID')}
         if all(attr in literal_attrs for attr in element.keys()):
-            object_ = PlainLiteral("", element.language)
+            object_ = self._intern(PlainLiteral("", element.language))
             triple = (parent.subject, element.uri, object_)
             yield triple
             if id_ is not None:
@@ -307,7 +382,7 @@ class RDFXMLReader:
                     raise ParseError
             elif node_id is not None:
                 if _NCNAME.match(node_id):
-                    object_ = BlankNode(node_id)
+                    object_ = self._intern(BlankNode(node_id))
                 else:
                     raise ParseError("rdf:nodeID does not match NCName: {!r}".format(node_id))
             else:
@@ -322,15 +397,279 @@ class RDFXMLReader:
             property_attrs -= literal_attrs | {QName(RDF, 'resource'),
                                                QName(RDF, 'nodeID')}
             for attr in property_attrs:
-                predicate = URI(QName(attr))
+                predicate = self._intern(URI(QName(attr)))
                 if predicate in self.XML_TERMS:
                     continue
                 elif predicate in self.ILLEGAL_PROPERTY_ATTRS:
                     raise ParseError
                 value = element.get(attr)
                 if predicate != RDF.type:
-                    object_ = PlainLiteral(value, element.language)
+                    object_ = self._intern(PlainLiteral(value,
+                                                        element.language))
                 else:
                     object_ = self._uri(value, element.base_uri)
                 yield (subject, predicate, object_)
 
+
+class RDFXMLWriter:
+    """Write triples as RDF/XML that RDFXMLReader can read.
+
+    Each subject is written as one node element, named by one of its
+    rdf:type values where that has a QName. Lists of resources whose nodes
+    are not used elsewhere are written with rdf:parseType="Collection".
+    Namespace prefixes are taken from PREFIXES and the prefixes given, and
+    generated for other namespaces.
+
+    This is not a streaming writer. Grouping triples by subject and
+    finding the lists needs the whole graph, so triples that are not
+    already in a Graph are first collected into one. Memory use is the
+    same as materialising the graph. Only the output is produced in
+    pieces: no tree of the document is built, and the text is written
+    BUFFER_SIZE elements at a time.
+
+    """
+    PREFIXES = {'rdf': RDF, 'rdfs': RDFS, 'test': TEST, 'xsd': XSD,
+                'owl': OWL, 'fn': FN}
+    # Types that cannot name a node element without changing its meaning.
+    ILLEGAL_TYPES = RDFXMLReader.ILLEGAL_NODE_TAGS | {RDF.Description}
+    ILLEGAL_PREDICATES = RDFXMLReader.ILLEGAL_PROPERTY_TAGS | {RDF.li}
+
+    ATTR_ESCAPE = {'"': '&quot;', '\t': '&#9;', '\n': '&#10;', '\r': '&#13;'}
+    TEXT_ESCAPE = {'\r': '&#13;'}
+    INVALID_CHAR = re.compile('[^\t\n\r -\uD7FF\uE000-\uFFFD{}]'.format(
+        "\U00010000-\U0010FFFF" if sys.maxunicode > 65535 else ""))
+
+    BUFFER_SIZE = 1 << 10
+
+    def __init__(self, prefixes=None):
+        # A mapping of prefixes to namespaces, preferred to PREFIXES. The
+        # rdf and xml prefixes are reserved.
+        self.prefixes = dict(prefixes or {})
+
+    def write(self, triples, file):
+        """Write triples to a text or binary file object.
+
+        Binary sinks are written UTF-8 bytes, and text sinks strings.
+        Triples that are not in a Graph are first collected into one, so
+        the whole graph is held in memory either way.
+
+        """
+        binary = isinstance(file, (io.RawIOBase, io.BufferedIOBase))
+        chunks = self._chunks(triples)
+        while True:
+            block = ''.join(itertools.islice(chunks, self.BUFFER_SIZE))
+            if not block:
+                break
+            file.write(block.encode('utf-8') if binary else block)
+
+    def dump(self, triples, path):
+        """Write triples to the file at path."""
+        with open(path, 'wb') as file:
+            self.write(triples, file)
+
+    def _chunks(self, triples):
+        graph = triples if isinstance(triples, Graph) else Graph(triples)
+        namespaces = self._namespaces(graph)
+        collections, listed = self._collections(graph)
+        node_ids = self._node_ids(graph)
+        yield '<?xml version="1.0"?>\n<rdf:RDF'
+        for namespace, prefix in sorted(namespaces.items(),
+                                        key=lambda item: item[1]):
+            if prefix == 'xml':
+                continue
+            yield '\n    xmlns:{}={}'.format(prefix, self._attr(namespace))
+        yield '>\n'
+        sort_key = lambda term: self._sort_key(term, node_ids)
+        for subject in sorted(graph.subjects(), key=sort_key):
+            if subject not in listed:
+                yield self._node_element(graph, subject, namespaces,
+                                         collections, node_ids)
+        yield '</rdf:RDF>\n'
+
+    def _namespaces(self, graph):
+        # Map the namespaces of the predicates and types to prefixes.
+        known = {str(RDF): 'rdf', str(XML): 'xml'}
+        used = {'rdf', 'xml'}
+        for prefixes in (self.prefixes, self.PREFIXES):
+            for prefix, namespace in sorted(prefixes.items()):
+                if prefix not in used and str(namespace) not in known:
+                    known[str(namespace)] = prefix
+                    used.add(prefix)
+        namespaces = {str(RDF): 'rdf'}
+        generated = ('ns{}'.format(i) for i in itertools.count())
+        uris = graph.predicates() | graph.objects(None, RDF.type)
+        for uri in sorted(uri for uri in uris if isinstance(uri, URI)):
+            split = self._split(uri)
+            if split is None or split[0] in namespaces:
+                continue
+            prefix = known.get(split[0])
+            if prefix is None:
+                prefix = next(prefix for prefix in generated
+                              if prefix not in used)
+            namespaces[split[0]] = prefix
+        return namespaces
+
+    def _collections(self, graph):
+        # Find the lists that can be written as collections, and the list
+        # nodes that are then not written as node elements of their own.
+        collections = {}
+        listed = set()
+        for head in graph.subjects(RDF.first):
+            incoming = list(itertools.islice(graph.triples(None, None, head),
+                                             2))
+            if (len(incoming) != 1 or
+                incoming[0][1] in (RDF.first, RDF.rest)):
+                continue
+            items = self._collection(graph, head)
+            if items is not None:
+                collections[head] = [item for node, item in items]
+                listed.update(node for node, item in items)
+        return collections, listed
+
+    def _collection(self, graph, node):
+        items = []
+        while node != RDF.nil:
+            if not isinstance(node, BlankNode):
+                return None
+            triples = list(itertools.islice(graph.triples(node), 3))
+            predicates = {predicate for subject, predicate, object_ in triples}
+            if len(triples) != 2 or predicates != {RDF.first, RDF.rest}:
+                return None
+            if items and len(list(itertools.islice(
+                    graph.triples(None, None, node), 2))) != 1:
+                return None
+            values = dict((predicate, object_)
+                          for subject, predicate, object_ in triples)
+            item = values[RDF.first]
+            if not isinstance(item, (URI, BlankNode)):
+                return None
+            items.append((node, item))
+            node = values[RDF.rest]
+        return items
+
+    def _node_element(self, graph, subject, namespaces, collections,
+                      node_ids):
+        attr = self._subject_attr(subject, node_ids)
+        sort_key = lambda triple: (self._sort_key(triple[1], node_ids),
+                                   self._sort_key(triple[2], node_ids))
+        triples = sorted(graph.triples(subject), key=sort_key)
+        tag = 'rdf:Description'
+        for triple in triples:
+            type_ = triple[2]
+            if (triple[1] == RDF.type and isinstance(type_, URI) and
+                type_ not in self.ILLEGAL_TYPES):
+                qname = self._qname(type_, namespaces)
+                if qname is not None:
+                    tag = qname
+                    triples.remove(triple)
+                    break
+        if not triples:
+            return '  <{}{}/>\n'.format(tag, attr)
+        lines = ['  <{}{}>\n'.format(tag, attr)]
+        for subject, predicate, object_ in triples:
+            lines.append(self._property_element(predicate, object_,
+                                                namespaces, collections,
+                                                node_ids))
+        lines.append('  </{}>\n'.format(tag))
+        return ''.join(lines)
+
+    def _property_element(self, predicate, object_, namespaces, collections,
+                          node_ids):
+        if not isinstance(predicate, URI):
+            raise TypeError("Cannot serialize term: {!r}".format(predicate))
+        qname = self._qname(predicate, namespaces)
+        if qname is None or predicate in self.ILLEGAL_PREDICATES:
+            raise ValueError("Cannot write predicate as RDF/XML: "
+                             "{!r}".format(predicate))
+        if object_ in collections:
+            items = ''.join('      <rdf:Description{}/>\n'.format(
+                                self._subject_attr(item, node_ids))
+                            for item in collections[object_])
+            return ('    <{0} rdf:parseType="Collection">\n{1}'
+                    '    </{0}>\n'.format(qname, items))
+        elif isinstance(object_, URI):
+            return '    <{} rdf:resource={}/>\n'.format(qname,
+                                                        self._attr(object_))
+        elif isinstance(object_, BlankNode):
+            return '    <{} rdf:nodeID="{}"/>\n'.format(
+                qname, self._node_id(object_, node_ids))
+        elif isinstance(object_, PlainLiteral):
+            attr = ''
+            if object_.language is not None:
+                attr = ' xml:lang=' + self._attr(object_.language)
+        elif isinstance(object_, TypedLiteral):
+            attr = ' rdf:datatype=' + self._attr(object_.datatype)
+        else:
+            raise TypeError("Cannot serialize term: {!r}".format(object_))
+        return '    <{0}{1}>{2}</{0}>\n'.format(
+            qname, attr, self._text(object_.lexical_form))
+
+    def _subject_attr(self, subject, node_ids):
+        if isinstance(subject, URI):
+            return ' rdf:about=' + self._attr(subject)
+        elif isinstance(subject, BlankNode):
+            return ' rdf:nodeID="{}"'.format(self._node_id(subject, node_ids))
+        raise TypeError("Cannot serialize term: {!r}".format(subject))
+
+    def _split(self, uri):
+        # Split a URI into a namespace and an NCName, if it can be.
+        if not isinstance(uri, URI):
+            return None
+        match = _LOCAL_NAME.search(uri)
+        if match is None or match.start() == 0:
+            return None
+        return str(uri[:match.start()]), match.group()
+
+    def _qname(self, uri, namespaces):
+        split = self._split(uri)
+        if split is None:
+            return None
+        namespace, local_name = split
+        return namespaces[namespace] + ':' + local_name
+
+    def _sort_key(self, term, node_ids):
+        if isinstance(term, URI):
+            return (0, str(term))
+        elif isinstance(term, BlankNode):
+            return (1, self._node_id(term, node_ids))
+        elif isinstance(term, PlainLiteral):
+            return (2, term.lexical_form, term.language or '')
+        elif isinstance(term, TypedLiteral):
+            return (3, term.lexical_form, str(term.datatype))
+        raise TypeError("Cannot serialize term: {!r}".format(term))
+
+    def _node_ids(self, graph):
+        # The blank nodes whose node IDs are written as they are, and the
+        # labels taken by them.
+        labels = {node: node.node_id for node in graph.nodes()
+                  if isinstance(node, BlankNode) and
+                  node.node_id is not None and _NCNAME.match(node.node_id)}
+        return labels, set(labels.values())
+
+    def _node_id(self, bnode, node_ids):
+        # Node IDs that are not NCNames, and blank nodes without one, are
+        # given generated names for the rest of the document, which skip
+        # the node IDs used in the graph.
+        labels, used = node_ids
+        node_id = labels.get(bnode)
+        if node_id is None:
+            number = len(used) + 1
+            while 'genid{}'.format(number) in used:
+                number += 1
+            node_id = 'genid{}'.format(number)
+            labels[bnode] = node_id
+            used.add(node_id)
+        return node_id
+
+    def _attr(self, value):
+        return '"' + escape(self._check(value), self.ATTR_ESCAPE) + '"'
+
+    def _text(self, value):
+        return escape(self._check(value), self.TEXT_ESCAPE)
+
+    def _check(self, value):
+        match = self.INVALID_CHAR.search(value)
+        if match is not None:
+            raise ValueError("Cannot write character in XML: "
+                             "{!r}".format(match.group()))
+        return value
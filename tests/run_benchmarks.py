@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""Time parsing, isomorphism and entailment over the rdfcore test corpus.
+
+Every document the manifest refers to is parsed by its reader, the graphs
+of each positive parser test are compared, and each entailment test's
+entailment is checked. Scaled synthetic workloads follow: a long list, a
+deep class hierarchy, and a graph made mostly of blank nodes. A large
+N-Triples file is then loaded sequentially and by load_parallel with
+increasing numbers of workers, to show how loading scales.
+
+The timings, the best of --repeat runs each, are written as JSON. The
+file written by the previous run is read first as the baseline, and the
+timings that got slower by more than --threshold are reported.
+
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+from rdf.blanknode import BlankNode
+from rdf.literal import PlainLiteral
+from rdf.namespace import RDF, RDFS, TEST
+from rdf.graph import Graph
+from rdf.syntax.ntriples import NTriplesReader, NTriplesWriter
+from rdf.syntax.rdfxml import RDFXMLReader, RDFXMLWriter
+from rdf.semantics.entailment import RDFS_ENTAILMENT
+from rdf.testcases.manifest import Manifest
+from rdf.testcases.test import PositiveParserTest, PositiveEntailmentTest, \
+                               NegativeEntailmentTest
+from rdf.testcases.unittest import RDFTestCase
+from util import open_data_file, TEST_OPENER, EX
+
+
+RESULTS_PATH = os.path.join(os.path.dirname(__file__), 'benchmarks.json')
+
+def best(function, repeat, setup=None):
+    """Return the least time of repeat calls to function.
+
+    If setup is given, function is called with the arguments it returns,
+    which are made anew for each call and are not timed.
+
+    """
+    times = []
+    for i in range(repeat):
+        args = () if setup is None else setup()
+        start = time.perf_counter()
+        function(*args)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def documents(manifest):
+    seen = set()
+    for test in manifest:
+        for name in ('input_documents', 'premise_documents', 'documents'):
+            seen.update(getattr(test, name, ()))
+        for name in ('output_document', 'input_document',
+                     'conclusion_document'):
+            document = getattr(test, name, None)
+            if document is not None:
+                seen.add(document)
+    return sorted((document for document in seen
+                   if document.uri is not None and
+                   document.type != TEST['False-Document']),
+                  key=lambda document: document.uri)
+
+def parse(document, repeat):
+    with document.open(TEST_OPENER) as file:
+        text = file.read()
+    reader = document.get_reader()
+    def read():
+        return list(reader.read(io.StringIO(text), document.uri))
+    try:
+        triples = read()
+    except Exception:
+        # Negative parser tests, which are timed up to the error.
+        triples = []
+    def run():
+        try:
+            read()
+        except Exception:
+            pass
+    return type(reader).__name__, len(triples), best(run, repeat)
+
+def test_case(test):
+    # The test case set up as the test suite would, or None if skipped.
+    case = RDFTestCase.from_test(test)
+    case.opener = TEST_OPENER
+    try:
+        case.setUp()
+    except unittest.SkipTest:
+        return None
+    return case
+
+def bench_corpus(manifest, repeat, timings, out=sys.stdout):
+    readers = {}
+    for document in documents(manifest):
+        reader, triples, seconds = parse(document, repeat)
+        timings['parse/' + document.uri] = seconds
+        total = readers.setdefault(reader, [0, 0, 0.0])
+        total[0] += 1
+        total[1] += triples
+        total[2] += seconds
+    for reader, (count, triples, seconds) in sorted(readers.items()):
+        timings['parse/' + reader] = seconds
+        print("{}: {} documents, {} triples, {:.3f}s".format(
+            reader, count, triples, seconds), file=out)
+
+    for test in manifest:
+        case = None
+        if isinstance(test, (PositiveParserTest, PositiveEntailmentTest,
+                             NegativeEntailmentTest)):
+            case = test_case(test)
+        if case is None:
+            continue
+        elif isinstance(test, PositiveParserTest):
+            timings['isomorphism/' + test.uri] = best(
+                isomorphic, repeat,
+                lambda: copies(case.input_graph, case.output_graph))
+        elif case.premise is not False and case.conclusion is not False:
+            if isinstance(test, PositiveEntailmentTest):
+                entailments = [case.merged_entailment]
+            else:
+                entailments = case.entailments
+            def entail():
+                for entailment in entailments:
+                    entailment.entails(case.premise, case.conclusion)
+            timings['entailment/' + test.uri] = best(entail, repeat)
+
+def isomorphic(graph, other):
+    return graph == other
+
+def copies(*graphs):
+    # Graphs cache their canonical forms, so each comparison is timed on
+    # fresh copies.
+    return tuple(Graph(graph) for graph in graphs)
+
+def synthetic_list(size):
+    nodes = [BlankNode() for i in range(size)]
+    graph = Graph({(EX.list, EX.items, nodes[0])})
+    for i, node in enumerate(nodes):
+        graph.add((node, RDF.first, PlainLiteral(str(i))))
+        graph.add((node, RDF.rest, nodes[i + 1] if i + 1 < size else RDF.nil))
+    return graph
+
+def synthetic_hierarchy(depth):
+    graph = Graph((EX['c{}'.format(i + 1)], RDFS.subClassOf,
+                   EX['c{}'.format(i)]) for i in range(depth))
+    graph.add((EX.x, RDF.type, EX['c{}'.format(depth)]))
+    return graph
+
+def synthetic_blank_nodes(size):
+    # A ring of blank nodes with chords, each with a few properties, so
+    # that the nodes are only told apart by their neighbourhoods.
+    nodes = [BlankNode() for i in range(size)]
+    graph = Graph()
+    for i, node in enumerate(nodes):
+        graph.add((node, EX.next, nodes[(i + 1) % size]))
+        graph.add((node, EX.chord, nodes[(i * 7 + 3) % size]))
+        graph.add((node, EX.value, PlainLiteral(str(i % 10))))
+    return graph
+
+def relabel(graph):
+    nodes = {}
+    def term(term):
+        if isinstance(term, BlankNode):
+            return nodes.setdefault(term, BlankNode())
+        return term
+    return Graph(tuple(term(t) for t in triple) for triple in graph)
+
+def bench_synthetic(scale, repeat, timings):
+    def parse(name, graph):
+        for writer, reader in ((NTriplesWriter(), NTriplesReader()),
+                               (RDFXMLWriter(), RDFXMLReader())):
+            file = io.StringIO()
+            writer.write(graph, file)
+            text = file.getvalue()
+            key = 'synthetic/{}/parse/{}'.format(name, type(reader).__name__)
+            timings[key] = best(
+                lambda: list(reader.read(io.StringIO(text))), repeat)
+
+    def isomorphism(name, graph):
+        copy = relabel(graph)
+        timings['synthetic/{}/isomorphism'.format(name)] = best(
+            isomorphic, repeat, lambda: copies(graph, copy))
+
+    graph = synthetic_list(1000 * scale)
+    parse('list', graph)
+    isomorphism('list', graph)
+
+    depth = 100 * scale
+    graph = synthetic_hierarchy(depth)
+    parse('hierarchy', graph)
+    timings['synthetic/hierarchy/entails'] = best(
+        lambda: RDFS_ENTAILMENT.entails(
+            graph, Graph({(EX.x, RDF.type, EX.c0)})), repeat)
+    timings['synthetic/hierarchy/closure'] = best(
+        lambda: RDFS_ENTAILMENT.entails(
+            graph, Graph({(EX.x, RDF.type, EX.missing)})), repeat)
+
+    graph = synthetic_blank_nodes(200 * scale)
+    parse('blank_nodes', graph)
+    isomorphism('blank_nodes', graph)
+
+def bench_load(scale, repeat, timings, out=sys.stdout):
+    reader = NTriplesReader()
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'list.nt')
+        NTriplesWriter().dump(synthetic_list(50000 * scale), path)
+        def read():
+            with open(path, 'rb') as file:
+                return Graph(reader.read(file))
+        timings['load/read'] = sequential = best(read, repeat)
+        print("load: read {:.3f}s".format(sequential), file=out)
+        for workers in (1, 2, 4):
+            for compact in (False, True):
+                key = 'load/{}/{}'.format(
+                    'compact' if compact else 'graph', workers)
+                timings[key] = seconds = best(
+                    lambda: reader.load_parallel(path, max_workers=workers,
+                                                 compact=compact), repeat)
+                print("load: {} workers{} {:.3f}s ({:.2f}x)".format(
+                    workers, ", compact" if compact else "", seconds,
+                    sequential / seconds), file=out)
+
+def compare(timings, baseline, threshold, out=sys.stdout):
+    """Print the timings that changed by more than threshold.
+
+    Return the number of timings that got slower.
+
+    """
+    slower = 0
+    for key, seconds in sorted(timings.items()):
+        previous = baseline.get(key)
+        # Timings under a millisecond are mostly noise.
+        if previous is None or max(seconds, previous) < 1e-3:
+            continue
+        ratio = seconds / previous if previous else float('inf')
+        if ratio > 1 + threshold:
+            slower += 1
+            print("slower: {} {:.4f}s -> {:.4f}s ({:.2f}x)".format(
+                key, previous, seconds, ratio), file=out)
+        elif ratio < 1 / (1 + threshold):
+            print("faster: {} {:.4f}s -> {:.4f}s ({:.2f}x)".format(
+                key, previous, seconds, ratio), file=out)
+    return slower
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('-o', '--output', default=RESULTS_PATH,
+                        help="where to write the results as JSON")
+    parser.add_argument('-b', '--baseline',
+                        help="results to compare with; by default, the "
+                             "previous contents of the output file")
+    parser.add_argument('-r', '--repeat', type=int, default=3,
+                        help="runs of each benchmark, of which the best "
+                             "is kept")
+    parser.add_argument('-s', '--scale', type=int, default=1,
+                        help="size factor of the synthetic workloads")
+    parser.add_argument('-t', '--threshold', type=float, default=0.2,
+                        help="relative slowdown that is reported")
+    parser.add_argument('--no-corpus', action='store_true',
+                        help="only run the synthetic workloads")
+    args = parser.parse_args(argv)
+
+    baseline_path = args.baseline or args.output
+    baseline = None
+    if os.path.exists(baseline_path):
+        with open(baseline_path) as file:
+            baseline = json.load(file)
+
+    timings = {}
+    if not args.no_corpus:
+        manifest = Manifest(open_data_file('rdfcore/Manifest.rdf'))
+        bench_corpus(manifest, args.repeat, timings)
+    bench_synthetic(args.scale, args.repeat, timings)
+    bench_load(args.scale, args.repeat, timings)
+
+    results = {'python': sys.version.split()[0], 'repeat': args.repeat,
+               'scale': args.scale, 'timings': timings}
+    with open(args.output, 'w') as file:
+        json.dump(results, file, indent=2, sort_keys=True)
+    print("{} timings written to {}".format(len(timings), args.output))
+
+    if baseline is not None:
+        if baseline.get('scale') != args.scale:
+            print("baseline has scale {}; not compared".format(
+                baseline.get('scale')))
+            return 0
+        slower = compare(timings, baseline['timings'], args.threshold)
+        print("{} timings slower than the baseline".format(slower))
+        return 1 if slower else 0
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
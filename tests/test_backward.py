@@ -0,0 +1,79 @@
+import unittest
+
+from rdf.blanknode import BlankNode
+from rdf.namespace import RDF, RDFS
+from rdf.graph import Graph
+from rdf.semantics.entailment import RDFS_ENTAILMENT, SIMPLE_ENTAILMENT_LG
+from rdf.semantics.backward import Prover
+from rdf.semantics.reasoner import Reasoner
+
+from util import EX, example_premise
+
+
+class TestProver(unittest.TestCase):
+    def setUp(self):
+        self.premise = example_premise()
+        self.prover = Prover(RDFS_ENTAILMENT, self.premise)
+
+    def test_solve_ground_goal(self):
+        self.assertEqual(self.prover.solve((EX.x, RDF.type, EX.c)),
+                         {(EX.x, RDF.type, EX.c)})
+        self.assertEqual(self.prover.solve((EX.x, RDF.type, EX.z)), set())
+
+    def test_solve_matches_closure(self):
+        closure = Reasoner(RDFS_ENTAILMENT, self.premise)
+        for goal in [(EX.x, RDF.type, None), (None, RDFS.subClassOf, EX.c),
+                     (EX.d, None, None)]:
+            self.assertEqual(self.prover.solve(goal),
+                             set(closure.triples(*goal)))
+
+    def test_solve_cyclic_goals(self):
+        # Each subclass goal in the cycle a, b, c depends on the others.
+        premise = example_premise((EX.c, RDFS.subClassOf, EX.a))
+        prover = Prover(RDFS_ENTAILMENT, premise)
+        closure = Reasoner(RDFS_ENTAILMENT, premise)
+        for goal in [(EX.c, RDFS.subClassOf, EX.b), (EX.x, RDF.type, None),
+                     (None, RDFS.subClassOf, None)]:
+            self.assertEqual(prover.solve(goal), set(closure.triples(*goal)))
+
+    def test_fragment_matches_blank_nodes(self):
+        fragment = self.prover.fragment({(EX.x, RDF.type, BlankNode())})
+        self.assertTrue((EX.x, RDF.type, EX.d) in fragment)
+        self.assertFalse((EX.a, RDFS.subClassOf, EX.b) in fragment)
+
+
+class TestBackwardEntailment(unittest.TestCase):
+    def setUp(self):
+        self.premise = example_premise()
+
+    def test_agrees_with_forward_chaining(self):
+        conclusions = [Graph({(EX.x, RDF.type, EX.c)}),
+                       Graph({(EX.x, RDF.type, EX.d),
+                              (EX.d, RDF.type, RDFS.Class)}),
+                       Graph({(EX.p, RDF.type, RDF.Property)}),
+                       Graph({(EX.c, RDFS.subClassOf, EX.a)}),
+                       Graph({(EX.x, RDF.type, EX.z)})]
+        for e in conclusions:
+            self.assertEqual(
+                RDFS_ENTAILMENT.entails(self.premise, e, backward=True),
+                RDFS_ENTAILMENT.entails(self.premise, e))
+
+    def test_agrees_with_forward_chaining_on_cycles(self):
+        premise = example_premise((EX.c, RDFS.subClassOf, EX.a),
+                                  (EX.d, RDFS.subClassOf, EX.d))
+        for e in [Graph({(EX.c, RDFS.subClassOf, EX.b)}),
+                  Graph({(EX.x, RDF.type, BlankNode()),
+                         (EX.d, RDFS.subClassOf, EX.a)}),
+                  Graph({(BlankNode(), RDFS.subClassOf, EX.x)})]:
+            self.assertEqual(
+                RDFS_ENTAILMENT.entails(premise, e, backward=True),
+                RDFS_ENTAILMENT.entails(premise, e))
+
+    def test_literal_generalization(self):
+        e = Graph({(EX.x, EX.p, BlankNode())})
+        self.assertTrue(SIMPLE_ENTAILMENT_LG.entails(self.premise, e,
+                                                     backward=True))
+
+
+if __name__ == '__main__':
+    unittest.main()
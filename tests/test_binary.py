@@ -0,0 +1,107 @@
+import os
+import tempfile
+import unittest
+
+from rdf.blanknode import BlankNode
+from rdf.literal import PlainLiteral, TypedLiteral
+from rdf.namespace import RDF, XSD
+from rdf.graph import Graph
+from rdf.semantics.type import uuu
+from rdf.syntax.ntriples import NTriplesReader
+from rdf.syntax.binary import BinaryWriter, MappedGraph
+from rdf.syntax.exceptions import ParseError
+from util import open_data_file, EX
+
+
+class BinaryTestCase(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp()
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def open(self, triples):
+        BinaryWriter().dump(triples, self.path)
+        graph = MappedGraph(self.path)
+        self.addCleanup(graph.close)
+        return graph
+
+
+class TestBinaryRoundTrip(BinaryTestCase):
+    def test_round_trips_ntriples(self):
+        with open_data_file('test.nt') as file:
+            triples = set(NTriplesReader().read(file))
+        graph = self.open(triples)
+        self.assertEqual(len(graph), len(triples))
+        self.assertEqual(set(graph), triples)
+        self.assertEqual(graph, Graph(triples))
+
+    def test_round_trips_literals(self):
+        triples = {(EX.a, EX.p, PlainLiteral("chat")),
+                   (EX.a, EX.p, PlainLiteral("chat", 'fr')),
+                   (EX.a, EX.p, PlainLiteral("")),
+                   (EX.a, EX.p, PlainLiteral("", 'en')),
+                   (EX.a, EX.p, TypedLiteral("1", XSD.integer)),
+                   (EX.a, EX.p, TypedLiteral("é\0", XSD.string))}
+        self.assertEqual(set(self.open(triples)), triples)
+
+    def test_labels_unlabelled_blank_nodes(self):
+        a, b = BlankNode(), BlankNode()
+        graph = Graph([(a, EX.p, b), (b, EX.p, BlankNode('b0'))])
+        mapped = self.open(graph)
+        self.assertEqual(len(mapped), 2)
+        self.assertEqual(mapped, graph)
+
+    def test_unsupported_term_raises_type_error(self):
+        self.assertRaises(TypeError, BinaryWriter().dump,
+                          [(uuu, RDF.type, EX.C)], self.path)
+
+    def test_invalid_file_raises_parse_error(self):
+        with open(self.path, 'wb') as file:
+            file.write(b'<http://example.org/a> <http://example.org/b> ')
+        self.assertRaises(ParseError, MappedGraph, self.path)
+
+    def test_empty_file_raises_parse_error(self):
+        self.assertRaises(ParseError, MappedGraph, self.path)
+        with open(self.path, 'rb') as file:
+            self.assertRaises(ParseError, MappedGraph, file)
+
+
+class TestMappedGraph(BinaryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.triples = {(EX.a, EX.p, EX.b),
+                        (EX.a, EX.p, PlainLiteral("c")),
+                        (EX.a, EX.q, EX.b),
+                        (EX.b, EX.p, EX.a),
+                        (BlankNode('x'), RDF.type, EX.C)}
+        self.graph = self.open(self.triples)
+
+    def test_contains(self):
+        for triple in self.triples:
+            self.assertTrue(triple in self.graph)
+        self.assertFalse((EX.b, EX.q, EX.a) in self.graph)
+        self.assertFalse((EX.x, EX.y, EX.z) in self.graph)
+        self.assertFalse((EX.a, EX.p, None) in self.graph)
+
+    def test_triples(self):
+        patterns = [(None, None, None), (EX.a, None, None),
+                    (None, EX.p, None), (None, None, EX.b),
+                    (EX.a, EX.p, None), (None, EX.p, EX.b),
+                    (EX.a, None, EX.b), (EX.a, EX.p, EX.b),
+                    (BlankNode('x'), None, None), (EX.x, None, None)]
+        for pattern in patterns:
+            expected = {triple for triple in self.triples
+                        if all(term is None or term == value
+                               for term, value in zip(pattern, triple))}
+            self.assertEqual(set(self.graph.triples(*pattern)), expected)
+
+    def test_lookup_and_decode(self):
+        term_id = self.graph.lookup(EX.p)
+        self.assertEqual(self.graph.decode(term_id), EX.p)
+        self.assertEqual(self.graph.lookup(EX.z), None)
+
+
+if __name__ == '__main__':
+    unittest.main()
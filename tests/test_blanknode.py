@@ -1,4 +1,5 @@
 import unittest
+import pickle
 
 from rdf.blanknode import BlankNode
 from rdf.uri import URI
@@ -74,6 +75,14 @@ class TestBlankNodeWithNodeID(unittest.TestCase):
     def test_constructor_sets_node_id(self):
         self.assertEqual(self.bnode.node_id, 'b1')
 
+    def test_is_immutable(self):
+        self.assertRaises(AttributeError, setattr, self.bnode, 'node_id', 'b2')
+
+    def test_pickles(self):
+        bnode = pickle.loads(pickle.dumps(self.bnode))
+        self.assertEqual(bnode, self.bnode)
+        self.assertEqual(hash(bnode), hash(self.bnode))
+
     def test_repr_shows_constructor(self):
         self.assertEqual(repr(self.bnode), "BlankNode('b1')")
 
@@ -0,0 +1,218 @@
+import random
+import unittest
+
+from rdf.blanknode import BlankNode
+from rdf.literal import Literal
+from rdf.namespace import RDF, XSD
+from rdf.graph import Graph
+from rdf.compactgraph import TermDictionary, CompactGraph
+
+from util import EX
+
+
+class TestTermDictionary(unittest.TestCase):
+    def setUp(self):
+        self.terms = TermDictionary()
+
+    def test_encode_assigns_consecutive_ids(self):
+        self.assertEqual(self.terms.encode(EX.a), 0)
+        self.assertEqual(self.terms.encode(EX.b), 1)
+        self.assertEqual(len(self.terms), 2)
+
+    def test_encode_returns_existing_id(self):
+        term_id = self.terms.encode(Literal("1", XSD.integer))
+        self.assertEqual(self.terms.encode(Literal("1", XSD.integer)), term_id)
+        self.assertEqual(len(self.terms), 1)
+
+    def test_decode_returns_term(self):
+        term_id = self.terms.encode(EX.a)
+        self.assertEqual(self.terms.decode(term_id), EX.a)
+
+    def test_lookup_does_not_assign_ids(self):
+        self.assertEqual(self.terms.lookup(EX.a), None)
+        self.assertFalse(EX.a in self.terms)
+
+
+class TestCompactGraph(unittest.TestCase):
+    def setUp(self):
+        self.triples = {(EX.a, EX.p, EX.b),
+                        (EX.a, EX.p, Literal("c")),
+                        (EX.a, EX.q, EX.b),
+                        (EX.b, EX.p, EX.a),
+                        (EX.b, RDF.type, EX.C)}
+        self.graph = CompactGraph(self.triples)
+
+    def test_contains_triples(self):
+        self.assertEqual(len(self.graph), 5)
+        self.assertEqual(set(self.graph), self.triples)
+        for triple in self.triples:
+            self.assertTrue(triple in self.graph)
+        self.assertFalse((EX.b, EX.q, EX.a) in self.graph)
+        self.assertFalse((EX.x, EX.y, EX.z) in self.graph)
+
+    def test_add_ignores_duplicates(self):
+        self.graph.add((EX.a, EX.p, EX.b))
+        self.assertEqual(len(self.graph), 5)
+
+    def test_terms_are_stored_once(self):
+        self.assertEqual(len(self.graph.terms), 7)
+
+    def test_discard(self):
+        self.graph.discard((EX.a, EX.p, EX.b))
+        self.graph.discard((EX.x, EX.y, EX.z))
+        self.assertEqual(len(self.graph), 4)
+        self.assertFalse((EX.a, EX.p, EX.b) in self.graph)
+        self.assertEqual(set(self.graph),
+                         self.triples - {(EX.a, EX.p, EX.b)})
+        self.assertEqual(set(self.graph.triples(EX.a, EX.p)),
+                         {(EX.a, EX.p, Literal("c"))})
+
+    def test_remove_raises_key_error(self):
+        self.assertRaises(KeyError, self.graph.remove, (EX.x, EX.y, EX.z))
+
+    def test_discard_and_add_again(self):
+        for triple in self.triples:
+            self.graph.discard(triple)
+        self.assertEqual(len(self.graph), 0)
+        self.graph.update(self.triples)
+        self.assertEqual(set(self.graph), self.triples)
+        self.assertEqual(set(self.graph.triples(None, EX.p)),
+                         {t for t in self.triples if t[1] == EX.p})
+
+    def test_triples(self):
+        patterns = [(None, None, None), (EX.a, None, None),
+                    (None, EX.p, None), (None, None, EX.b),
+                    (EX.a, EX.p, None), (None, EX.p, EX.b),
+                    (EX.a, None, EX.b), (EX.a, EX.p, EX.b),
+                    (EX.x, None, None), (EX.b, EX.q, None)]
+        for pattern in patterns:
+            expected = {triple for triple in self.triples
+                        if all(term is None or term == value
+                               for term, value in zip(pattern, triple))}
+            self.assertEqual(set(self.graph.triples(*pattern)), expected)
+
+    def test_set_operations_return_compact_graphs(self):
+        other = CompactGraph([(EX.a, EX.p, EX.b), (EX.x, EX.y, EX.z)])
+        union = self.graph | other
+        self.assertTrue(isinstance(union, CompactGraph))
+        self.assertEqual(len(union), 6)
+        self.assertEqual(set(self.graph & other), {(EX.a, EX.p, EX.b)})
+        self.assertEqual(set(other - self.graph), {(EX.x, EX.y, EX.z)})
+
+    def test_equal_to_graph(self):
+        graph = Graph(self.triples)
+        self.assertEqual(self.graph, graph)
+        self.assertEqual(graph, self.graph)
+        self.assertEqual(self.graph, self.graph.to_graph())
+        self.assertTrue(CompactGraph(list(self.triples)[:2]) < graph)
+        self.assertTrue(graph > CompactGraph(list(self.triples)[:2]))
+
+    def test_interleaved_changes_are_merged(self):
+        graph = CompactGraph()
+        graph.PENDING_SIZE = 4
+        graph.SCAN_SIZE = 2
+        expected = set()
+        rng = random.Random(0)
+        terms = [EX[str(i)] for i in range(6)]
+        for i in range(500):
+            triple = tuple(rng.choice(terms) for j in range(3))
+            if rng.random() < 0.6:
+                graph.add(triple)
+                expected.add(triple)
+            else:
+                graph.discard(triple)
+                expected.discard(triple)
+            self.assertEqual(len(graph), len(expected))
+            self.assertEqual(triple in graph, triple in expected)
+            subject = rng.choice(terms)
+            self.assertEqual(set(graph.triples(subject)),
+                             {t for t in expected if t[0] == subject})
+        self.assertEqual(set(graph), expected)
+        for pattern in [(None, terms[0], None), (None, None, terms[1]),
+                        (terms[2], None, terms[3])]:
+            self.assertEqual(set(graph.triples(*pattern)),
+                             {t for t in expected
+                              if all(term is None or term == value
+                                     for term, value in zip(pattern, t))})
+
+    def test_extend_merges_encoded_triples(self):
+        self.graph.discard((EX.b, RDF.type, EX.C))
+        terms = [EX.a, EX.p, EX.b, EX.z, RDF.type, EX.C]
+        ids = [0, 1, 2,  3, 1, 0,  3, 1, 0,  1, 4, 5]
+        # The second range holds the terms in another order, and adds
+        # back the triple that was removed.
+        self.graph._extend([(terms, ids), (terms[::-1], [3, 1, 0])])
+        expected = self.triples | {(EX.z, EX.p, EX.a), (EX.p, RDF.type, EX.C)}
+        self.assertEqual(set(self.graph), expected)
+        self.assertEqual(len(self.graph), 7)
+        self.assertEqual(set(self.graph.triples(None, RDF.type)),
+                         {(EX.p, RDF.type, EX.C), (EX.b, RDF.type, EX.C)})
+
+    def test_compared_to_compact_graph_by_term_ids(self):
+        # The other graph numbers the terms in another order, and has rows
+        # that are pending and removed.
+        other = CompactGraph([(EX.z, EX.z, EX.z)])
+        other.update(reversed(sorted(self.triples)))
+        other.discard((EX.z, EX.z, EX.z))
+        self.assertEqual(self.graph, other)
+        self.assertTrue(self.graph.is_isomorphic(other))
+        self.assertTrue(self.graph <= other and self.graph >= other)
+        other.discard((EX.a, EX.q, EX.b))
+        self.assertNotEqual(self.graph, other)
+        self.assertTrue(other < self.graph and self.graph > other)
+        other.add((EX.a, EX.q, EX.z))
+        self.assertNotEqual(self.graph, other)
+        self.assertFalse(other <= self.graph)
+        shared = CompactGraph(list(self.triples)[:2], self.graph.terms)
+        self.assertTrue(shared < self.graph)
+        self.assertFalse(self.graph < shared)
+
+    def test_compared_to_compact_graph_with_blank_nodes(self):
+        other = CompactGraph(self.triples)
+        other.discard((EX.b, RDF.type, EX.C))
+        other.add((BlankNode(), RDF.type, EX.C))
+        self.assertTrue(self.graph.is_ground())
+        self.assertFalse(other.is_ground())
+        self.assertNotEqual(self.graph, other)
+        self.assertNotEqual(other, self.graph)
+        self.assertFalse(other < CompactGraph(self.triples | {(EX.x, EX.y,
+                                                               EX.z)}))
+
+    def test_too_many_terms_raise_value_error(self):
+        class SmallGraph(CompactGraph):
+            KEY_BITS = 4
+        graph = SmallGraph((EX[str(i)], EX.p, EX.o) for i in range(6))
+        self.assertEqual(len(graph.terms), 8)
+        self.assertRaises(ValueError, graph.add, (EX['6'], EX.p, EX.o))
+        self.assertRaises(ValueError, graph._extend,
+                          [([EX.p], [0, 0, 0]), ([EX.x], [0, 0, 0])])
+        self.assertEqual(len(graph), 6)
+
+
+
+class TestUngroundCompactGraph(unittest.TestCase):
+    def setUp(self):
+        a, b = BlankNode(), BlankNode()
+        self.graph = CompactGraph([(a, EX.p, b), (b, EX.p, a),
+                                   (a, RDF.type, EX.C)])
+
+    def test_isomorphic_to_relabelled_graph(self):
+        c, d = BlankNode(), BlankNode()
+        other = CompactGraph([(c, EX.p, d), (d, EX.p, c),
+                              (c, RDF.type, EX.C)])
+        self.assertEqual(self.graph, other)
+        self.assertEqual(other.to_graph(), self.graph)
+        self.assertEqual(self.graph.fingerprint(), other.fingerprint())
+        self.assertEqual(set(self.graph.canonicalize()),
+                         set(other.canonicalize()))
+
+    def test_not_isomorphic_to_different_graph(self):
+        c, d = BlankNode(), BlankNode()
+        other = CompactGraph([(c, EX.p, d), (d, EX.p, c),
+                              (d, RDF.type, EX.D)])
+        self.assertNotEqual(self.graph, other)
+        self.assertFalse(self.graph.is_ground())
+
+
+if __name__ == '__main__':
+    unittest.main()
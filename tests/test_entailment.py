@@ -1 +1,77 @@
+import unittest
 
+from rdf.blanknode import BlankNode
+from rdf.literal import PlainLiteral, TypedLiteral
+from rdf.namespace import RDF, RDFS, XSD
+from rdf.graph import Graph
+from rdf.semantics.entailment import RDFS_ENTAILMENT, SIMPLE_ENTAILMENT_LG
+from rdf.semantics.stats import Stats
+
+from util import EX, example_premise
+
+
+class TestRDFSEntailment(unittest.TestCase):
+    def setUp(self):
+        self.premise = example_premise((EX.c, RDFS.subClassOf, EX.e))
+
+    def test_entails_premise(self):
+        self.assertTrue(RDFS_ENTAILMENT.entails(self.premise, self.premise))
+
+    def test_entails_transitive_subclasses(self):
+        self.assertTrue(RDFS_ENTAILMENT.entails(
+            self.premise, Graph({(EX.a, RDFS.subClassOf, EX.e)})))
+
+    def test_entails_types_from_chained_rules(self):
+        self.assertTrue(RDFS_ENTAILMENT.entails(
+            self.premise, Graph({(EX.x, RDF.type, EX.e),
+                                 (EX.x, RDF.type, EX.d),
+                                 (EX.d, RDF.type, RDFS.Class)})))
+
+    def test_does_not_entail_unrelated_triples(self):
+        self.assertFalse(RDFS_ENTAILMENT.entails(
+            self.premise, Graph({(EX.e, RDFS.subClassOf, EX.a)})))
+        self.assertFalse(RDFS_ENTAILMENT.entails(
+            self.premise, Graph({(EX.x, RDF.type, EX.z)})))
+
+    def test_entails_blank_node_conclusions(self):
+        b = BlankNode()
+        self.assertTrue(RDFS_ENTAILMENT.entails(
+            self.premise, Graph({(b, RDF.type, EX.c), (b, RDF.type, EX.d)})))
+        self.assertFalse(RDFS_ENTAILMENT.entails(
+            self.premise, Graph({(b, RDF.type, EX.c), (b, RDF.type, EX.z)})))
+
+    def test_stops_early_on_blank_node_conclusions(self):
+        # x type b is derived in the first round, long before the closure.
+        b = BlankNode()
+        early, full = Stats(), Stats()
+        self.assertTrue(RDFS_ENTAILMENT.entails(
+            self.premise, Graph({(b, RDF.type, EX.b)}), stats=early))
+        self.assertFalse(RDFS_ENTAILMENT.entails(
+            self.premise, Graph({(b, RDF.type, EX.z)}), stats=full))
+        self.assertEqual(len(early.rounds), 2)
+        self.assertTrue(len(early.rounds) < len(full.rounds))
+
+    def test_entails_equal_typed_literal_values(self):
+        premise = Graph({(EX.x, EX.p, TypedLiteral("01", XSD.integer))})
+        self.assertTrue(RDFS_ENTAILMENT.entails(
+            premise, Graph({(EX.x, EX.p, TypedLiteral("1", XSD.integer))})))
+        self.assertTrue(RDFS_ENTAILMENT.entails(
+            premise, Graph({(BlankNode(), EX.p,
+                             TypedLiteral("1.0", XSD.decimal))})))
+
+    def test_entails_instances_of_type_terms(self):
+        self.assertTrue(RDFS_ENTAILMENT.entails(
+            self.premise, Graph({(RDF._3, RDF.type, RDF.Property)})))
+
+
+class TestSimpleEntailment(unittest.TestCase):
+    def test_entails_generalized_literal(self):
+        premise = Graph({(EX.a, EX.p, PlainLiteral("x"))})
+        conclusion = Graph({(EX.a, EX.p, BlankNode())})
+        self.assertTrue(SIMPLE_ENTAILMENT_LG.entails(premise, conclusion))
+        self.assertFalse(SIMPLE_ENTAILMENT_LG.entails(
+            premise, Graph({(EX.b, EX.p, BlankNode())})))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,9 +1,14 @@
+import copy
+import os
+import pickle
+import subprocess
+import sys
 import unittest
 
 from rdf.blanknode import BlankNode
 from rdf.uri import URI
 from rdf.literal import Literal
-from rdf.namespace import XSD
+from rdf.namespace import RDF, XSD
 from rdf.graph import Graph
 
 from util import EX
@@ -128,7 +133,7 @@ class TestGroundGraph(unittest.TestCase):
         self.assertEqual(self.graph, Graph(self.triples))
 
     def test_not_equal_to_graph_of_different_size(self):
-        graph = Graph(list(self.triples)[0])
+        graph = Graph(list(self.triples)[:1])
         self.assertNotEqual(self.graph, graph)
         self.assertNotEqual(graph, self.graph)
 
@@ -416,3 +421,297 @@ class TestMixedGraph(unittest.TestCase):
         self.assert_(self.graph != self.subgraph)
         self.assert_(self.subgraph != self.graph)
 
+
+class TestGraphIndexes(unittest.TestCase):
+    def setUp(self):
+        self.triples = {(EX.a, EX.property, EX.b),
+                        (EX.b, EX.property, EX.c),
+                        (EX.a, EX.other, BlankNode('x')),
+                        (BlankNode('x'), EX.property, Literal("c"))}
+        self.graph = Graph(self.triples)
+
+    def test_triples_without_terms_yields_all_triples(self):
+        self.assertEqual(set(self.graph.triples()), self.triples)
+
+    def test_triples_by_subject(self):
+        self.assertEqual(set(self.graph.triples(EX.a)),
+                         {(EX.a, EX.property, EX.b),
+                          (EX.a, EX.other, BlankNode('x'))})
+
+    def test_triples_by_predicate(self):
+        self.assertEqual(set(self.graph.triples(None, EX.other)),
+                         {(EX.a, EX.other, BlankNode('x'))})
+
+    def test_triples_by_object(self):
+        self.assertEqual(set(self.graph.triples(None, None, EX.b)),
+                         {(EX.a, EX.property, EX.b)})
+
+    def test_triples_by_subject_and_predicate(self):
+        self.assertEqual(set(self.graph.triples(BlankNode('x'), EX.property)),
+                         {(BlankNode('x'), EX.property, Literal("c"))})
+
+    def test_triples_by_subject_and_object(self):
+        self.assertEqual(set(self.graph.triples(EX.b, None, EX.c)),
+                         {(EX.b, EX.property, EX.c)})
+
+    def test_triples_by_predicate_and_object(self):
+        self.assertEqual(set(self.graph.triples(None, EX.property, EX.c)),
+                         {(EX.b, EX.property, EX.c)})
+
+    def test_triples_by_all_terms(self):
+        self.assertEqual(set(self.graph.triples(EX.a, EX.property, EX.b)),
+                         {(EX.a, EX.property, EX.b)})
+        self.assertEqual(set(self.graph.triples(EX.a, EX.property, EX.c)),
+                         set())
+
+    def test_triples_with_unknown_term_yields_nothing(self):
+        self.assertEqual(set(self.graph.triples(EX.z)), set())
+        self.assertEqual(set(self.graph.triples(None, EX.z)), set())
+        self.assertEqual(set(self.graph.triples(None, None, EX.z)), set())
+
+    def test_subjects_predicates_objects(self):
+        self.assertEqual(self.graph.subjects(EX.property),
+                         {EX.a, EX.b, BlankNode('x')})
+        self.assertEqual(self.graph.predicates(EX.a), {EX.property, EX.other})
+        self.assertEqual(self.graph.objects(EX.a, EX.property), {EX.b})
+
+    def test_discard_updates_indexes(self):
+        self.graph.discard((EX.a, EX.property, EX.b))
+        self.assertEqual(set(self.graph.triples(None, None, EX.b)), set())
+        self.assertEqual(set(self.graph.triples(EX.a)),
+                         {(EX.a, EX.other, BlankNode('x'))})
+        self.assertNotIn(EX.b, self.graph.objects())
+
+    def test_elements_must_be_triples(self):
+        with self.assertRaises(ValueError):
+            Graph((EX.a, EX.property, EX.b))
+        with self.assertRaises(ValueError):
+            Graph().add((EX.a, EX.property))
+
+    def test_remove_missing_triple_raises_key_error(self):
+        with self.assertRaises(KeyError):
+            self.graph.remove((EX.z, EX.z, EX.z))
+
+    def test_pop_updates_indexes(self):
+        triple = self.graph.pop()
+        self.assertEqual(set(self.graph.triples()), self.triples - {triple})
+        self.assertEqual(set(self.graph.triples(*triple)), set())
+
+    def test_clear_empties_indexes(self):
+        self.graph.clear()
+        self.assertEqual(set(self.graph.triples(EX.a)), set())
+        self.assertEqual(self.graph.subjects(), set())
+
+    def test_in_place_operators_update_indexes(self):
+        self.graph |= {(EX.c, EX.property, EX.d)}
+        self.assertEqual(set(self.graph.triples(EX.c)),
+                         {(EX.c, EX.property, EX.d)})
+        self.graph -= {(EX.c, EX.property, EX.d)}
+        self.assertEqual(set(self.graph.triples(EX.c)), set())
+        self.graph &= {(EX.a, EX.property, EX.b), (EX.b, EX.property, EX.c)}
+        self.assertEqual(set(self.graph.triples(None, EX.property)),
+                         {(EX.a, EX.property, EX.b),
+                          (EX.b, EX.property, EX.c)})
+        self.graph ^= {(EX.a, EX.property, EX.b), (EX.c, EX.property, EX.d)}
+        self.assertEqual(set(self.graph.triples(None, EX.property)),
+                         {(EX.b, EX.property, EX.c),
+                          (EX.c, EX.property, EX.d)})
+        self.assertIsInstance(self.graph, Graph)
+
+    def test_copy_is_indexed_graph(self):
+        graph = self.graph.copy()
+        self.assertIsInstance(graph, Graph)
+        self.assertEqual(set(graph.triples(EX.a)),
+                         set(self.graph.triples(EX.a)))
+
+    def test_copies_do_not_share_indexes(self):
+        for graph in (copy.copy(self.graph), copy.deepcopy(self.graph),
+                      pickle.loads(pickle.dumps(self.graph))):
+            graph.add((EX.c, EX.property, EX.d))
+            graph.discard((EX.a, EX.property, EX.b))
+            self.assertEqual(set(graph.triples(EX.c)),
+                             {(EX.c, EX.property, EX.d)})
+            self.assertEqual(set(self.graph.triples(EX.c)), set())
+            self.assertEqual(set(self.graph.triples()), self.triples)
+            self.assertEqual(self.graph.subjects(),
+                             {EX.a, EX.b, BlankNode('x')})
+
+def make_list(items, prefix):
+    nodes = [BlankNode(prefix + str(i)) for i in range(len(items))]
+    graph = Graph()
+    for i, (node, item) in enumerate(zip(nodes, items)):
+        rest = nodes[i + 1] if i + 1 < len(nodes) else RDF.nil
+        graph.add((node, RDF.first, EX[item]))
+        graph.add((node, RDF.rest, rest))
+    return graph
+
+def make_ring(size, prefix):
+    nodes = [BlankNode(prefix + str(i)) for i in range(size)]
+    return Graph((node, EX.next, nodes[(i + 1) % size])
+                 for i, node in enumerate(nodes))
+
+class TestGraphIsomorphism(unittest.TestCase):
+    def setUp(self):
+        self.list_graph = make_list(['a', 'b', 'c'], 'x')
+        self.ring_graph = make_ring(6, 'x')
+        self.two_rings_graph = Graph(make_ring(3, 'y') | make_ring(3, 'z'))
+
+    def test_default_strategy_is_canonical(self):
+        self.assertEqual(Graph.isomorphism_strategy, 'canonical')
+
+    def test_isomorphic_lists_are_equal(self):
+        graph = make_list(['a', 'b', 'c'], 'y')
+        self.assertTrue(self.list_graph.is_isomorphic(graph, 'canonical'))
+        self.assertTrue(self.list_graph.is_isomorphic(graph, 'bijection'))
+
+    def test_reordered_lists_are_not_equal(self):
+        graph = make_list(['a', 'c', 'b'], 'y')
+        self.assertFalse(self.list_graph.is_isomorphic(graph, 'canonical'))
+        self.assertFalse(self.list_graph.is_isomorphic(graph, 'bijection'))
+
+    def test_rings_are_equal(self):
+        self.assertEqual(self.ring_graph, make_ring(6, 'y'))
+
+    def test_ring_is_not_equal_to_two_smaller_rings(self):
+        self.assertNotEqual(self.ring_graph, self.two_rings_graph)
+        self.assertNotEqual(self.two_rings_graph, self.ring_graph)
+
+    def test_many_interchangeable_blank_nodes_are_equal(self):
+        graph = Graph((BlankNode('x' + str(i)), EX.property, EX.a)
+                      for i in range(100))
+        other = Graph((BlankNode('y' + str(i)), EX.property, EX.a)
+                      for i in range(100))
+        self.assertEqual(graph, other)
+
+    def test_canonicalize_gives_identical_triples_for_isomorphic_graphs(self):
+        graph = make_ring(6, 'y')
+        self.assertEqual(set(self.ring_graph.canonicalize()),
+                         set(graph.canonicalize()))
+
+    def test_canonicalize_keeps_ground_triples(self):
+        graph = Graph({(EX.a, EX.property, EX.b)})
+        self.assertEqual(set(graph.canonicalize()), set(graph))
+
+    def test_unknown_strategy_raises_value_error(self):
+        with self.assertRaises(ValueError):
+            self.list_graph.is_isomorphic(self.list_graph, 'unknown')
+
+    def test_canonicalize_does_not_depend_on_hash_seed(self):
+        script = ("from rdf.blanknode import BlankNode\n"
+                  "from rdf.literal import PlainLiteral\n"
+                  "from rdf.graph import Graph\n"
+                  "from util import EX\n"
+                  "nodes = [BlankNode() for i in range(8)]\n"
+                  "graph = Graph((node, EX.next, nodes[(i + 1) % 8])\n"
+                  "              for i, node in enumerate(nodes))\n"
+                  "graph.add((nodes[0], EX.label, PlainLiteral('a', 'en')))\n"
+                  "graph.add((nodes[2], EX.chord, nodes[6]))\n"
+                  "print(sorted(map(repr, graph.canonicalize())))\n")
+        path = os.pathsep.join(path for path in sys.path if path)
+        outputs = set()
+        for seed in ('1', '2', '3'):
+            env = dict(os.environ, PYTHONHASHSEED=seed, PYTHONPATH=path)
+            outputs.add(subprocess.check_output([sys.executable, '-c', script],
+                                                env=env))
+        self.assertEqual(len(outputs), 1)
+
+class TestBijectionSearch(unittest.TestCase):
+    def setUp(self):
+        self.graph = make_list(['a'] * 200, 'x')
+
+    def test_long_lists_are_isomorphic(self):
+        graph = make_list(['a'] * 200, 'y')
+        self.assertTrue(self.graph.is_isomorphic(graph, 'bijection'))
+
+    def test_long_lists_with_different_items_are_not_isomorphic(self):
+        graph = make_list(['a'] * 199 + ['b'], 'y')
+        self.assertFalse(self.graph.is_isomorphic(graph, 'bijection'))
+
+    def test_ring_is_not_isomorphic_to_two_smaller_rings(self):
+        graph = make_ring(6, 'x')
+        other = Graph(make_ring(3, 'y') | make_ring(3, 'z'))
+        self.assertFalse(graph.is_isomorphic(other, 'bijection'))
+
+    def test_shorter_list_is_a_strict_subgraph(self):
+        graph = make_list(['a'] * 199, 'y')
+        self.assertTrue(graph < self.graph)
+        self.assertFalse(self.graph < graph)
+
+    def test_list_with_shared_labels_is_a_strict_subgraph(self):
+        graph = make_list(['a'] * 3, 'x')
+        self.assertTrue(graph < make_list(['a'] * 4, 'x'))
+
+class TestGraphFingerprint(unittest.TestCase):
+    def setUp(self):
+        self.graph = make_list(['a', 'b'], 'x')
+
+    def test_isomorphic_graphs_have_equal_fingerprints(self):
+        self.assertEqual(self.graph.fingerprint(),
+                         make_list(['a', 'b'], 'y').fingerprint())
+
+    def test_different_graphs_have_different_fingerprints(self):
+        self.assertNotEqual(self.graph.fingerprint(),
+                            make_list(['a', 'c'], 'y').fingerprint())
+
+    def test_fingerprint_is_invalidated_by_add(self):
+        fingerprint = self.graph.fingerprint()
+        self.graph.add((EX.a, EX.property, EX.b))
+        self.assertNotEqual(self.graph.fingerprint(), fingerprint)
+
+    def test_fingerprint_is_invalidated_by_discard(self):
+        graph = make_list(['a'], 'x')
+        fingerprint = graph.fingerprint()
+        self.graph.discard((BlankNode('x1'), RDF.first, EX.b))
+        self.graph.discard((BlankNode('x1'), RDF.rest, RDF.nil))
+        self.graph.discard((BlankNode('x0'), RDF.rest, BlankNode('x1')))
+        self.graph.add((BlankNode('x0'), RDF.rest, RDF.nil))
+        self.assertEqual(self.graph.fingerprint(), fingerprint)
+
+    def test_fingerprint_is_invalidated_by_clear(self):
+        self.graph.fingerprint()
+        self.graph.clear()
+        self.assertEqual(self.graph.fingerprint(), Graph().fingerprint())
+
+class TestGraphPartitions(unittest.TestCase):
+    def setUp(self):
+        self.graph = Graph({(EX.a, EX.property, EX.b),
+                            (EX.a, EX.property, BlankNode('x')),
+                            (BlankNode('x'), EX.property, BlankNode('x'))})
+
+    def test_is_ground_after_removing_blank_node_triples(self):
+        self.assertFalse(self.graph.is_ground())
+        self.graph.discard((EX.a, EX.property, BlankNode('x')))
+        self.assertFalse(self.graph.is_ground())
+        self.graph.discard((BlankNode('x'), EX.property, BlankNode('x')))
+        self.assertTrue(self.graph.is_ground())
+
+    def test_is_not_ground_after_adding_blank_node_triple(self):
+        graph = Graph({(EX.a, EX.property, EX.b)})
+        self.assertTrue(graph.is_ground())
+        graph.add((BlankNode(), EX.property, EX.b))
+        self.assertFalse(graph.is_ground())
+
+    def test_isomorphism_follows_mutation(self):
+        other = Graph({(EX.a, EX.property, EX.b),
+                       (EX.a, EX.property, BlankNode('y')),
+                       (BlankNode('y'), EX.property, BlankNode('y'))})
+        self.assertEqual(self.graph, other)
+        other.discard((BlankNode('y'), EX.property, BlankNode('y')))
+        other.add((BlankNode('y'), EX.property, BlankNode('z')))
+        self.assertNotEqual(self.graph, other)
+        self.graph.discard((BlankNode('x'), EX.property, BlankNode('x')))
+        self.graph.add((BlankNode('x'), EX.property, BlankNode('w')))
+        self.assertEqual(self.graph, other)
+
+    def test_clear_makes_graph_ground(self):
+        self.graph.clear()
+        self.assertTrue(self.graph.is_ground())
+        self.assertEqual(self.graph, Graph())
+
+    def test_identical_components_are_counted(self):
+        graph = Graph({(BlankNode('x'), EX.property, BlankNode('y')),
+                       (BlankNode('z'), EX.property, BlankNode('w'))})
+        other = Graph({(BlankNode('x'), EX.property, BlankNode('y')),
+                       (BlankNode('y'), EX.property, BlankNode('w'))})
+        self.assertEqual(len(graph.canonicalize()), 2)
+        self.assertNotEqual(graph, other)
@@ -0,0 +1,93 @@
+import gc
+import unittest
+from io import StringIO
+
+from rdf.blanknode import BlankNode
+from rdf.uri import URI
+from rdf.literal import PlainLiteral, TypedLiteral
+from rdf.namespace import XSD
+from rdf.interning import TermTable
+from rdf.syntax.ntriples import NTriplesReader
+from rdf.syntax.rdfxml import RDFXMLReader
+from util import EX
+
+
+class TestTermTable(unittest.TestCase):
+    def setUp(self):
+        self.terms = TermTable()
+
+    def test_uri_is_shared(self):
+        uri = self.terms.uri('http://example.org/a')
+        self.assertTrue(isinstance(uri, URI))
+        self.assertTrue(self.terms.uri(URI('http://example.org/a')) is uri)
+        self.assertEqual(uri, EX.a)
+
+    def test_plain_literal_is_shared(self):
+        literal = self.terms.plain_literal("chat", 'FR')
+        self.assertEqual(literal, PlainLiteral("chat", 'fr'))
+        self.assertTrue(self.terms.plain_literal("chat", 'fr') is literal)
+        self.assertFalse(self.terms.plain_literal("chat") is literal)
+
+    def test_typed_literal_is_shared(self):
+        literal = self.terms.typed_literal("1", XSD.integer)
+        self.assertEqual(literal, TypedLiteral("1", XSD.integer))
+        self.assertTrue(self.terms.typed_literal("1", XSD.integer) is literal)
+        self.assertTrue(literal.datatype is self.terms.uri(XSD.integer))
+
+    def test_blank_node_is_shared(self):
+        bnode = self.terms.blank_node('a')
+        self.assertTrue(self.terms.blank_node('a') is bnode)
+        self.assertTrue(self.terms.intern(BlankNode('a')) is bnode)
+
+    def test_intern_returns_shared_term(self):
+        literal = PlainLiteral("chat")
+        self.assertTrue(self.terms.intern(literal) is literal)
+        self.assertTrue(self.terms.intern(PlainLiteral("chat")) is literal)
+        self.assertTrue(self.terms.plain_literal("chat") is literal)
+
+    def test_intern_does_not_share_unlabelled_blank_nodes(self):
+        bnode = BlankNode()
+        self.assertTrue(self.terms.intern(bnode) is bnode)
+        self.assertEqual(len(self.terms), 0)
+
+    def test_unused_terms_are_dropped(self):
+        self.terms.uri('http://example.org/a')
+        gc.collect()
+        self.assertEqual(len(self.terms), 0)
+
+
+class TestInterningReaders(unittest.TestCase):
+    def setUp(self):
+        self.terms = TermTable()
+
+    def test_ntriples_reader_shares_terms(self):
+        document = ('<http://example.org/a> <http://example.org/p> "x" .\n'
+                    '<http://example.org/b> <http://example.org/p> "x" .\n'
+                    '_:c <http://example.org/p> _:c .\n')
+        triples = list(NTriplesReader(self.terms).read(document))
+        self.assertTrue(triples[0][1] is triples[1][1])
+        self.assertTrue(triples[0][2] is triples[1][2])
+        self.assertTrue(triples[2][0] is triples[2][2])
+        self.assertTrue(triples[0][1] is self.terms.uri(EX.p))
+
+    def test_rdfxml_reader_shares_terms(self):
+        document = '''<rdf:RDF
+            xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#"
+            xmlns:ex="http://example.org/">
+          <ex:C rdf:about="http://example.org/a" ex:p="x"/>
+          <ex:C rdf:about="http://example.org/b">
+            <ex:p>x</ex:p>
+          </ex:C>
+        </rdf:RDF>'''
+        triples = list(RDFXMLReader(terms=self.terms).read(
+            StringIO(document)))
+        self.assertEqual(len(triples), 4)
+        types = [triple for triple in triples if triple[2] == EX.C]
+        values = [triple for triple in triples if triple[1] == EX.p]
+        self.assertTrue(types[0][2] is types[1][2])
+        self.assertTrue(values[0][1] is values[1][1])
+        self.assertTrue(values[0][2] is values[1][2])
+
+
+if __name__ == '__main__':
+    unittest.main()
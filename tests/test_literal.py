@@ -1,5 +1,6 @@
 import unittest
 import operator
+import pickle
 from decimal import Decimal
 
 from rdf.blanknode import BlankNode
@@ -47,6 +48,15 @@ class TestPlainLiteral(unittest.TestCase):
         literal = PlainLiteral("cat", 'EN')
         self.assertEqual(literal.language, 'en')
 
+    def test_is_immutable(self):
+        self.assertRaises(AttributeError, setattr, self.literal, 'language', 'fr')
+        self.assertRaises(AttributeError, delattr, self.literal, 'lexical_form')
+
+    def test_pickles(self):
+        literal = pickle.loads(pickle.dumps(self.literal))
+        self.assertEqual(literal, self.literal)
+        self.assertEqual(hash(literal), hash(self.literal))
+
     def test_repr_shows_constructor(self):
         self.assertEqual(repr(self.literal), "PlainLiteral('cat', 'en')")
 
@@ -138,6 +148,15 @@ class TestTypedLiteral(unittest.TestCase):
 
     def test_has_datatype(self):
         self.assertEqual(self.literal.datatype, XSD.string)
+
+    def test_is_immutable(self):
+        self.assertRaises(AttributeError, setattr, self.literal, 'datatype',
+                          XSD.integer)
+
+    def test_pickles(self):
+        literal = pickle.loads(pickle.dumps(self.literal))
+        self.assertEqual(literal, self.literal)
+        self.assertEqual(hash(literal), hash(self.literal))
     
     def test_datatype_is_required(self):
         self.assertRaises(TypeError, TypedLiteral, "1")
@@ -2,6 +2,7 @@ import unittest
 
 from rdf.uri import URI
 from rdf.namespace import Namespace
+from rdf.interning import TermTable
 
 
 class TestNamespace(unittest.TestCase):
@@ -41,3 +42,13 @@ class TestNamespace(unittest.TestCase):
         self.assert_(not isinstance(self.namespace.test, Namespace))
         self.assert_(not isinstance(self.namespace['test'], Namespace))
 
+
+    def test_uris_are_shared(self):
+        self.assertTrue(self.namespace.test is self.namespace.test)
+        self.assertTrue(self.namespace['test'] is self.namespace.test)
+
+    def test_uris_are_interned_in_term_table(self):
+        terms = TermTable()
+        namespace = Namespace('http://example.org/', terms)
+        self.assertTrue(namespace.test is terms.uri('http://example.org/test'))
+        self.assertEqual(repr(namespace), "Namespace('http://example.org/')")
@@ -1,12 +1,16 @@
+import tempfile
 import unittest
+from io import BytesIO, StringIO
 from itertools import islice
 
 from rdf.blanknode import BlankNode
 from rdf.uri import URI
 from rdf.namespace import Namespace, RDFS
 from rdf.literal import PlainLiteral, TypedLiteral
-from rdf.syntax.ntriples import NTriplesReader, ParseError, InvalidEscapeSequence
-from util import open_data_file, EX
+from rdf.graph import Graph
+from rdf.compactgraph import CompactGraph
+from rdf.syntax.ntriples import NTriplesReader, NTriplesWriter, ParseError, InvalidEscapeSequence
+from util import get_data_path, open_data_file, EX
 
 
 class TestNTriples(unittest.TestCase):
@@ -200,3 +204,202 @@ class TestNTriples(unittest.TestCase):
         self.assertEqual(triple,
             (EX.resource32, EX.property, TypedLiteral("abc", EX.datatype1)))
 
+
+class TestNTriplesBinary(unittest.TestCase):
+    def setUp(self):
+        self.reader = NTriplesReader()
+        with open_data_file('test.nt') as f:
+            self.triples = list(self.reader.read(f))
+
+    def test_binary_file_yields_same_triples(self):
+        with open_data_file('test.nt', 'rb') as f:
+            self.assertEqual(list(self.reader.read(f)), self.triples)
+
+    def test_small_chunks_yield_same_triples(self):
+        self.reader.CHUNK_SIZE = 7
+        with open_data_file('test.nt', 'rb') as f:
+            self.assertEqual(list(self.reader.read(f)), self.triples)
+
+    def test_text_file_in_small_chunks_yields_same_triples(self):
+        self.reader.CHUNK_SIZE = 7
+        with open_data_file('test.nt') as f:
+            self.assertEqual(list(self.reader.read(f)), self.triples)
+
+    def test_node_id_cache_is_limited(self):
+        self.reader.CACHE_SIZE = 4
+        document = ''.join('_:n{} <http://example.org/p> "o" .\n'.format(i)
+                           for i in range(20))
+        cache = ({}, {})
+        triples = list(self.reader._read_text(document, None, 0, cache))
+        self.assertEqual(len(triples), 20)
+        self.assertLessEqual(len(cache[1]), self.reader.CACHE_SIZE + 1)
+
+    def test_bytes_yield_same_triples(self):
+        with open_data_file('test.nt', 'rb') as f:
+            self.assertEqual(list(self.reader.read(f.read())), self.triples)
+
+    def test_error_reports_line_number(self):
+        document = BytesIO(b'<http://example.org/a> <http://example.org/b> "c" .\n'
+                           b'<http://example.org/a> <http://example.org/b> .\n')
+        self.reader.CHUNK_SIZE = 10
+        with self.assertRaisesRegex(ParseError, 'line 1'):
+            list(self.reader.read(document))
+
+    def test_non_ascii_raises_error(self):
+        document = '<http://example.org/a> <http://example.org/b> "é" .'
+        self.assertRaises(ParseError, next,
+                          self.reader.read(document.encode('utf-8')))
+
+
+class TestNTriplesBaseURI(unittest.TestCase):
+    def setUp(self):
+        self.reader = NTriplesReader()
+
+    def test_relative_uri_is_resolved(self):
+        document = '<a> <http://example.org/b> <c> .'
+        self.assertEqual(next(self.reader.read(document, EX)),
+                         (EX.a, EX.b, EX.c))
+
+    def test_absolute_uri_is_unchanged(self):
+        document = '<urn:x:a> <http://example.org/./b> <mailto:c> .'
+        self.assertEqual(next(self.reader.read(document, EX)),
+                         (URI('urn:x:a'), URI('http://example.org/./b'),
+                          URI('mailto:c')))
+
+    def test_escaped_quote_in_string(self):
+        document = '<http://example.org/a> <http://example.org/b> "\\"c\\"" .'
+        self.assertEqual(next(self.reader.read(document))[2],
+                         PlainLiteral('"c"'))
+
+class TestNTriplesParallel(unittest.TestCase):
+    def setUp(self):
+        self.reader = NTriplesReader()
+        self.reader.CHUNK_SIZE = 256
+        self.path = get_data_path('test.nt')
+        with open_data_file('test.nt') as f:
+            self.triples = set(self.reader.read(f))
+
+    def test_split_ends_ranges_after_newlines(self):
+        ranges = self.reader._split(self.path, 8)
+        self.assertTrue(len(ranges) > 1)
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        self.assertEqual(ranges[0][0], 0)
+        self.assertEqual(ranges[-1][1], len(data))
+        for (start, end), (next_start, next_end) in zip(ranges, ranges[1:]):
+            self.assertEqual(end, next_start)
+            self.assertEqual(data[end - 1:end], b'\n')
+
+    def test_yields_same_graph(self):
+        graph = self.reader.load_parallel(self.path, max_workers=2)
+        self.assertTrue(isinstance(graph, Graph))
+        self.assertEqual(set(graph), self.triples)
+
+    def test_compact_graphs_have_same_triples(self):
+        for workers in (1, 2):
+            graph = self.reader.load_parallel(self.path, max_workers=workers,
+                                              compact=True)
+            self.assertTrue(isinstance(graph, CompactGraph))
+            self.assertEqual(set(graph), self.triples)
+            self.assertEqual(len(graph), len(self.triples))
+
+    def test_repeated_triples_are_merged(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.nt') as f:
+            for i in range(100):
+                f.write('_:a <http://example.org/p> "{}" .\n'.format(i % 10))
+            f.flush()
+            graph = self.reader.load_parallel(f.name, max_workers=2,
+                                              compact=True)
+        self.assertEqual(len(graph), 10)
+
+    def test_blank_nodes_are_shared_across_ranges(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.nt') as f:
+            for i in range(100):
+                f.write('_:a <http://example.org/p> "{}" .\n'.format(i))
+            f.flush()
+            graph = self.reader.load_parallel(f.name, max_workers=2)
+        self.assertEqual(graph.subjects(EX.p, PlainLiteral("99")),
+                         {BlankNode('a')})
+        self.assertEqual(len(graph.nodes()), 101)
+
+    def test_error_reports_line_number_in_file(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.nt') as f:
+            for i in range(100):
+                f.write('<http://example.org/a> <http://example.org/p> '
+                        '"{}" .\n'.format(i))
+            f.write('<http://example.org/a> .\n')
+            f.flush()
+            with self.assertRaisesRegex(ParseError, 'line 100$'):
+                self.reader.load_parallel(f.name, max_workers=2)
+
+class TestNTriplesWriter(unittest.TestCase):
+    def setUp(self):
+        self.writer = NTriplesWriter()
+        self.reader = NTriplesReader()
+
+    def write(self, triples, sort=False):
+        f = StringIO()
+        self.writer.write(triples, f, sort)
+        return f.getvalue()
+
+    def test_round_trips_test_document(self):
+        with open_data_file('test.nt') as f:
+            triples = list(self.reader.read(f))
+        self.assertEqual(list(self.reader.read(self.write(triples))), triples)
+
+    def test_writes_one_line_per_triple(self):
+        document = self.write([(EX.a, EX.b, EX.c),
+                               (BlankNode('x'), EX.b, PlainLiteral("c", 'en')),
+                               (EX.a, EX.b, TypedLiteral("1", EX.d))])
+        self.assertEqual(document,
+            '<http://example.org/a> <http://example.org/b> <http://example.org/c> .\n'
+            '_:x <http://example.org/b> "c"@en .\n'
+            '<http://example.org/a> <http://example.org/b> "1"^^<http://example.org/d> .\n')
+
+    def test_escapes_strings(self):
+        literal = PlainLiteral('"\\\n\r\t\x00é\U0001F600')
+        document = self.write([(EX.a, EX.b, literal)])
+        self.assertIn(r'"\"\\\n\r\t\u0000\u00E9\U0001F600"', document)
+        self.assertEqual(next(self.reader.read(document))[2], literal)
+
+    def test_escapes_uris(self):
+        uri = URI('http://example.org/<a>\\é')
+        document = self.write([(uri, EX.b, EX.c)])
+        self.assertIn(r'<http://example.org/<a\u003E\\\u00E9>', document)
+        self.assertEqual(next(self.reader.read(document))[0], uri)
+
+    def test_names_blank_nodes_consistently(self):
+        a, b = BlankNode(), BlankNode('not-a-name')
+        document = self.write([(a, EX.p, b), (b, EX.p, a), (a, EX.p, a)])
+        triples = list(self.reader.read(document))
+        self.assertEqual(triples[0][0], triples[1][2])
+        self.assertEqual(triples[0][2], triples[1][0])
+        self.assertEqual(triples[2][0], triples[0][0])
+        self.assertNotEqual(triples[0][0], triples[0][2])
+
+    def test_generated_names_do_not_clash_with_node_ids(self):
+        for triples in ([(BlankNode(), EX.p, BlankNode('genid1')),
+                         (BlankNode('genid1'), EX.p, EX.o)],
+                        [(BlankNode('genid1'), EX.p, BlankNode()),
+                         (BlankNode(), EX.p, BlankNode('genid2'))]):
+            graph = Graph(self.reader.read(self.write(triples)))
+            self.assertEqual(graph, Graph(triples))
+
+    def test_sorted_output(self):
+        triples = [(EX.b, EX.p, EX.a), (EX.a, EX.p, EX.b), (EX.a, EX.p, EX.a)]
+        lines = self.write(triples, sort=True).splitlines()
+        self.assertEqual(lines, sorted(lines))
+        self.assertEqual(self.write(reversed(triples), sort=True),
+                         self.write(triples, sort=True))
+
+    def test_writes_bytes_to_binary_file(self):
+        f = BytesIO()
+        self.writer.BUFFER_SIZE = 1
+        self.writer.write([(EX.a, EX.b, PlainLiteral('é')),
+                           (EX.a, EX.b, EX.c)], f)
+        self.assertEqual(f.getvalue(),
+            b'<http://example.org/a> <http://example.org/b> "\\u00E9" .\n'
+            b'<http://example.org/a> <http://example.org/b> <http://example.org/c> .\n')
+
+    def test_unsupported_term_raises_type_error(self):
+        self.assertRaises(TypeError, self.write, [(EX.a, EX.b, 1)])
@@ -0,0 +1,74 @@
+import unittest
+
+from rdf.literal import PlainLiteral
+from rdf.namespace import RDF, RDFS
+from rdf.graph import Graph
+from rdf.semantics.rule import Context
+from rdf.semantics.parallel import ParallelSession
+from rdf.semantics.entailment import RDFS_ENTAILMENT
+
+from util import EX, example_premise
+
+
+def close(session, triples):
+    derived = session.add(triples)
+    while derived:
+        derived = session.add(derived)
+    return session.graph
+
+
+class TestParallelSession(unittest.TestCase):
+    def setUp(self):
+        self.triples = example_premise((EX.x, RDF._1, EX.z))
+        self.session = ParallelSession(RDFS_ENTAILMENT.rules, Context(), 2)
+
+    def tearDown(self):
+        self.session.close()
+
+    def test_add_returns_derived_triples(self):
+        derived = self.session.add(self.triples)
+        self.assertTrue((EX.x, RDF.type, EX.b) in derived)
+        self.assertFalse((EX.x, RDF.type, EX.b) in self.session.graph)
+
+    def test_closure_matches_rete(self):
+        triples = self.triples | RDFS_ENTAILMENT.axioms
+        expected = close(RDFS_ENTAILMENT.compile().session(), triples)
+        self.assertEqual(close(self.session, triples), expected)
+        self.assertTrue((EX.x, RDFS.member, EX.z) in self.session.graph)
+
+    def test_workers_are_kept_across_rounds(self):
+        derived = self.session.add(self.triples)
+        workers = list(self.session._workers)
+        self.session.add(derived)
+        self.assertEqual(self.session._workers, workers)
+        self.session.close()
+        for process, connection in workers:
+            self.assertFalse(process.is_alive())
+
+    def test_workers_see_triples_of_later_rounds(self):
+        self.session.add({(EX.a, RDFS.subClassOf, EX.b)})
+        derived = self.session.add({(EX.x, RDF.type, EX.a)})
+        self.assertTrue((EX.x, RDF.type, EX.b) in derived)
+
+    def test_literals_keep_their_blank_nodes_across_rounds(self):
+        # rdfs1 allocates a blank node for each literal, in this process,
+        # so the literal of a later round gets the node of the first.
+        graph = Graph(close(self.session, self.triples))
+        close(self.session, {(EX.z, EX.q, PlainLiteral("y"))})
+        literals = set(self.session.graph.triples(None, RDF.type,
+                                                  RDFS.Literal))
+        self.assertEqual(len(literals), 1)
+        self.assertEqual(literals, set(graph.triples(None, RDF.type,
+                                                     RDFS.Literal)))
+
+    def test_entails(self):
+        self.assertTrue(RDFS_ENTAILMENT.entails(
+            self.triples, Graph({(EX.x, RDF.type, EX.c),
+                                 (EX.x, RDF.type, EX.d)}), processes=2))
+        self.assertFalse(RDFS_ENTAILMENT.entails(
+            self.triples, Graph({(EX.c, RDFS.subClassOf, EX.a)}),
+            processes=2))
+
+
+if __name__ == '__main__':
+    unittest.main()
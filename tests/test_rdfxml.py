@@ -1,7 +1,14 @@
 import unittest
-from io import StringIO
+from io import BytesIO, StringIO
 
-from rdf.syntax.rdfxml import RDFXMLReader
+from rdf.uri import URI
+from rdf.blanknode import BlankNode
+from rdf.literal import PlainLiteral, TypedLiteral
+from rdf.namespace import RDF, RDFS, XSD
+from rdf.graph import Graph
+from rdf.syntax.rdfxml import RDFXMLReader, RDFXMLWriter
+from rdf.syntax.exceptions import ParseError
+from util import EX
 
 
 class TestRDFXMLReader(unittest.TestCase):
@@ -11,3 +18,136 @@ class TestRDFXMLReader(unittest.TestCase):
     def test_is_rdfxml_reader(self):
         self.assert_(isinstance(self.reader, RDFXMLReader))
 
+
+class TestRDFXMLIterread(unittest.TestCase):
+    DOCUMENT = '''<rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#"
+                 xmlns:ex="http://example.org/" xml:base="http://example.org/">
+      <ex:C rdf:about="a" ex:name="A">
+        <ex:p xml:lang="en">one</ex:p>
+        <ex:q rdf:parseType="Resource"><ex:r rdf:resource="#b"/></ex:q>
+      </ex:C>
+      <rdf:Description rdf:about="b">
+        <ex:list rdf:parseType="Collection">
+          <rdf:Description rdf:about="c"/>
+          <rdf:Description rdf:about="d"/>
+        </ex:list>
+      </rdf:Description>
+    </rdf:RDF>'''
+
+    def setUp(self):
+        self.reader = RDFXMLReader()
+
+    def test_yields_same_graph_as_read(self):
+        expected = Graph(self.reader.read(StringIO(self.DOCUMENT)))
+        self.reader.CHUNK_SIZE = 16
+        graph = Graph(self.reader.iterread(BytesIO(self.DOCUMENT.encode())))
+        self.assertEqual(len(graph), 10)
+        self.assertEqual(graph, expected)
+
+    def test_yields_triples_before_document_ends(self):
+        self.reader.CHUNK_SIZE = 16
+        document = BytesIO(self.DOCUMENT.encode())
+        triples = self.reader.iterread(document)
+        self.assertEqual(next(triples), (EX.a, RDF.type, EX.C))
+        self.assertTrue(document.tell() < len(self.DOCUMENT))
+
+    def test_root_node_element(self):
+        document = ('<ex:C xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#" '
+                    'xmlns:ex="http://example.org/" rdf:about="http://example.org/a"/>')
+        self.assertEqual(list(self.reader.iterread(StringIO(document))),
+                         [(EX.a, RDF.type, EX.C)])
+
+    def test_base_uri(self):
+        document = ('<rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#" '
+                    'xmlns:ex="http://example.org/">'
+                    '<rdf:Description rdf:about="a" ex:p="b"/></rdf:RDF>')
+        self.assertEqual(list(self.reader.iterread(StringIO(document), EX)),
+                         [(EX.a, EX.p, PlainLiteral("b"))])
+
+    def test_invalid_document_raises_parse_error(self):
+        document = ('<rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#">'
+                    '<rdf:li/></rdf:RDF>')
+        self.assertRaises(ParseError, list,
+                          self.reader.iterread(StringIO(document)))
+
+
+class TestRDFXMLWriter(unittest.TestCase):
+    def setUp(self):
+        self.writer = RDFXMLWriter({'ex': EX})
+
+    def round_trip(self, triples):
+        file = BytesIO()
+        self.writer.write(triples, file)
+        file.seek(0)
+        return Graph(RDFXMLReader().read(file))
+
+    def test_round_trips_graph(self):
+        a, b = BlankNode(), BlankNode('b')
+        graph = Graph([(EX.a, RDF.type, EX.C),
+                       (EX.a, RDF.type, EX.D),
+                       (EX.a, EX.p, a),
+                       (a, EX.p, PlainLiteral("x < y & \"z\"\r\n", 'en')),
+                       (a, EX.q, TypedLiteral("", RDF.XMLLiteral)),
+                       (b, RDFS.label, TypedLiteral("1", XSD.integer)),
+                       (EX['1'], EX.p, PlainLiteral(""))])
+        self.assertEqual(self.round_trip(graph), graph)
+
+    def test_generated_node_ids_do_not_clash(self):
+        graph = Graph([(BlankNode(), EX.p, BlankNode('genid1')),
+                       (BlankNode('genid1'), EX.p, BlankNode('x y'))])
+        self.assertEqual(self.round_trip(graph), graph)
+
+    def test_round_trips_collections(self):
+        a, b, c = BlankNode(), BlankNode(), BlankNode()
+        graph = Graph([(EX.a, EX.list, a),
+                       (a, RDF.first, EX.b), (a, RDF.rest, b),
+                       (b, RDF.first, c), (b, RDF.rest, RDF.nil),
+                       (c, EX.p, EX.d)])
+        text = StringIO()
+        self.writer.write(graph, text)
+        self.assertTrue('rdf:parseType="Collection"' in text.getvalue())
+        self.assertFalse('rdf:first' in text.getvalue())
+        self.assertEqual(self.round_trip(graph), graph)
+
+    def test_shared_list_nodes_are_not_collections(self):
+        a = BlankNode()
+        graph = Graph([(EX.a, EX.list, a), (EX.b, EX.list, a),
+                       (a, RDF.first, PlainLiteral("x")),
+                       (a, RDF.rest, RDF.nil)])
+        text = StringIO()
+        self.writer.write(graph, text)
+        self.assertFalse('Collection' in text.getvalue())
+        self.assertEqual(self.round_trip(graph), graph)
+
+    def test_uses_types_and_prefixes(self):
+        text = StringIO()
+        self.writer.write([(EX.a, RDF.type, EX.C),
+                           (EX.a, RDFS.label, PlainLiteral("A"))], text)
+        document = text.getvalue()
+        self.assertTrue('<ex:C rdf:about="http://example.org/a">' in document)
+        self.assertTrue('<rdfs:label>A</rdfs:label>' in document)
+        self.assertTrue('xmlns:rdfs=' in document)
+        self.assertFalse('xmlns:owl=' in document)
+
+    def test_generates_prefixes(self):
+        text = StringIO()
+        self.writer.write([(EX.a, URI('http://example.com/ns#p'), EX.b)], text)
+        self.assertTrue('<ns0:p rdf:resource=' in text.getvalue())
+
+    def test_reads_all_triples_before_writing(self):
+        # The writer collects its input into a Graph; it does not stream.
+        read = []
+        def generate():
+            for triple in [(EX.a, EX.p, EX.b), (EX.b, EX.p, EX.a)]:
+                read.append(triple)
+                yield triple
+        chunks = self.writer._chunks(generate())
+        self.assertTrue(next(chunks).startswith('<?xml'))
+        self.assertEqual(len(read), 2)
+
+    def test_unwritable_predicate_raises_value_error(self):
+        self.assertRaises(ValueError, self.writer.write,
+                          [(EX.a, URI('http://example.org/1'), EX.b)],
+                          StringIO())
+        self.assertRaises(ValueError, self.writer.write,
+                          [(EX.a, EX.p, PlainLiteral("\0"))], StringIO())
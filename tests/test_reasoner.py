@@ -0,0 +1,104 @@
+import unittest
+
+from rdf.blanknode import BlankNode
+from rdf.literal import TypedLiteral
+from rdf.namespace import RDF, RDFS, XSD
+from rdf.graph import Graph
+from rdf.semantics.entailment import RDFS_ENTAILMENT
+from rdf.semantics.reasoner import Reasoner
+
+from util import EX, example_premise
+
+
+class TestReasoner(unittest.TestCase):
+    def setUp(self):
+        self.triples = example_premise(
+            (EX.z, EX.p, TypedLiteral("1", XSD.integer)))
+        self.reasoner = Reasoner(RDFS_ENTAILMENT, self.triples)
+
+    def test_materializes_closure(self):
+        self.assertTrue((EX.x, RDF.type, EX.c) in self.reasoner)
+        self.assertTrue((EX.a, RDFS.subClassOf, EX.c) in self.reasoner)
+        self.assertTrue((EX.x, RDF.type, EX.d) in self.reasoner)
+        self.assertTrue(len(self.reasoner) > len(self.triples))
+
+    def test_entails(self):
+        self.assertTrue(self.reasoner.entails(Graph(self.triples)))
+        self.assertTrue(self.reasoner.entails(
+            Graph({(EX.x, RDF.type, EX.c), (EX.c, RDF.type, RDFS.Class)})))
+        self.assertFalse(self.reasoner.entails(
+            Graph({(EX.c, RDFS.subClassOf, EX.a)})))
+
+    def test_entails_blank_nodes_as_entailment_does(self):
+        x, y = BlankNode(), BlankNode()
+        for e in (Graph({(x, RDFS.subClassOf, EX.c)}),
+                  Graph({(EX.x, RDF.type, x), (x, RDFS.subClassOf, EX.c)}),
+                  Graph({(x, RDF.type, y), (y, RDFS.subClassOf, EX.a)}),
+                  Graph({(x, EX.p, TypedLiteral("01", XSD.integer))}),
+                  Graph({(EX.p, RDF.type, RDF.Property)})):
+            self.assertEqual(self.reasoner.entails(e),
+                             RDFS_ENTAILMENT.entails(Graph(self.triples), e))
+        self.assertTrue(self.reasoner.entails(
+            Graph({(x, RDFS.subClassOf, EX.c)})))
+        self.assertFalse(self.reasoner.entails(
+            Graph({(x, RDFS.subClassOf, EX.x)})))
+
+    def test_triples(self):
+        self.assertEqual(set(self.reasoner.triples(EX.x, RDF.type)),
+                         {(EX.x, RDF.type, EX.a), (EX.x, RDF.type, EX.b),
+                          (EX.x, RDF.type, EX.c), (EX.x, RDF.type, EX.d),
+                          (EX.x, RDF.type, RDFS.Resource)})
+
+    def test_add(self):
+        self.reasoner.add({(EX.c, RDFS.subClassOf, EX.e)})
+        self.assertTrue((EX.x, RDF.type, EX.e) in self.reasoner)
+        expected = Reasoner(RDFS_ENTAILMENT,
+                            self.triples | {(EX.c, RDFS.subClassOf, EX.e)})
+        self.assertEqual(self.reasoner.closure, expected.closure)
+
+    def test_remove(self):
+        self.reasoner.remove({(EX.b, RDFS.subClassOf, EX.c)})
+        self.assertFalse((EX.x, RDF.type, EX.c) in self.reasoner)
+        self.assertFalse((EX.a, RDFS.subClassOf, EX.c) in self.reasoner)
+        self.assertTrue((EX.x, RDF.type, EX.b) in self.reasoner)
+        expected = Reasoner(RDFS_ENTAILMENT,
+                            self.triples - {(EX.b, RDFS.subClassOf, EX.c)})
+        self.assertEqual(self.reasoner.closure, expected.closure)
+
+    def test_remove_keeps_triples_derived_otherwise(self):
+        self.reasoner.add({(EX.x, RDF.type, EX.b)})
+        self.reasoner.remove({(EX.x, RDF.type, EX.a)})
+        self.assertTrue((EX.x, RDF.type, EX.c) in self.reasoner)
+        self.assertFalse((EX.x, RDF.type, EX.a) in self.reasoner)
+
+    def test_remove_keeps_triples_with_several_derivations(self):
+        # x type c follows from both a subClassOf c and b subClassOf c.
+        self.reasoner.add({(EX.a, RDFS.subClassOf, EX.c)})
+        self.reasoner.remove({(EX.b, RDFS.subClassOf, EX.c)})
+        self.assertTrue((EX.x, RDF.type, EX.c) in self.reasoner)
+        self.assertTrue((EX.a, RDFS.subClassOf, EX.c) in self.reasoner)
+        self.assertFalse((EX.b, RDFS.subClassOf, EX.c) in self.reasoner)
+        expected = Reasoner(RDFS_ENTAILMENT,
+                            self.triples - {(EX.b, RDFS.subClassOf, EX.c)}
+                            | {(EX.a, RDFS.subClassOf, EX.c)})
+        self.assertEqual(self.reasoner.closure, expected.closure)
+
+    def test_remove_drops_triples_that_only_derive_each_other(self):
+        # In the cycle a, b, c, each subclass triple between them is
+        # derived from the others, but none is left without c subClassOf a.
+        self.reasoner.add({(EX.c, RDFS.subClassOf, EX.a)})
+        self.assertTrue((EX.b, RDFS.subClassOf, EX.a) in self.reasoner)
+        self.reasoner.remove({(EX.c, RDFS.subClassOf, EX.a)})
+        self.assertFalse((EX.b, RDFS.subClassOf, EX.a) in self.reasoner)
+        self.assertFalse((EX.c, RDFS.subClassOf, EX.b) in self.reasoner)
+        expected = Reasoner(RDFS_ENTAILMENT, self.triples)
+        self.assertEqual(self.reasoner.closure, expected.closure)
+
+    def test_remove_ignores_entailed_triples(self):
+        size = len(self.reasoner)
+        self.reasoner.remove({(EX.x, RDF.type, EX.c)})
+        self.assertEqual(len(self.reasoner), size)
+
+
+if __name__ == '__main__':
+    unittest.main()
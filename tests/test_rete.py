@@ -0,0 +1,57 @@
+import unittest
+
+from rdf.namespace import RDF, RDFS
+from rdf.graph import Graph
+from rdf.semantics.type import cmp
+from rdf.semantics.rete import Network
+from rdf.semantics.entailment import RDFS_ENTAILMENT, rdfs2, rdfs7, rdfs9, \
+                                     rdfs11
+
+from util import EX
+
+
+class TestNetwork(unittest.TestCase):
+    def test_rules_share_alpha_nodes(self):
+        network = Network([rdfs2, rdfs7])
+        # (uuu, aaa, yyy) is used by both rules.
+        self.assertEqual(len(network._alphas), 3)
+
+    def test_compile_is_cached(self):
+        network = RDFS_ENTAILMENT.compile()
+        self.assertTrue(RDFS_ENTAILMENT.compile() is network)
+        self.assertEqual(network.rules, RDFS_ENTAILMENT.rules)
+
+
+class TestSession(unittest.TestCase):
+    def setUp(self):
+        self.session = Network([rdfs9, rdfs11]).session()
+
+    def test_add_returns_derived_triples(self):
+        derived = self.session.add({(EX.a, RDFS.subClassOf, EX.b),
+                                    (EX.x, RDF.type, EX.a)})
+        self.assertEqual(derived, Graph({(EX.x, RDF.type, EX.b)}))
+        self.assertFalse((EX.x, RDF.type, EX.b) in self.session.graph)
+
+    def test_add_joins_new_triples_with_memories(self):
+        self.session.add({(EX.a, RDFS.subClassOf, EX.b),
+                          (EX.x, RDF.type, EX.a)})
+        derived = self.session.add({(EX.b, RDFS.subClassOf, EX.c),
+                                    (EX.x, RDF.type, EX.b)})
+        self.assertEqual(derived, Graph({(EX.a, RDFS.subClassOf, EX.c),
+                                         (EX.x, RDF.type, EX.c)}))
+
+    def test_add_ignores_known_triples(self):
+        triples = {(EX.a, RDFS.subClassOf, EX.b), (EX.x, RDF.type, EX.a)}
+        self.session.add(triples)
+        self.assertEqual(self.session.add(triples), Graph())
+
+    def test_type_values_match_contained_terms(self):
+        session = Network([rdfs7]).session()
+        derived = session.add({(cmp, RDFS.subPropertyOf, RDFS.member),
+                               (EX.a, RDF._1, EX.b),
+                               (EX.a, EX.property, EX.c)})
+        self.assertEqual(derived, Graph({(EX.a, RDFS.member, EX.b)}))
+
+
+if __name__ == '__main__':
+    unittest.main()
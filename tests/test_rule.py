@@ -1,10 +1,11 @@
 import unittest
 
 from rdf.blanknode import BlankNode
-from rdf.namespace import RDF
+from rdf.literal import PlainLiteral, TypedLiteral
+from rdf.namespace import RDF, RDFS, XSD
 from rdf.graph import Graph
-from rdf.semantics.type import uuu, aaa, xxx
-from rdf.semantics.rule import Rule, Context
+from rdf.semantics.type import uuu, vvv, aaa, bbb, xxx, yyy, lll, cmp
+from rdf.semantics.rule import Rule, Pattern, Context
 
 from util import EX
 
@@ -53,4 +54,93 @@ class TestRule(unittest.TestCase):
         self.assertEqual(graph, Graph({(EX.a, EX.property, BlankNode()),
                                        (EX.b, EX.property, BlankNode())}))
 
+    def test_apply_with_delta_yields_only_new_matches(self):
+        rule = Rule({(uuu, RDFS.subClassOf, vvv), (vvv, RDFS.subClassOf, xxx)},
+                    {(uuu, RDFS.subClassOf, xxx)})
+        graph = Graph({(EX.a, RDFS.subClassOf, EX.b),
+                       (EX.b, RDFS.subClassOf, EX.c),
+                       (EX.c, RDFS.subClassOf, EX.d)})
+        delta = Graph({(EX.c, RDFS.subClassOf, EX.d)})
+        self.assertEqual(set(rule.apply(graph, self.context, delta)),
+                         {(EX.b, RDFS.subClassOf, EX.d)})
+        self.assertEqual(set(rule.apply(graph, self.context)),
+                         {(EX.a, RDFS.subClassOf, EX.c),
+                          (EX.b, RDFS.subClassOf, EX.d)})
 
+    def test_apply_empty_antecedent_with_delta_yields_nothing(self):
+        graph = Graph(self.rule.apply(self.graph, self.context, self.graph))
+        self.assertEqual(graph, Graph())
+
+    def test_apply_joins_on_shared_variables(self):
+        rule = Rule({(uuu, RDFS.subClassOf, xxx), (vvv, RDF.type, uuu)},
+                    {(vvv, RDF.type, xxx)})
+        graph = Graph({(EX.a, RDFS.subClassOf, EX.b),
+                       (EX.c, RDFS.subClassOf, EX.d),
+                       (EX.x, RDF.type, EX.a),
+                       (EX.y, RDF.type, EX.b)})
+        self.assertEqual(set(rule.apply(graph, self.context)),
+                         {(EX.x, RDF.type, EX.b)})
+
+    def test_apply_matches_values_in_type_terms(self):
+        rule = Rule({(aaa, RDFS.subPropertyOf, bbb), (uuu, aaa, yyy)},
+                    {(uuu, bbb, yyy)})
+        graph = Graph({(cmp, RDFS.subPropertyOf, RDFS.member),
+                       (EX.a, RDF._1, EX.b),
+                       (EX.a, EX.property, EX.c)})
+        self.context.types = {cmp}
+        self.assertEqual(set(rule.apply(graph, self.context)),
+                         {(EX.a, RDFS.member, EX.b)})
+
+    def test_derives(self):
+        rule = Rule({(uuu, RDFS.subClassOf, xxx), (vvv, RDF.type, uuu)},
+                    {(vvv, RDF.type, xxx)})
+        graph = Graph({(EX.a, RDFS.subClassOf, EX.b),
+                       (EX.x, RDF.type, EX.a)})
+        self.assertTrue(rule.derives((EX.x, RDF.type, EX.b), graph,
+                                     self.context))
+        self.assertFalse(rule.derives((EX.y, RDF.type, EX.b), graph,
+                                      self.context))
+        self.assertFalse(rule.derives((EX.x, RDFS.label, EX.b), graph,
+                                      self.context))
+
+    def test_derives_allocated_blank_nodes(self):
+        graph = Graph({(EX.a, EX.property, EX.b)})
+        triple, = self.rule_se1.apply(graph, self.context)
+        self.assertTrue(self.rule_se1.derives(triple, graph, self.context))
+        self.assertFalse(self.rule_se1.derives(
+            (EX.a, EX.property, BlankNode()), graph, self.context))
+
+
+class TestPattern(unittest.TestCase):
+    def test_matches_constants_and_types(self):
+        pattern = Pattern((uuu, RDF.type, xxx))
+        self.assertTrue(pattern.matches((EX.a, RDF.type, EX.b)))
+        self.assertTrue(pattern.matches((BlankNode(), RDF.type, EX.b)))
+        self.assertFalse(pattern.matches((EX.a, RDFS.label, EX.b)))
+        self.assertFalse(pattern.matches((PlainLiteral("a"), RDF.type,
+                                          EX.b)))
+
+    def test_matches_type_terms(self):
+        self.assertTrue(Pattern((uuu, aaa, xxx)).matches((EX.a, cmp, EX.b)))
+        self.assertTrue(Pattern((uuu, cmp, xxx)).matches((EX.a, RDF._2,
+                                                          EX.b)))
+        self.assertFalse(Pattern((uuu, lll, xxx)).matches((EX.a, cmp,
+                                                           EX.b)))
+
+    def test_matches_typed_literals_by_value(self):
+        pattern = Pattern((uuu, EX.property, TypedLiteral("1", XSD.integer)))
+        self.assertTrue(pattern.matches(
+            (EX.a, EX.property, TypedLiteral("01", XSD.integer))))
+        self.assertTrue(pattern.matches(
+            (EX.a, EX.property, TypedLiteral("1.0", XSD.decimal))))
+        self.assertFalse(pattern.matches(
+            (EX.a, EX.property, TypedLiteral("2", XSD.integer))))
+        self.assertFalse(pattern.matches(
+            (EX.a, EX.property, PlainLiteral("1"))))
+
+    def test_unsupported_typed_literals_match_by_equality(self):
+        literal = TypedLiteral("1", EX.datatype)
+        pattern = Pattern((uuu, EX.property, literal))
+        self.assertTrue(pattern.matches((EX.a, EX.property, literal)))
+        self.assertFalse(pattern.matches(
+            (EX.a, EX.property, TypedLiteral("01", EX.datatype))))
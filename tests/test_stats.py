@@ -0,0 +1,66 @@
+import unittest
+
+from rdf.namespace import RDF, RDFS
+from rdf.graph import Graph
+from rdf.semantics.rule import Context
+from rdf.semantics.stats import Stats
+from rdf.semantics.entailment import RDFS_ENTAILMENT, rdfs9, rdfs11
+
+from util import EX, example_premise
+
+
+class TestStats(unittest.TestCase):
+    def setUp(self):
+        self.premise = example_premise()
+        self.conclusion = Graph({(EX.x, RDF.type, EX.z)})
+
+    def test_records_rules_and_rounds(self):
+        stats = Stats()
+        RDFS_ENTAILMENT.entails(self.premise, self.conclusion, stats=stats)
+        rule_stats = stats.rules[rdfs9]
+        self.assertEqual(rule_stats.rule, rdfs9)
+        self.assertTrue(rule_stats.firings >= 3)
+        self.assertTrue(rule_stats.triples >= 2)
+        self.assertTrue(rule_stats.time >= 0)
+        self.assertTrue(stats.rules[rdfs11].triples >= 1)
+        self.assertTrue(len(stats.rounds) >= 2)
+        self.assertEqual(stats.rounds[0].number, 1)
+        self.assertEqual(stats.rounds[-1].derived, 0)
+        self.assertTrue('rdfs9' in stats.report())
+
+    def test_counts_duplicates(self):
+        stats = Stats()
+        session = RDFS_ENTAILMENT.compile().session(Context(), stats)
+        session.add({(EX.a, RDFS.subClassOf, EX.b), (EX.x, RDF.type, EX.a),
+                     (EX.x, RDF.type, EX.b)})
+        self.assertEqual(stats.rules[rdfs9].firings, 1)
+        self.assertEqual(stats.rules[rdfs9].duplicates, 1)
+        self.assertEqual(stats.rules[rdfs9].triples, 0)
+
+    def test_rounds_count_added_and_derived_triples(self):
+        stats = Stats()
+        session = RDFS_ENTAILMENT.compile().session(Context(), stats)
+        derived = session.add(self.premise | {(EX.x, RDF.type, EX.b)})
+        self.assertTrue((EX.x, RDF.type, EX.c) in derived)
+        again = session.add(derived | {(EX.x, RDF.type, EX.b)})
+        self.assertEqual([round_.added for round_ in stats.rounds],
+                         [len(self.premise) + 1, len(derived)])
+        self.assertEqual([round_.derived for round_ in stats.rounds],
+                         [len(derived), len(again)])
+
+    def test_callback_is_called_each_round(self):
+        rounds = []
+        stats = Stats(callback=lambda stats: rounds.append(stats.rounds[-1]))
+        RDFS_ENTAILMENT.entails(self.premise, self.conclusion, stats=stats)
+        self.assertEqual(rounds, stats.rounds)
+
+    def test_parallel_session(self):
+        stats = Stats()
+        RDFS_ENTAILMENT.entails(self.premise, self.conclusion, processes=2,
+                                stats=stats)
+        self.assertTrue(stats.rules[rdfs9].triples >= 2)
+        self.assertEqual(stats.rounds[-1].derived, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+import unittest
+
+from rdf.namespace import RDF, RDFS
+from rdf.graph import Graph
+from rdf.semantics.rule import Context
+from rdf.semantics.type import cmp
+from rdf.semantics.transitive import TransitiveClosure, transitive_predicate
+from rdf.semantics.entailment import rdfs5, rdfs7, rdfs9, rdfs11
+
+from util import EX
+
+
+class TestTransitivePredicate(unittest.TestCase):
+    def test_recognizes_transitive_rules(self):
+        self.assertEqual(transitive_predicate(rdfs5), RDFS.subPropertyOf)
+        self.assertEqual(transitive_predicate(rdfs11), RDFS.subClassOf)
+
+    def test_rejects_other_rules(self):
+        self.assertEqual(transitive_predicate(rdfs7), None)
+        self.assertEqual(transitive_predicate(rdfs9), None)
+        self.assertRaises(ValueError, TransitiveClosure, rdfs9)
+
+
+class TestTransitiveClosure(unittest.TestCase):
+    def setUp(self):
+        self.closure = TransitiveClosure(rdfs11)
+
+    def derive(self, triples):
+        return set(self.closure.derive(Graph(triples)))
+
+    def test_chain(self):
+        triples = {(EX['c{}'.format(i)], RDFS.subClassOf,
+                    EX['c{}'.format(i + 1)]) for i in range(5)}
+        derived = self.derive(triples)
+        self.assertEqual(len(derived), 10)
+        self.assertTrue((EX.c0, RDFS.subClassOf, EX.c5) in derived)
+        self.assertFalse((EX.c5, RDFS.subClassOf, EX.c0) in derived)
+
+    def test_cycle(self):
+        triples = {(EX.a, RDFS.subClassOf, EX.b),
+                   (EX.b, RDFS.subClassOf, EX.c),
+                   (EX.c, RDFS.subClassOf, EX.a),
+                   (EX.c, RDFS.subClassOf, EX.d)}
+        expected = {(subject, RDFS.subClassOf, object_)
+                    for subject in (EX.a, EX.b, EX.c)
+                    for object_ in (EX.a, EX.b, EX.c, EX.d)}
+        self.assertEqual(self.derive(triples), expected - triples)
+
+    def test_ignores_other_predicates(self):
+        self.assertEqual(self.derive({(EX.a, RDFS.subClassOf, EX.b),
+                                      (EX.b, EX.p, EX.c)}), set())
+
+    def test_matches_generic_rule(self):
+        closure = TransitiveClosure(rdfs5)
+        triples = {(cmp, RDFS.subPropertyOf, RDFS.member),
+                   (RDFS.member, RDFS.subPropertyOf, EX.p),
+                   (EX.q, RDFS.subPropertyOf, RDF._1),
+                   (EX.p, RDFS.subPropertyOf, EX.q)}
+        graph = Graph(triples)
+        context = Context()
+        context.types.add(cmp)
+        while True:
+            new = set(rdfs5.apply(graph, context)) - graph
+            if not new:
+                break
+            graph.update(new)
+        self.assertEqual(set(closure.derive(Graph(triples))),
+                         set(graph) - triples)
+
+
+class TestIncrementalClosure(unittest.TestCase):
+    def setUp(self):
+        self.closure = TransitiveClosure(rdfs11).incremental()
+
+    def test_returns_only_new_pairs(self):
+        self.assertEqual(self.closure.add({(EX.a, RDFS.subClassOf, EX.b),
+                                           (EX.c, RDFS.subClassOf, EX.d)}), [])
+        self.assertEqual(set(self.closure.add({(EX.b, RDFS.subClassOf,
+                                                EX.c)})),
+                         {(EX.a, RDFS.subClassOf, EX.c),
+                          (EX.a, RDFS.subClassOf, EX.d),
+                          (EX.b, RDFS.subClassOf, EX.d)})
+        self.assertEqual(set(self.closure.add({(EX.d, RDFS.subClassOf,
+                                                EX.e)})),
+                         {(EX.a, RDFS.subClassOf, EX.e),
+                          (EX.b, RDFS.subClassOf, EX.e),
+                          (EX.c, RDFS.subClassOf, EX.e)})
+
+    def test_added_closure_triples_derive_nothing(self):
+        derived = self.closure.add({(EX.a, RDFS.subClassOf, EX.b),
+                                    (EX.b, RDFS.subClassOf, EX.a)})
+        self.assertEqual(len(derived), 2)
+        self.assertEqual(self.closure.add(derived), [])
+
+    def test_matches_whole_closure_edge_by_edge(self):
+        closure = TransitiveClosure(rdfs5)
+        incremental = closure.incremental()
+        triples = [(EX.q, RDFS.subPropertyOf, RDF._1),
+                   (EX.p, RDFS.subPropertyOf, EX.q),
+                   (RDFS.member, RDFS.subPropertyOf, EX.p),
+                   (cmp, RDFS.subPropertyOf, RDFS.member),
+                   (EX.r, RDFS.subPropertyOf, EX.p)]
+        derived = set()
+        for triple in triples:
+            derived.update(incremental.add([triple]))
+        self.assertEqual(derived, set(closure.derive(Graph(triples))))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,9 @@
 import os.path
 from urllib.request import OpenerDirector
 
-from rdf.namespace import Namespace
+from rdf.graph import Graph
+from rdf.literal import PlainLiteral
+from rdf.namespace import Namespace, RDF, RDFS
 from rdf.testcases.opener import URItoFileOpener
 
 
@@ -22,3 +24,13 @@ PATH_MAP = {TESTS: get_data_path('rdfcore')}
 TEST_OPENER = URItoFileOpener(PATH_MAP)
 NULL_OPENER = NullOpener()
 
+def example_premise(*triples):
+    # A small class hierarchy with one instance, for the reasoning tests,
+    # with triples added to it.
+    premise = Graph({(EX.a, RDFS.subClassOf, EX.b),
+                     (EX.b, RDFS.subClassOf, EX.c),
+                     (EX.x, RDF.type, EX.a),
+                     (EX.x, EX.p, PlainLiteral("y")),
+                     (EX.p, RDFS.domain, EX.d)})
+    premise.update(triples)
+    return premise